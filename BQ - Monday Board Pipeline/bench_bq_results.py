@@ -0,0 +1,162 @@
+"""CPU time and peak RSS of reading query results: DataFrame vs rows vs Arrow.
+
+Two result shapes are measured, each in a fresh child process so peak
+RSS isn't shared between methods:
+
+    one_row   the get_date_range_data aggregate (one row per CGID and window)
+    large     --rows raw rows from metaads_combined_materialized
+
+Methods: `dataframe` is the old to_dataframe() path, `rows` reads Row
+objects from the iterator (bq_results.first_row / rows), `arrow` reads
+into Arrow buffers (bq_results.arrow_table). By default the queries run on
+the local DuckDB warehouse filled with synthetic data; with
+WAREHOUSE_BACKEND=bigquery and --no-generate they run against the project.
+
+Usage:
+    python bench_bq_results.py --rows 1000000 --repeat 3
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import bq_results
+import warehouse
+
+PROJECT_ID = "clinicgrower-reporting"
+PIVOT_VIEW = f"{PROJECT_ID}.dashboard_views.metaads_ga4_spend_leads_pivot"
+ADS_TABLE = f"{PROJECT_ID}.dashboard_views.metaads_combined_materialized"
+ADS_PER_CLIENT = 12
+DAYS = 365
+
+METHODS = {
+    'one_row': ['dataframe', 'rows'],
+    'large': ['dataframe', 'rows', 'arrow']
+}
+
+logger = logging.getLogger('bench')
+
+
+def one_row_query():
+    return f"""
+    SELECT
+        cgid,
+        client_name,
+        SUM(subscribe_survey_meta_ghl) as survey_leads,
+        SUM(subscribe_form_meta_ghl) as form_leads,
+        SUM(subscribe_chat_fbfunnel_ghl) as chat_leads,
+        SUM(total_spend) as total_spend
+    FROM `{PIVOT_VIEW}`
+    WHERE cgid = 'CG1'
+      AND report_date BETWEEN DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY) AND CURRENT_DATE()
+    GROUP BY cgid, client_name
+    """
+
+
+def large_query(rows):
+    return f"""
+    SELECT cgid, ad_id, date_spend, total_spend, total_impressions, total_clicks
+    FROM `{ADS_TABLE}`
+    LIMIT {rows}
+    """
+
+
+def read_result(client, case, method, rows):
+    """Run the query and consume its result the way a pipeline would."""
+    if case == 'one_row':
+        job = client.query(one_row_query())
+        if method == 'dataframe':
+            df = job.result().to_dataframe()
+            row = df.iloc[0] if len(df) else None
+        else:
+            row = bq_results.first_row(job)
+        return float(row['total_spend']) if row is not None else 0.0
+
+    job = client.query(large_query(rows))
+    if method == 'dataframe':
+        return float(job.result().to_dataframe()['total_spend'].sum())
+    if method == 'rows':
+        return float(sum(row['total_spend'] for row in bq_results.rows(job, page_size=100_000)))
+    import pyarrow.compute
+    return float(pyarrow.compute.sum(bq_results.arrow_table(job)['total_spend']).as_py())
+
+
+def run_child(case, method, rows, repeat):
+    """Measure one case/method in this process and print the result as JSON."""
+    client = warehouse.get_client(PROJECT_ID)
+    # Everything the process needs before the measured reads (client, bigquery, pyarrow)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu_times, wall_times = [], []
+    for _ in range(repeat):
+        cpu, wall = time.process_time(), time.perf_counter()
+        checksum = read_result(client, case, method, rows)
+        cpu_times.append(time.process_time() - cpu)
+        wall_times.append(time.perf_counter() - wall)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'cpu_s': min(cpu_times),
+        'wall_s': min(wall_times),
+        'peak_rss_mb': peak_rss / 1024,
+        'rss_growth_mb': (peak_rss - baseline_rss) / 1024,
+        'checksum': round(checksum, 2)
+    }))
+
+
+def generate_local_data(rows):
+    """Fill the local warehouse with enough synthetic ad rows for the large case."""
+    sys.path.insert(0, warehouse.LOCAL_WAREHOUSE_DIR)
+    from synthetic_data import create_views, generate
+
+    client = warehouse.get_client(PROJECT_ID)
+    counts = generate(client, clients=max(2, math.ceil(rows / (ADS_PER_CLIENT * DAYS))), days=DAYS,
+                      ads_per_client=ADS_PER_CLIENT)
+    create_views(client, ['metaads_ga4_spend_leads_pivot'])
+    client.connection.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the large result')
+    parser.add_argument('--repeat', type=int, default=3, help='Reads per child; best CPU/wall time is reported')
+    parser.add_argument('--no-generate', action='store_true', help='Use existing tables instead of synthetic data')
+    parser.add_argument('--child', nargs=2, metavar=('CASE', 'METHOD'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.rows, args.repeat)
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        if not args.no_generate:
+            env.update({'WAREHOUSE_BACKEND': 'duckdb', 'LOCAL_WAREHOUSE_DB': os.path.join(workdir, 'bench.duckdb')})
+            start = time.perf_counter()
+            counts = subprocess.run(
+                [sys.executable, '-c', f"import bench_bq_results as b; print(b.generate_local_data({args.rows}))"],
+                env=env, cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True, text=True
+            ).stdout.strip()
+            logger.info(f"Generated synthetic data in {time.perf_counter() - start:.1f}s: {counts}")
+
+        logger.info(f"{'case':<8} {'method':<10} {'cpu s':>8} {'wall s':>8} {'peak MB':>9} {'growth MB':>10} {'checksum':>16}")
+        for case, methods in METHODS.items():
+            for method in methods:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child', case, method,
+                     '--rows', str(args.rows), '--repeat', str(args.repeat)],
+                    env=env, check=True, capture_output=True, text=True
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(output)
+                logger.info(f"{case:<8} {method:<10} {result['cpu_s']:>8.3f} {result['wall_s']:>8.3f} "
+                            f"{result['peak_rss_mb']:>9.1f} {result['rss_growth_mb']:>10.1f} {result['checksum']:>16,.2f}")
+
+
+if __name__ == '__main__':
+    main()
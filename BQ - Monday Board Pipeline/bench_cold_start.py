@@ -0,0 +1,149 @@
+"""Cold-start benchmark for main(request) in meta-bq-mondayboard-metrics-sync.py.
+
+Reports two things to track over time:
+
+* a `python -X importtime` breakdown of loading the sync script (total
+  and the slowest top-level imports), and
+* time to first response: a fresh interpreter loads the script and
+  serves one sync, then a second (warm) sync in the same process.
+
+Monday is answered by fake_monday_server with a fixed latency per
+request. BigQuery is the stand-in client from bench_monday_sync; the
+bigquery library itself is still imported, so import costs are measured
+the same as in production. Each cold start gets an empty /tmp state
+(catalog, write state and run journal), like a new instance.
+
+Usage:
+    python bench_cold_start.py --items 200 --repeat 5
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_monday_server import start_server
+
+PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNC_SCRIPT = os.path.join(PIPELINE_DIR, 'meta-bq-mondayboard-metrics-sync.py')
+IMPORTTIME_PATTERN = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+LOAD_SYNC = (
+    "import importlib.util as u; "
+    f"s = u.spec_from_file_location('metrics_sync', {SYNC_SCRIPT!r}); "
+    "m = u.module_from_spec(s); s.loader.exec_module(m)"
+)
+
+logger = logging.getLogger('bench')
+
+
+class Request:
+    def get_json(self, silent=False):
+        return {}
+
+
+def run_child():
+    """Load the sync script, serve a cold then a warm request and print timings as JSON."""
+    started = time.time()
+    spec = importlib.util.spec_from_file_location('metrics_sync', SYNC_SCRIPT)
+    sync = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sync)
+    loaded = time.time()
+
+    from bench_monday_sync import FakeBigQueryClient
+    clients = {}
+
+    def get_client(project=None):
+        if project not in clients:
+            from google.cloud import bigquery  # Same import the real client needs
+            clients[project] = FakeBigQueryClient(float(os.environ.get('BENCH_BQ_LATENCY_MS', '0')))
+        return clients[project]
+
+    sync.warehouse.get_client = get_client
+
+    body, status = sync.main(Request())
+    first_response = time.time()
+    warm_start = time.perf_counter()
+    sync.main(Request())
+    warm_seconds = time.perf_counter() - warm_start
+    print(json.dumps({
+        'started': started,
+        'loaded': loaded,
+        'first_response': first_response,
+        'warm_seconds': warm_seconds,
+        'status': status,
+        'message': body.get('message') or body.get('status')
+    }))
+
+
+def importtime_breakdown(top, env):
+    """Total import time of the sync script and its slowest top-level imports (ms)."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', LOAD_SYNC],
+                            cwd=PIPELINE_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            entries.append((len(match.group(3)), match.group(4), int(match.group(2)) / 1000))
+    top_level = [(name, ms) for depth, name, ms in entries if depth == 1]
+    return sum(ms for _, ms in top_level), sorted(top_level, key=lambda entry: -entry[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=200, help='Items on the fake Monday board')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fake Monday latency per request')
+    parser.add_argument('--bq-latency-ms', type=float, default=300, help='Stand-in BigQuery job latency')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh processes to start; medians are reported')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.CRITICAL)
+        run_child()
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    env = dict(os.environ, MONDAY_API_TOKEN='fake', WAREHOUSE_BACKEND='bigquery',
+               BENCH_BQ_LATENCY_MS=str(args.bq_latency_ms))
+    total_ms, slowest = importtime_breakdown(args.top, env)
+    logger.info(f"Import time for {os.path.basename(SYNC_SCRIPT)}: {total_ms:.0f} ms")
+    for name, ms in slowest:
+        logger.info(f"  {name:<40} {ms:>8.1f} ms")
+
+    server = start_server(args.items, latency_ms=args.latency_ms)
+    loads, first_responses, warm = [], [], []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            env.update({
+                'MONDAY_API_URL': server.url,
+                'MONDAY_CATALOG_PATH': os.path.join(workdir, 'catalog.json'),
+                'MONDAY_WRITE_STATE_PATH': os.path.join(workdir, 'written.json'),
+                'JOURNAL_PATH': os.path.join(workdir, 'journal.sqlite')
+            })
+            spawned = time.time()
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=PIPELINE_DIR,
+                                    env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if result['status'] != 200:
+            logger.warning(f"⚠️ Sync returned {result['status']}: {result['message']}")
+        loads.append(result['loaded'] - spawned)
+        first_responses.append(result['first_response'] - spawned)
+        warm.append(result['warm_seconds'])
+    server.shutdown()
+
+    logger.info(f"\n{args.repeat} cold starts, {args.items} items, {args.latency_ms:g} ms Monday latency, "
+                f"{args.bq_latency_ms:g} ms BigQuery latency (median / min):")
+    logger.info(f"  process start -> module loaded   {statistics.median(loads):.3f}s / {min(loads):.3f}s")
+    logger.info(f"  process start -> first response  {statistics.median(first_responses):.3f}s / {min(first_responses):.3f}s")
+    logger.info(f"  warm invocation                  {statistics.median(warm):.3f}s / {min(warm):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""End-to-end throughput benchmark for meta-bq-mondayboard-metrics-sync.py.
+
+Runs the real ProductionPipeline against fake_monday_server with a
+synthetic board and a stand-in BigQuery client, and reports items/s,
+Monday requests per item and p50/p99 Monday request latency. Each board
+size is synced twice: a cold run (empty catalog and write state) and a
+warm run (incremental catalog, unchanged values skipped).
+
+Usage:
+    python bench_monday_sync.py --sizes 1000,5000,20000 --latency-ms 20 --rate-limit-rate 0.01
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import pyarrow
+
+import http_transport
+from fake_monday_server import start_server
+
+SYNC_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'meta-bq-mondayboard-metrics-sync.py')
+SERIES_PATTERN = re.compile(r"SUM\(.*\) AS (\w+)")
+
+logger = logging.getLogger('bench')
+
+
+class FakeQueryResult:
+    def __init__(self, table):
+        self.table = table
+
+    def __iter__(self):
+        return iter(self.table.to_pylist())
+
+    def to_arrow(self, *args, **kwargs):
+        return self.table
+
+
+class FakeQueryJob:
+    def __init__(self, series, cgids, scan_start, scan_end, latency):
+        self.series = series
+        self.cgids = cgids
+        self.scan_start = scan_start
+        self.scan_end = scan_end
+        self.latency = latency
+
+    def result(self, *args, **kwargs):
+        """Daily series rows, as returned by a metric_windows source query."""
+        time.sleep(self.latency)
+        start = date.fromisoformat(str(self.scan_start))
+        days = (date.fromisoformat(str(self.scan_end)) - start).days + 1
+        columns = {'cgid': [], 'report_date': [], 'row_count': []}
+        columns.update({name: [] for name in self.series})
+        for cgid in self.cgids:
+            seed = int(cgid[2:]) if cgid[2:].isdigit() else len(cgid)
+            for day in range(days):
+                columns['cgid'].append(cgid)
+                columns['report_date'].append(start + timedelta(days=day))
+                columns['row_count'].append(1)
+                for n, name in enumerate(self.series):
+                    columns[name].append(float((seed * 7 + day * 13 + n) % 500) if name == 'spend' else (seed + day + n) % 3)
+        return FakeQueryResult(pyarrow.table(columns))
+
+
+class FakeBigQueryClient:
+    """Answers every source's daily series query with deterministic rows per CGID."""
+
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000
+
+    def query(self, query, job_config=None):
+        parameters = {p.name: p for p in job_config.query_parameters}
+        return FakeQueryJob(SERIES_PATTERN.findall(query), parameters['cgids'].values, parameters['scan_start'].value,
+                            parameters['scan_end'].value, self.latency)
+
+
+def load_sync_module():
+    """Import the sync script fresh so it picks up the current environment."""
+    spec = importlib.util.spec_from_file_location('metrics_sync', SYNC_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed_post(latencies, lock):
+    original = http_transport.post
+
+    def post(url, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(url, **kwargs)
+        finally:
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+    return original, post
+
+
+def run_once(server, workdir, bq_latency_ms):
+    """Run one sync against the fake server and return its measurements."""
+    os.environ.update({
+        'MONDAY_API_URL': server.url,
+        'MONDAY_API_TOKEN': 'fake',
+        'MONDAY_CATALOG_PATH': os.path.join(workdir, 'catalog.json'),
+        'MONDAY_WRITE_STATE_PATH': os.path.join(workdir, 'written.json'),
+        'JOURNAL_PATH': os.path.join(workdir, 'journal.sqlite')
+    })
+    module = load_sync_module()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    latencies, lock = [], threading.Lock()
+    original, post = timed_post(latencies, lock)
+    http_transport.post = post
+    requests_before = server.stats['requests']
+    try:
+        pipeline = module.ProductionPipeline()
+        pipeline.init_bigquery = lambda: setattr(pipeline, 'bq_client', FakeBigQueryClient(bq_latency_ms)) or True
+        start = time.perf_counter()
+        ok = pipeline.run()
+        elapsed = time.perf_counter() - start
+    finally:
+        http_transport.post = original
+
+    items = pipeline.stats['total'] or 1
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    return {
+        'ok': ok,
+        'items': pipeline.stats['total'],
+        'seconds': elapsed,
+        'items_per_second': pipeline.stats['total'] / elapsed if elapsed else 0,
+        'requests_per_item': (server.stats['requests'] - requests_before) / items,
+        'p50_ms': quantiles[49],
+        'p99_ms': quantiles[98],
+        'cells_written': pipeline.stats['cells_written'],
+        'budget': pipeline.stats.get('monday_budget', {})
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,5000,20000', help='Comma-separated board sizes')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Fake Monday latency per request')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--budget', type=int, default=10_000_000, help='Fake complexity budget per minute')
+    parser.add_argument('--bq-latency-ms', type=float, default=300, help='Stand-in BigQuery job latency')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    logger.setLevel(logging.INFO)
+
+    logger.info(f"{'items':>7} {'run':>5} {'seconds':>8} {'items/s':>9} {'req/item':>9} {'p50 ms':>8} {'p99 ms':>8} {'cells':>8} {'waits':>6}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        server = start_server(size, latency_ms=args.latency_ms, rate_limit_rate=args.rate_limit_rate,
+                              budget=args.budget)
+        with tempfile.TemporaryDirectory() as workdir:
+            for run in ('cold', 'warm'):
+                result = run_once(server, workdir, args.bq_latency_ms)
+                budget = result['budget']
+                waits = budget.get('paced_waits', 0) + budget.get('exhausted_retries', 0)
+                logger.info(
+                    f"{result['items']:>7} {run:>5} {result['seconds']:>8.2f} {result['items_per_second']:>9.1f} "
+                    f"{result['requests_per_item']:>9.3f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                    f"{result['cells_written']:>8} {waits:>6}"
+                )
+                if not result['ok']:
+                    logger.warning(f"  ⚠️ {run} run reported failures")
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
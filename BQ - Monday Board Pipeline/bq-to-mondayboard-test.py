@@ -1,9 +1,10 @@
-import requests
+import http_transport
 import json
-import time
 import logging
 from datetime import datetime, timedelta
-from google.cloud import bigquery
+import warehouse
+import bq_results
+from monday_client import MondayClient
 
 # Configure logging
 logging.basicConfig(
@@ -59,6 +60,7 @@ LEAD_COLUMNS = [
 class IntegrationPipeline:
     def __init__(self):
         self.monday_headers = {"Authorization": MONDAY_API_TOKEN}
+        self.monday = MondayClient(MONDAY_API_URL, self.monday_headers, timeout=30)
         self.bq_client = None
         
     def get_fb_as_of_date_column_id(self):
@@ -78,7 +80,7 @@ class IntegrationPipeline:
         '''
         
         try:
-            response = requests.post(
+            response = http_transport.post(
                 MONDAY_API_URL,
                 json={"query": query, "variables": {"board_id": BOARD_ID}},
                 headers=self.monday_headers
@@ -108,7 +110,7 @@ class IntegrationPipeline:
         """Initialize BigQuery client"""
         logging.info("Initializing BigQuery connection...")
         try:
-            self.bq_client = bigquery.Client(project=PROJECT_ID)
+            self.bq_client = warehouse.get_client(PROJECT_ID)
             logging.info("BigQuery client initialized")
             return True
         except Exception as e:
@@ -133,13 +135,11 @@ class IntegrationPipeline:
             GROUP BY cgid, client_name
             """
             
-            df = self.bq_client.query(query).to_dataframe()
+            row = bq_results.first_row(self.bq_client.query(query))
             
-            if len(df) == 0:
+            if row is None:
                 return None
             
-            row = df.iloc[0]
-            
             # Calculate total leads
             total_leads = (
                 row['survey_leads'] + 
@@ -253,22 +253,11 @@ class IntegrationPipeline:
         }
         
         try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.monday_headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'errors' not in data:
-                    return True
-                else:
-                    logging.error(f"Monday API error: {data['errors']}")
-                    return False
+            data = self.monday.execute(mutation, variables)
+            if 'errors' not in data:
+                return True
             else:
-                logging.error(f"HTTP error: {response.status_code}")
+                logging.error(f"Monday API error: {data['errors']}")
                 return False
                 
         except Exception as e:
@@ -299,22 +288,11 @@ class IntegrationPipeline:
         }
         
         try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.monday_headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'errors' not in data:
-                    return True
-                else:
-                    logging.error(f"Monday API error: {data['errors']}")
-                    return False
+            data = self.monday.execute(mutation, variables)
+            if 'errors' not in data:
+                return True
             else:
-                logging.error(f"HTTP error: {response.status_code}")
+                logging.error(f"Monday API error: {data['errors']}")
                 return False
                 
         except Exception as e:
@@ -352,8 +330,6 @@ class IntegrationPipeline:
                     success_count += 1
                 else:
                     logging.error(f"  ✗ Failed to update {metric_name}")
-                
-                time.sleep(0.2)  # Rate limiting
         
         logging.info(f"Update complete: {success_count}/{total_count} successful")
         return success_count == total_count
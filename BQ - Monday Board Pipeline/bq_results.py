@@ -0,0 +1,44 @@
+"""Read BigQuery query results without building pandas DataFrames.
+
+Small results (one aggregate row, a short lookup) are read straight from
+the job's row iterator as bigquery Row objects. Large results go through
+to_arrow(), which streams over the BigQuery Storage Read API when
+google-cloud-bigquery-storage is installed and falls back to the REST
+pages otherwise; either way rows land in Arrow buffers and no DataFrame
+copy is made.
+"""
+import logging
+
+
+def first_row(job):
+    """First row of a finished query, or None when it returned nothing."""
+    for row in job.result(max_results=1):
+        return row
+    return None
+
+
+def rows(job, page_size=None):
+    """List of Row objects for a small result (row['column'] access)."""
+    return list(job.result(page_size=page_size))
+
+
+def arrow_table(job, use_storage_api=True):
+    """Whole result as a pyarrow.Table, for results too big to iterate row by row."""
+    # Without google-cloud-bigquery-storage installed the client falls back to REST pages itself
+    return job.result().to_arrow(create_bqstorage_client=use_storage_api, progress_bar_type=None)
+
+
+def arrow_batches(job, use_storage_api=True):
+    """Yield pyarrow.RecordBatch chunks so a large result never has to fit in memory at once."""
+    result = job.result()
+    if hasattr(result, 'to_arrow_iterable'):
+        bqstorage_client = None
+        if use_storage_api:
+            try:
+                from google.cloud import bigquery_storage
+                bqstorage_client = bigquery_storage.BigQueryReadClient()
+            except ImportError:
+                logging.info("google-cloud-bigquery-storage not installed, reading result over REST")
+        yield from result.to_arrow_iterable(bqstorage_client=bqstorage_client)
+    else:
+        yield from result.to_arrow().to_batches()
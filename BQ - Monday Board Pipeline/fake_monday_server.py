@@ -0,0 +1,292 @@
+"""Local stand-in for the Monday GraphQL API, for benchmarks and dry runs.
+
+Serves a synthetic board in memory and understands just the operations
+the sync scripts send: items_page / next_items_page with cursors,
+items(ids:), activity_logs, me, change_column_value and (aliased)
+change_multiple_column_values. Queries are charged against a complexity
+budget that resets every minute, the same way Monday does, and can be
+slowed down or answered with 429s to exercise retry paths.
+
+Usage:
+    python fake_monday_server.py --items 5000 --latency-ms 40 --rate-limit-rate 0.01
+    MONDAY_API_URL=http://127.0.0.1:8765/v2 MONDAY_API_TOKEN=fake python meta-bq-mondayboard-metrics-sync.py
+"""
+import argparse
+import calendar
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GROUP_IDS = ['new_group55979', 'duplicate_of_90_day_campaign', 'new_group45032']
+CGID_COLUMN = 'text25'
+
+# Rough per-operation complexity costs
+READ_COST_PER_ITEM = 100
+WRITE_COST_PER_ITEM = 1000
+QUERY_BASE_COST = 1000
+
+MUTATION_PATTERN = re.compile(r'(?:(\w+)\s*:\s*)?(change_multiple_column_values|change_column_value)\s*\(([^)]*)\)')
+ARGUMENT_PATTERN = re.compile(r'(\w+)\s*:\s*(\$\w+|"[^"]*"|\d+)')
+LIMIT_PATTERN = re.compile(r'items_page\s*\(\s*limit\s*:\s*(\d+)')
+
+
+class FakeBoard:
+    """In-memory board: items spread across groups, each with a CGID."""
+
+    def __init__(self, item_count, groups=GROUP_IDS, board_id='1981285971'):
+        self.board_id = str(board_id)
+        self.lock = threading.Lock()
+        self.items = {}
+        self.group_items = {group: [] for group in groups}
+        for index in range(item_count):
+            item_id = str(9000000000 + index)
+            group = groups[index % len(groups)]
+            self.items[item_id] = {
+                'id': item_id,
+                'name': f"Client {index} | Synthetic",
+                'state': 'active',
+                'updated_at': '2024-01-01T00:00:00Z',
+                'group': {'id': group, 'title': group},
+                'columns': {CGID_COLUMN: f"CG{index}"}
+            }
+            self.group_items[group].append(item_id)
+        self.cells_written = 0
+        self.activity = []  # activity_logs entries, oldest first
+
+    def log_change(self, item_id, column_id, value):
+        self.activity.append({
+            'created_at': str(int(time.time() * 10_000_000)),
+            'data': json.dumps({'pulse_id': int(item_id), 'column_id': column_id, 'value': value})
+        })
+
+    def edit(self, item_id, column_id, value):
+        """Change a cell the way a person would on the board."""
+        with self.lock:
+            self.items[str(item_id)]['columns'][column_id] = value
+            self.log_change(item_id, column_id, value)
+
+    def activity_since(self, since, page, limit=500):
+        """One page of activity_logs since an ISO timestamp, newest first."""
+        threshold = calendar.timegm(time.strptime(since, '%Y-%m-%dT%H:%M:%SZ')) * 10_000_000 if since else 0
+        with self.lock:
+            entries = [entry for entry in reversed(self.activity) if int(entry['created_at']) >= threshold]
+        return entries[(page - 1) * limit:page * limit]
+
+    def render(self, item_id, column_ids=None):
+        item = self.items[item_id]
+        columns = item['columns']
+        ids = column_ids if column_ids is not None else list(columns)
+        return {
+            'id': item['id'],
+            'name': item['name'],
+            'state': item['state'],
+            'updated_at': item['updated_at'],
+            'group': item['group'],
+            'column_values': [
+                {'id': column_id, 'value': json.dumps(columns[column_id]) if column_id in columns else None,
+                 'text': columns.get(column_id)}
+                for column_id in ids
+            ]
+        }
+
+    def page(self, group, offset, limit, column_ids):
+        item_ids = self.group_items.get(group, [])
+        end = offset + limit
+        cursor = f"{group}:{end}" if end < len(item_ids) else None
+        return {'cursor': cursor, 'items': [self.render(item_id, column_ids) for item_id in item_ids[offset:end]]}
+
+    def write(self, item_id, column_values):
+        with self.lock:
+            item = self.items.get(str(item_id))
+            if not item:
+                return None
+            item['columns'].update(column_values)
+            self.cells_written += len(column_values)
+            for column_id, value in column_values.items():
+                self.log_change(item_id, column_id, value)
+            return {'id': item['id']}
+
+
+class ComplexityBudget:
+    """Per-minute complexity budget shared by every request."""
+
+    def __init__(self, budget, period=60.0):
+        self.budget = budget
+        self.period = period
+        self.lock = threading.Lock()
+        self.remaining = budget
+        self.reset_at = time.monotonic() + period
+
+    def charge(self, cost):
+        """Spend budget; returns (complexity, None) or (None, seconds_until_reset)."""
+        with self.lock:
+            now = time.monotonic()
+            if now >= self.reset_at:
+                self.remaining = self.budget
+                self.reset_at = now + self.period
+            reset_in = max(1, int(self.reset_at - now + 0.999))
+            if cost > self.remaining:
+                return None, reset_in
+            before = self.remaining
+            self.remaining -= cost
+            return {'before': before, 'after': self.remaining, 'query': cost, 'reset_in_x_seconds': reset_in}, None
+
+
+class FakeMondayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, board, budget=10_000_000, latency_ms=0, rate_limit_rate=0.0, retry_after=1):
+        super().__init__(address, FakeMondayHandler)
+        self.board = board
+        self.budget = ComplexityBudget(budget)
+        self.latency_ms = latency_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'budget_exhausted': 0, 'mutations': 0, 'reads': 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+
+class FakeMondayHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        server.count('requests')
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+        if server.rate_limit_rate and random.random() < server.rate_limit_rate:
+            server.count('rate_limited')
+            self.send_json(429, {'error_message': 'Rate limit exceeded'}, {'Retry-After': str(server.retry_after)})
+            return
+
+        query = body.get('query', '')
+        variables = body.get('variables') or {}
+        is_mutation = query.lstrip().startswith('mutation')
+        try:
+            if is_mutation:
+                # Charge before writing so a rejected mutation changes nothing
+                data, cost = None, WRITE_COST_PER_ITEM * len(MUTATION_PATTERN.findall(query))
+            else:
+                server.count('reads')
+                data, cost = self.run_query(query, variables)
+        except Exception as e:
+            self.send_json(200, {'errors': [{'message': f"Fake server could not handle query: {e}"}]})
+            return
+
+        complexity, reset_in = server.budget.charge(QUERY_BASE_COST + cost)
+        if complexity is None:
+            server.count('budget_exhausted')
+            self.send_json(200, {'errors': [{
+                'message': f"Complexity budget exhausted, query cost {cost}, reset in {reset_in} seconds",
+                'extensions': {'code': 'COMPLEXITY_BUDGET_EXHAUSTED', 'retry_in_seconds': reset_in}
+            }]})
+            return
+        if is_mutation:
+            server.count('mutations')
+            try:
+                data = self.run_mutation(query, variables)
+            except Exception as e:
+                self.send_json(200, {'errors': [{'message': f"Fake server could not handle mutation: {e}"}]})
+                return
+        if 'complexity' in query:
+            data['complexity'] = complexity
+        self.send_json(200, {'data': data})
+
+    def run_mutation(self, query, variables):
+        board = self.server.board
+        data = {}
+        for alias, field, arguments in MUTATION_PATTERN.findall(query):
+            args = {}
+            for name, value in ARGUMENT_PATTERN.findall(arguments):
+                args[name] = variables.get(value[1:]) if value.startswith('$') else value.strip('"')
+            if field == 'change_column_value':
+                value = json.loads(args['value']) if isinstance(args['value'], str) else args['value']
+                column_values = {args['column_id']: value}
+            else:
+                column_values = args['column_values']
+                column_values = json.loads(column_values) if isinstance(column_values, str) else column_values
+            data[alias or field] = board.write(args['item_id'], column_values)
+        return data
+
+    def run_query(self, query, variables):
+        board = self.server.board
+        column_ids = variables.get('column_ids')
+        if 'next_items_page' in query:
+            group, offset = variables['cursor'].rsplit(':', 1)
+            page = board.page(group, int(offset), 100, column_ids)
+            return {'next_items_page': page}, READ_COST_PER_ITEM * len(page['items'])
+        if 'items_page' in query:
+            match = LIMIT_PATTERN.search(query)
+            limit = int(variables.get('limit') or (match.group(1) if match else 100))
+            group_ids = variables.get('group_ids') or list(board.group_items)
+            groups = [{'id': group, 'items_page': board.page(group, 0, limit, column_ids)} for group in group_ids]
+            if 'groups' not in query:
+                # Board-level items_page, as used by the older scripts
+                return {'boards': [{'items_page': groups[0]['items_page']}]}, READ_COST_PER_ITEM * limit
+            cost = sum(len(group['items_page']['items']) for group in groups) * READ_COST_PER_ITEM
+            return {'boards': [{'groups': groups}]}, cost
+        if 'activity_logs' in query:
+            logs = board.activity_since(variables.get('from'), int(variables.get('page') or 1))
+            return {'boards': [{'activity_logs': logs}]}, READ_COST_PER_ITEM
+        if re.search(r'\bitems\s*\(', query):
+            items = [board.render(str(item_id), column_ids) for item_id in variables.get('ids', []) if str(item_id) in board.items]
+            return {'items': items}, READ_COST_PER_ITEM * len(items)
+        if re.search(r'\bme\s*\{', query):
+            return {'me': {'id': '1', 'name': 'Fake Monday'}}, 0
+        raise ValueError('unsupported operation')
+
+
+def start_server(item_count, port=0, **options):
+    """Start a fake Monday API in a background thread and return the server."""
+    server = FakeMondayServer(('127.0.0.1', port), FakeBoard(item_count), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--budget', type=int, default=10_000_000, help='Complexity budget per minute')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = FakeMondayServer(('127.0.0.1', args.port), FakeBoard(args.items), budget=args.budget,
+                              latency_ms=args.latency_ms, rate_limit_rate=args.rate_limit_rate)
+    logging.info(f"Fake Monday API with {args.items} items at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info(f"Stopped: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime, timedelta
-from google.cloud import bigquery
-import pandas as pd
+import warehouse
+import bq_results
 from typing import Dict, List, Optional
 
 # Configure logging
@@ -46,7 +46,7 @@ class BigQueryTester:
         logging.info("Testing BigQuery connection...")
         
         try:
-            self.client = bigquery.Client(project=PROJECT_ID)
+            self.client = warehouse.get_client(PROJECT_ID)
             
             # Simple query to test connection
             query = "SELECT 1 as test"
@@ -95,13 +95,13 @@ class BigQueryTester:
             ORDER BY cgid
             """
             
-            df = self.client.query(query).to_dataframe()
+            found = bq_results.rows(self.client.query(query))
             
-            if len(df) > 0:
-                logging.info(f"✅ Found {len(df)} matching CGIDs:")
-                for _, row in df.iterrows():
+            if len(found) > 0:
+                logging.info(f"✅ Found {len(found)} matching CGIDs:")
+                for row in found:
                     logging.info(f"  - {row['cgid']}: {row['client_name']}")
-                return df
+                return found
             else:
                 logging.warning("⚠️ No matching CGIDs found in BQ data")
                 logging.info("Let's check what CGIDs exist in the data...")
@@ -112,9 +112,8 @@ class BigQueryTester:
                 FROM `{FULL_VIEW_PATH}`
                 LIMIT 10
                 """
-                df = self.client.query(query).to_dataframe()
                 logging.info("Sample CGIDs in the view:")
-                for _, row in df.iterrows():
+                for row in bq_results.rows(self.client.query(query)):
                     logging.info(f"  - {row['cgid']}: {row['client_name']}")
                 
                 return None
@@ -143,14 +142,12 @@ class BigQueryTester:
             GROUP BY cgid, client_name
             """
             
-            df = self.client.query(query).to_dataframe()
+            row = bq_results.first_row(self.client.query(query))
             
-            if len(df) == 0:
+            if row is None:
                 logging.warning(f"No data found for {cgid} between {start_date} and {end_date}")
                 return None
             
-            row = df.iloc[0]
-            
             # Calculate total leads
             total_leads = (
                 row['survey_leads'] + 
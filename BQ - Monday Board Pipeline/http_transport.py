@@ -0,0 +1,141 @@
+"""Shared HTTP transport for outbound API calls.
+
+One pooled requests.Session per host with keep-alive, a retry adapter for
+429/5xx (jittered exponential backoff that honors Retry-After) and
+per-host request/latency counters for the run summary.
+
+Callers that retry 429s themselves pass handles_rate_limits=True. They
+get a separate session whose adapter leaves 429s and POSTs alone and only
+retries 5xx on GET, so the two retry loops don't multiply their waits.
+
+Each pipeline folder ships its own copy of this file because every folder
+is deployed as a separate Cloud Function.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '32'))  # Keep-alive connections per host
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '3'))  # Adapter retries for 429/5xx (5xx only for callers that handle 429)
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', '0.5'))
+HTTP_DEFAULT_TIMEOUT = float(os.environ.get('HTTP_DEFAULT_TIMEOUT', '60'))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Left to callers with their own rate-limit handling
+CALLER_RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def _build_retry(handles_rate_limits=False):
+    options = dict(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=CALLER_RETRY_STATUSES if handles_rate_limits else RETRY_STATUSES,
+        allowed_methods=frozenset(['GET'] if handles_rate_limits else ['GET', 'POST']),
+        # urllib3 retries any 429 carrying Retry-After while this is on, whatever the status list says
+        respect_retry_after_header=not handles_rate_limits,
+        raise_on_status=False
+    )
+    try:
+        return Retry(backoff_jitter=HTTP_BACKOFF_FACTOR, **options)
+    except TypeError:
+        # urllib3 < 2 has no jitter option
+        return Retry(**options)
+
+
+class HttpTransport:
+    """Pooled sessions per host with retry and latency accounting."""
+
+    def __init__(self, pool_maxsize=HTTP_POOL_MAXSIZE, timeout=HTTP_DEFAULT_TIMEOUT):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.counters = {}
+
+    def session_for(self, host, handles_rate_limits=False):
+        """Return the session for a host and retry policy, creating it on first use."""
+        with self.lock:
+            session = self.sessions.get((host, handles_rate_limits))
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=_build_retry(handles_rate_limits)
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.sessions[(host, handles_rate_limits)] = session
+            return session
+
+    def request(self, method, url, handles_rate_limits=False, **kwargs):
+        """Send a request through the host's pooled session."""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc
+        session = self.session_for(host, handles_rate_limits)
+        start = time.monotonic()
+        try:
+            response = session.request(method, url, **kwargs)
+        except Exception:
+            self._record(host, time.monotonic() - start, error=True, retries=0)
+            raise
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+        self._record(host, time.monotonic() - start, error=response.status_code >= 400, retries=len(retries))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _record(self, host, elapsed, error, retries):
+        with self.lock:
+            counter = self.counters.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            counter['requests'] += 1
+            counter['errors'] += int(error)
+            counter['retries'] += retries
+            counter['total_ms'] += elapsed * 1000
+            counter['max_ms'] = max(counter['max_ms'], elapsed * 1000)
+
+    def stats(self):
+        """Per-host request counts and latency, JSON-serializable."""
+        with self.lock:
+            return {
+                host: {
+                    'requests': counter['requests'],
+                    'errors': counter['errors'],
+                    'retries': counter['retries'],
+                    'avg_ms': round(counter['total_ms'] / counter['requests'], 1) if counter['requests'] else 0,
+                    'max_ms': round(counter['max_ms'], 1)
+                }
+                for host, counter in self.counters.items()
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.counters = {}
+
+
+# Process-wide transport, reused across warm invocations
+transport = HttpTransport()
+
+
+def get(url, **kwargs):
+    return transport.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return transport.post(url, **kwargs)
+
+
+def request_stats():
+    return transport.stats()
+
+
+def reset_stats():
+    transport.reset_stats()
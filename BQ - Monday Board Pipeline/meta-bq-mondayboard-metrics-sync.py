@@ -1,10 +1,17 @@
-import requests
+import http_transport
 import json
-import time
 import logging
 import os
+import queue
+import threading
 from datetime import datetime, timedelta
-from google.cloud import bigquery
+import warehouse
+from monday_client import MondayClient
+from monday_item_catalog import ItemCatalog
+from monday_write_state import WriteState
+from monday_run_journal import BigQueryRunJournal, SQLiteRunJournal, run_key
+from deadline import Deadline, continuation_payload, enqueue_continuation
+from metric_windows import MetricConfig
 
 # Configure logging
 logging.basicConfig(
@@ -13,15 +20,12 @@ logging.basicConfig(
 )
 
 # Configuration from environment variables
-MONDAY_API_URL = "https://api.monday.com/v2"
+MONDAY_API_URL = os.environ.get('MONDAY_API_URL', 'https://api.monday.com/v2')
 MONDAY_API_TOKEN = os.environ.get('MONDAY_API_TOKEN')
 BOARD_ID = os.environ.get('BOARD_ID', '1981285971')
 
-# BigQuery Configuration
+# BigQuery Configuration (source views are listed in metric_windows.json)
 PROJECT_ID = os.environ.get('GCP_PROJECT', 'clinicgrower-reporting')
-DATASET_ID = "dashboard_views"
-VIEW_NAME = "metaads_ga4_spend_leads_pivot"
-FULL_VIEW_PATH = f"{PROJECT_ID}.{DATASET_ID}.{VIEW_NAME}"
 
 # Group IDs to include (only process items in these groups)
 INCLUDE_GROUPS = [
@@ -35,25 +39,48 @@ EXCLUDE_GROUPS = [
     'group_title'
 ]
 
-# Column Mapping
-FB_METRICS_COLUMNS = {
-    'fb_leads_2_days': 'numbers4',
-    'fb_leads_7_days': 'numeric9',
-    'fb_leads_30_days': 'numeric0',
-    'fb_cpl_7_days': 'numbers01',
-    'fb_cpl_30_days': 'numbers49',
-    'fb_mtd_spend': 'numbers27',
-    'fb_last_month_spend': 'numbers04',
-    'fb_spend_30_days': 'numbers3',
-    'fb_as_of_date': 'date_mkwars37'
-}
+# CGID column and local snapshot of the items in INCLUDE_GROUPS
+CGID_COLUMN = 'text25'
+CATALOG_PATH = os.environ.get('MONDAY_CATALOG_PATH', f'/tmp/monday_item_catalog_{BOARD_ID}.json')
+MONDAY_FULL_REFRESH = os.environ.get('MONDAY_FULL_REFRESH', '').lower() in ('1', 'true', 'yes')
 
-# Lead source columns
-LEAD_COLUMNS = [
-    'subscribe_survey_meta_ghl',
-    'subscribe_form_meta_ghl',
-    'subscribe_chat_fbfunnel_ghl'
-]
+# Metric sources, windows and Monday column mapping (metric_windows.json)
+METRIC_CONFIG = MetricConfig.load()
+METRICS_COLUMNS = METRIC_CONFIG.monday_columns()
+
+# Last-written cell values, used to skip writes that change nothing
+WRITE_STATE_PATH = os.environ.get('MONDAY_WRITE_STATE_PATH', f'/tmp/monday_written_values_{BOARD_ID}.json')
+WRITE_TOLERANCE = float(os.environ.get('MONDAY_WRITE_TOLERANCE', '0.005'))  # Numeric difference treated as unchanged
+
+# Write-ahead run journal, so a crashed or timed-out run resumes where it stopped
+JOURNAL_BACKEND = os.environ.get('JOURNAL_BACKEND', 'sqlite')  # 'sqlite' locally, 'bigquery' in prod
+JOURNAL_PATH = os.environ.get('JOURNAL_PATH', f'/tmp/monday_run_journal_{BOARD_ID}.sqlite')
+JOURNAL_TABLE_ID = os.environ.get('JOURNAL_TABLE_ID', 'dashboard_views.monday_sync_journal')
+
+# Share of the Monday complexity budget to spend before waiting for the reset
+MONDAY_BUDGET_TARGET = float(os.environ.get('MONDAY_BUDGET_TARGET', '0.9'))
+
+# Items updated per aliased change_multiple_column_values request
+MONDAY_ITEMS_PER_MUTATION = int(os.environ.get('MONDAY_ITEMS_PER_MUTATION', '25'))
+
+# One BigQuery read per source for the whole board, then Monday writer workers fed by a bounded queue;
+# the read finishes before the first chunk is queued, so only journal replays overlap it
+MONDAY_WRITER_WORKERS = int(os.environ.get('MONDAY_WRITER_WORKERS', '2'))  # Concurrent Monday mutations
+WRITE_QUEUE_SIZE = int(os.environ.get('WRITE_QUEUE_SIZE', '4'))  # Mutation batches buffered before queueing waits
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal(bq_client):
+    """Process-wide run journal, chosen by JOURNAL_BACKEND and reused by warm invocations"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            if JOURNAL_BACKEND == 'bigquery':
+                _journal = BigQueryRunJournal(bq_client, f"{PROJECT_ID}.{JOURNAL_TABLE_ID}")
+            else:
+                _journal = SQLiteRunJournal(JOURNAL_PATH)
+        return _journal
 
 class ProductionPipeline:
     def __init__(self):
@@ -62,125 +89,68 @@ class ProductionPipeline:
         
         self.monday_headers = {"Authorization": MONDAY_API_TOKEN}
         self.bq_client = None
+        self.stats_lock = threading.Lock()
+        self.monday = MondayClient(MONDAY_API_URL, self.monday_headers, target_utilization=MONDAY_BUDGET_TARGET)
+        self.catalog = ItemCatalog(
+            CATALOG_PATH, self.monday, BOARD_ID, INCLUDE_GROUPS, CGID_COLUMN,
+            ignore_columns=METRICS_COLUMNS.values()
+        )
+        self.write_state = WriteState(WRITE_STATE_PATH, tolerance=WRITE_TOLERANCE)
+        self.journal = None
+        self.journal_run = None
+        self.deadline = Deadline()
+        self.cursor = None
         self.stats = {
             'total': 0,
             'success': 0,
             'failed': 0,
             'no_data': 0,
             'no_cgid': 0,
-            'filtered_out': 0,
+            'unchanged': 0,
+            'cells_written': 0,
+            'cells_skipped': 0,
+            'cells_edited_on_board': 0,
+            'resumed_done': 0,
+            'earlier_invocations': 0,
+            'replayed': 0,
+            'deferred': 0,
             'errors': []
         }
+    
+    def count(self, key, amount=1):
+        """Add to a stats counter; called from the main and writer threads"""
+        with self.stats_lock:
+            self.stats[key] += amount
         
     def init_bigquery(self):
         """Initialize BigQuery client"""
         logging.info("Initializing BigQuery connection...")
         try:
-            self.bq_client = bigquery.Client(project=PROJECT_ID)
+            self.bq_client = warehouse.get_client(PROJECT_ID)
             logging.info("✅ BigQuery client initialized")
             return True
         except Exception as e:
             logging.error(f"❌ Failed to initialize BigQuery: {str(e)}")
             return False
     
+    def open_journal(self):
+        """Run journal, chosen by JOURNAL_BACKEND"""
+        return get_journal(self.bq_client)
+    
     def get_all_items(self):
-        """Get all items from Monday board with pagination"""
-        logging.info("Fetching all items from Monday board...")
-        
-        all_items = []
-        cursor = None
-        page = 1
+        """Get items in the included groups, refreshing only what changed since the last run"""
+        logging.info("Refreshing Monday item catalog...")
         
-        while True:
-            # Build query with cursor for pagination
-            if cursor:
-                query = '''
-                query ($board_id: ID!, $cursor: String) {
-                    boards(ids: [$board_id]) {
-                        items_page(limit: 100, cursor: $cursor) {
-                            cursor
-                            items {
-                                id
-                                name
-                                group {
-                                    id
-                                    title
-                                }
-                                column_values {
-                                    id
-                                    value
-                                }
-                            }
-                        }
-                    }
-                }
-                '''
-                variables = {"board_id": BOARD_ID, "cursor": cursor}
-            else:
-                query = '''
-                query ($board_id: ID!) {
-                    boards(ids: [$board_id]) {
-                        items_page(limit: 100) {
-                            cursor
-                            items {
-                                id
-                                name
-                                group {
-                                    id
-                                    title
-                                }
-                                column_values {
-                                    id
-                                    value
-                                }
-                            }
-                        }
-                    }
-                }
-                '''
-                variables = {"board_id": BOARD_ID}
-            
-            try:
-                response = requests.post(
-                    MONDAY_API_URL,
-                    json={"query": query, "variables": variables},
-                    headers=self.monday_headers,
-                    timeout=60
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'errors' in data:
-                        logging.error(f"API error: {data['errors']}")
-                        break
-                    
-                    items_page = data['data']['boards'][0]['items_page']
-                    items = items_page['items']
-                    
-                    if not items:
-                        break
-                    
-                    all_items.extend(items)
-                    logging.info(f"  Page {page}: Fetched {len(items)} items (Total so far: {len(all_items)})")
-                    
-                    # Check if there are more pages
-                    cursor = items_page.get('cursor')
-                    if not cursor:
-                        break
-                    
-                    page += 1
-                    time.sleep(0.5)  # Rate limiting between pages
-                    
-                else:
-                    logging.error(f"HTTP error: {response.status_code}")
-                    break
-                    
-            except Exception as e:
-                logging.error(f"Error fetching items: {str(e)}")
-                break
+        try:
+            items = self.catalog.refresh(force_full=MONDAY_FULL_REFRESH)
+        except Exception as e:
+            logging.error(f"Error fetching items: {str(e)}")
+            return []
         
-        logging.info(f"✅ Total items fetched: {len(all_items)}")
-        return all_items
+        self.stats['catalog'] = dict(self.catalog.last_refresh)
+        logging.info(f"✅ {len(items)} items in catalog ({self.catalog.last_refresh['mode']} refresh, "
+                     f"{self.catalog.last_refresh['changed_items']} changed, {self.catalog.last_refresh['requests']} requests)")
+        return items
     
     def should_process_item(self, item):
         """Check if item should be processed based on group filters"""
@@ -200,7 +170,7 @@ class ProductionPipeline:
     def extract_cgid(self, item):
         """Extract CGID from Monday item (from text25 column)"""
         for col in item['column_values']:
-            if col['id'] == 'text25':  # CGID column
+            if col['id'] == CGID_COLUMN:
                 if col['value']:
                     try:
                         cgid = json.loads(col['value'])
@@ -209,231 +179,153 @@ class ProductionPipeline:
                         return None
         return None
     
-    def get_date_range_data(self, cgid: str, start_date: str, end_date: str):
-        """Get aggregated data for a specific CGID and date range"""
-        
-        try:
-            query = f"""
-            SELECT 
-                cgid,
-                client_name,
-                SUM(subscribe_survey_meta_ghl) as survey_leads,
-                SUM(subscribe_form_meta_ghl) as form_leads,
-                SUM(subscribe_chat_fbfunnel_ghl) as chat_leads,
-                SUM(total_spend) as total_spend
-            FROM `{FULL_VIEW_PATH}`
-            WHERE cgid = '{cgid}'
-              AND report_date BETWEEN '{start_date}' AND '{end_date}'
-            GROUP BY cgid, client_name
-            """
-            
-            df = self.bq_client.query(query).to_dataframe()
-            
-            if len(df) == 0:
-                return None
-            
-            row = df.iloc[0]
-            
-            # Calculate total leads
-            total_leads = (
-                row['survey_leads'] + 
-                row['form_leads'] + 
-                row['chat_leads']
-            )
-            
-            # Calculate CPL
-            cpl = round(row['total_spend'] / total_leads, 2) if total_leads > 0 else 0
-            
-            return {
-                'leads': int(total_leads),
-                'spend': float(row['total_spend']),
-                'cpl': cpl
-            }
-            
-        except Exception as e:
-            logging.error(f"Error getting data for {cgid}: {str(e)}")
-            return None
+    def fetch_metrics_batch(self, cgids, as_of_date: str):
+        """Get Monday metrics for many CGIDs with one BigQuery job per source
+        
+        Pulls one daily series per CGID and configured source
+        over the widest configured window and computes every configured
+        column from its prefix sums. Returns {cgid: metrics}, merged across
+        sources, for the CGIDs that have data in at least one source.
+        """
+        cgids = sorted({cgid for cgid in cgids if cgid})
+        if not cgids:
+            return {}
+        
+        as_of = datetime.strptime(as_of_date, '%Y-%m-%d').date()
+        results = METRIC_CONFIG.fetch_metrics(self.bq_client, PROJECT_ID, cgids, as_of, on_error=self.source_failed)
+        
+        logging.info(f"✅ Fetched metrics for {len(results)}/{len(cgids)} CGIDs "
+                     f"({len(METRIC_CONFIG.active_sources())} sources, one query each)")
+        return results
+    
+    def source_failed(self, source, error):
+        """One source's query failed; its columns are left as they are on Monday"""
+        logging.error(f"❌ {source.name} metrics unavailable: {str(error)}")
+        with self.stats_lock:
+            self.stats['errors'].append(f"{source.name}: {error}")
     
     def calculate_metrics(self, cgid: str, as_of_date: str = None):
-        """Calculate all metrics for a CGID"""
+        """Calculate all metrics for a single CGID"""
         
         if as_of_date is None:
             as_of_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
         
-        as_of = datetime.strptime(as_of_date, '%Y-%m-%d')
-        
-        # Calculate date ranges
-        date_ranges = {
-            '2_days': {
-                'start': (as_of - timedelta(days=1)).strftime('%Y-%m-%d'),
-                'end': as_of.strftime('%Y-%m-%d')
-            },
-            '7_days': {
-                'start': (as_of - timedelta(days=6)).strftime('%Y-%m-%d'),
-                'end': as_of.strftime('%Y-%m-%d')
-            },
-            '30_days': {
-                'start': (as_of - timedelta(days=29)).strftime('%Y-%m-%d'),
-                'end': as_of.strftime('%Y-%m-%d')
-            },
-            'mtd': {
-                'start': as_of.replace(day=1).strftime('%Y-%m-%d'),
-                'end': as_of.strftime('%Y-%m-%d')
-            },
-            'last_month': {
-                'start': (as_of.replace(day=1) - timedelta(days=1)).replace(day=1).strftime('%Y-%m-%d'),
-                'end': (as_of.replace(day=1) - timedelta(days=1)).strftime('%Y-%m-%d')
-            }
-        }
-        
-        metrics = {
-            'as_of_date': as_of_date,
-            'fb_leads_2_days': 0,
-            'fb_leads_7_days': 0,
-            'fb_leads_30_days': 0,
-            'fb_cpl_7_days': 0,
-            'fb_cpl_30_days': 0,
-            'fb_mtd_spend': 0,
-            'fb_last_month_spend': 0,
-            'fb_spend_30_days': 0
-        }
+        try:
+            return self.fetch_metrics_batch([cgid], as_of_date).get(cgid)
+        except Exception as e:
+            logging.error(f"Error getting data for {cgid}: {str(e)}")
+            return None
+    
+    def build_column_values(self, metrics: dict):
+        """Build the change_multiple_column_values payload for one item"""
         
-        has_data = False
-        
-        # Get data for each range
-        data_2d = self.get_date_range_data(cgid, date_ranges['2_days']['start'], date_ranges['2_days']['end'])
-        if data_2d:
-            metrics['fb_leads_2_days'] = data_2d['leads']
-            has_data = True
-        
-        data_7d = self.get_date_range_data(cgid, date_ranges['7_days']['start'], date_ranges['7_days']['end'])
-        if data_7d:
-            metrics['fb_leads_7_days'] = data_7d['leads']
-            metrics['fb_cpl_7_days'] = data_7d['cpl']
-            has_data = True
-        
-        data_30d = self.get_date_range_data(cgid, date_ranges['30_days']['start'], date_ranges['30_days']['end'])
-        if data_30d:
-            metrics['fb_leads_30_days'] = data_30d['leads']
-            metrics['fb_cpl_30_days'] = data_30d['cpl']
-            metrics['fb_spend_30_days'] = data_30d['spend']
-            has_data = True
-        
-        data_mtd = self.get_date_range_data(cgid, date_ranges['mtd']['start'], date_ranges['mtd']['end'])
-        if data_mtd:
-            metrics['fb_mtd_spend'] = data_mtd['spend']
-            has_data = True
-        
-        data_lm = self.get_date_range_data(cgid, date_ranges['last_month']['start'], date_ranges['last_month']['end'])
-        if data_lm:
-            metrics['fb_last_month_spend'] = data_lm['spend']
-            has_data = True
-        
-        return metrics if has_data else None
+        column_values = {}
+        for metric_name, value in metrics.items():
+            if metric_name == 'as_of_date':
+                column_values[METRICS_COLUMNS['fb_as_of_date']] = {"date": value}
+            elif metric_name in METRICS_COLUMNS:
+                column_values[METRICS_COLUMNS[metric_name]] = str(value)
+        return column_values
     
-    def update_monday_cell(self, item_id: str, column_id: str, value):
-        """Update a single cell in Monday"""
-        mutation = '''
-        mutation ($board_id: ID!, $item_id: ID!, $column_id: String!, $value: JSON!) {
-            change_column_value(
+    def build_batch_mutation(self, writes):
+        """Build one GraphQL document that updates several items via aliases
+        
+        Args:
+            writes: list of (item_id, column_values) tuples
+        Returns:
+            (mutation, variables) ready to post to the Monday API
+        """
+        declarations = ["$board_id: ID!"]
+        fields = []
+        variables = {"board_id": BOARD_ID}
+        
+        for index, (item_id, column_values) in enumerate(writes):
+            declarations.append(f"$item_{index}: ID!, $values_{index}: JSON!")
+            fields.append(f"""
+            item_{index}: change_multiple_column_values(
                 board_id: $board_id,
-                item_id: $item_id,
-                column_id: $column_id,
-                value: $value
-            ) {
+                item_id: $item_{index},
+                column_values: $values_{index}
+            ) {{
                 id
-            }
-        }
-        '''
-        
-        variables = {
-            "board_id": BOARD_ID,
-            "item_id": item_id,
-            "column_id": column_id,
-            "value": json.dumps(str(value))
-        }
+            }}""")
+            variables[f"item_{index}"] = str(item_id)
+            variables[f"values_{index}"] = json.dumps(column_values)
         
-        try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.monday_headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return 'errors' not in data
-            return False
-                
-        except Exception as e:
-            return False
+        mutation = f"mutation ({', '.join(declarations)}) {{{''.join(fields)}\n        }}"
+        return mutation, variables
     
-    def update_date_column(self, item_id: str, column_id: str, date_value: str):
-        """Update a date column in Monday"""
-        mutation = '''
-        mutation ($board_id: ID!, $item_id: ID!, $column_id: String!, $value: JSON!) {
-            change_column_value(
-                board_id: $board_id,
-                item_id: $item_id,
-                column_id: $column_id,
-                value: $value
-            ) {
-                id
-            }
-        }
-        '''
+    def sync_items_to_monday(self, writes):
+        """Write all metric columns for several items in one request
         
-        variables = {
-            "board_id": BOARD_ID,
-            "item_id": item_id,
-            "column_id": column_id,
-            "value": json.dumps({"date": date_value})
-        }
+        Batches over Monday's per-query complexity limit are split in half
+        and retried; an exhausted budget is waited out by the client.
+        Returns the set of item IDs that were updated.
+        """
+        if not writes:
+            return set()
+        
+        mutation, variables = self.build_batch_mutation(writes)
         
         try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.monday_headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return 'errors' not in data
-            return False
-                
+            data = self.monday.execute(mutation, variables)
         except Exception as e:
-            return False
+            logging.error(f"Error updating Monday items: {str(e)}")
+            return set()
+        
+        errors = data.get('errors') or []
+        
+        if any('complexity' in str(error).lower() for error in errors) and len(writes) > 1:
+            middle = len(writes) // 2
+            logging.warning(f"Complexity budget exceeded for {len(writes)} items, splitting batch")
+            return self.sync_items_to_monday(writes[:middle]) | self.sync_items_to_monday(writes[middle:])
+        
+        if errors:
+            logging.error(f"API error: {errors}")
+        
+        results = data.get('data') or {}
+        return {
+            str(item_id)
+            for index, (item_id, _) in enumerate(writes)
+            if results.get(f"item_{index}")
+        }
     
     def sync_client_to_monday(self, item_id: str, metrics: dict):
         """Update all metrics for a client in Monday"""
         
-        success_count = 0
-        total_count = 0
+        updated = self.sync_items_to_monday([(item_id, self.build_column_values(metrics))])
+        return str(item_id) in updated
+    
+    def flush_writes(self, writes):
+        """Send one batch of item updates to Monday and record the results"""
         
-        # Update each metric
-        for metric_name, value in metrics.items():
-            if metric_name == 'as_of_date':
-                total_count += 1
-                if self.update_date_column(item_id, FB_METRICS_COLUMNS['fb_as_of_date'], value):
-                    success_count += 1
-                continue
-            
-            if metric_name in FB_METRICS_COLUMNS:
-                column_id = FB_METRICS_COLUMNS[metric_name]
-                total_count += 1
-                
-                if self.update_monday_cell(item_id, column_id, value):
-                    success_count += 1
-                
-                time.sleep(0.15)  # Rate limiting
-        
-        return success_count == total_count
+        if not writes:
+            return
+        
+        updated = self.sync_items_to_monday([(item_id, column_values) for item_id, _, column_values in writes])
+        
+        journaled = self.journal_entries('done', lambda: self.journal.record_done(self.journal_run, [
+            (item_id, column_values) for item_id, _, column_values in writes if str(item_id) in updated
+        ]))
+        
+        for item_id, item_name, column_values in writes:
+            if str(item_id) in updated:
+                self.write_state.record(item_id, column_values)
+                self.count('cells_written', len(column_values))
+                # Written but not journaled: failed, so the run stays open and replays it
+                self.count('success' if journaled else 'failed')
+            else:
+                logging.info(f"  ❌ Update failed: {item_name[:50]}")
+                self.count('failed')
+        
+        logging.info(f"  ✅ Updated {len(updated)}/{len(writes)} queued items")
     
-    def process_item(self, item, index, as_of_date):
-        """Process a single Monday item"""
+    def process_item(self, item, index, as_of_date, metrics_by_cgid):
+        """Build the update for a single Monday item
+        
+        Returns (item_id, item_name, column_values) to send, or None when
+        there is nothing to write.
+        """
         
         item_id = item['id']
         item_name = item['name']
@@ -446,93 +338,248 @@ class ProductionPipeline:
         
         if not cgid:
             logging.info(f"  ⊘ No CGID, skipping")
-            self.stats['no_cgid'] += 1
-            return False
+            self.count('no_cgid')
+            return None
         
         logging.info(f"  CGID: {cgid}")
         
-        # Fetch metrics from BigQuery
-        metrics = self.calculate_metrics(cgid, as_of_date)
+        # Read metrics fetched for every item by fetch_metrics_batch
+        metrics = metrics_by_cgid.get(cgid)
         
         if not metrics:
             logging.info(f"  ⊘ No data in BQ")
-            self.stats['no_data'] += 1
-            return False
+            self.count('no_data')
+            return None
         
         # Display key metrics
-        logging.info(f"  📊 7d: {metrics['fb_leads_7_days']} leads (${metrics['fb_cpl_7_days']} CPL) | 30d: {metrics['fb_leads_30_days']} leads")
+        logging.info(f"  📊 7d: {metrics.get('fb_leads_7_days')} leads (${metrics.get('fb_cpl_7_days')} CPL) | 30d: {metrics.get('fb_leads_30_days')} leads")
+        
+        # Only send cells whose value differs from what was last written; a new as-of date alone still goes out
+        column_values = self.build_column_values(metrics)
+        changed = self.write_state.changed_columns(item_id, column_values)
+        self.count('cells_skipped', len(column_values) - len(changed))
+        
+        if not changed:
+            logging.info(f"  = Unchanged, skipping write")
+            self.count('unchanged')
+            self.count('success')
+            return None
+        
+        return (item_id, item_name, changed)
+    
+    def read_metrics(self, items, as_of_date):
+        """Metrics for every item, with one BigQuery job per source
+        
+        Each source view is scanned once per run whatever the board size.
+        Returns None if the read failed.
+        """
+        try:
+            return self.fetch_metrics_batch([self.extract_cgid(item) for item in items], as_of_date)
+        except Exception as e:
+            logging.error(f"Failed to fetch metrics from BigQuery: {str(e)}")
+            self.count('failed', len(items))
+            with self.stats_lock:
+                self.stats['errors'].append(str(e))
+            return None
+    
+    def queue_chunk(self, chunk, as_of_date, metrics_by_cgid, write_queue):
+        """Build the updates for a chunk of items and queue them for the writers
         
-        # Update Monday board
-        if self.sync_client_to_monday(item_id, metrics):
-            logging.info(f"  ✅ Updated")
-            self.stats['success'] += 1
+        Blocks on the bounded write queue when the writers fall behind.
+        """
+        writes, done = [], []
+        for index, item in chunk:
+            try:
+                write = self.process_item(item, index, as_of_date, metrics_by_cgid)
+            except Exception as e:
+                logging.error(f"Unexpected error: {str(e)}")
+                self.count('failed')
+                continue
+            if write:
+                writes.append(write)
+            else:
+                done.append(item['id'])
+        
+        # Journal the computed values before they go to Monday; a restarted run replays them
+        if not self.journal_entries('pending', lambda: self.journal.record_pending(self.journal_run, writes)):
+            # Never send what the journal doesn't know about; the next run computes these again
+            self.count('failed', len(writes))
+            writes = []
+        if not self.journal_entries('done', lambda: self.journal.record_done(self.journal_run, [(item_id, None) for item_id in done])):
+            self.count('failed', len(done))
+        self.queue_writes(writes, write_queue)
+    
+    def journal_entries(self, status, record):
+        """Run one journal write; returns False, logged and kept in errors, if it failed"""
+        try:
+            record()
             return True
-        else:
-            logging.info(f"  ❌ Update failed")
-            self.stats['failed'] += 1
+        except Exception as e:
+            logging.error(f"❌ Could not journal {status} items: {str(e)}")
+            with self.stats_lock:
+                self.stats['errors'].append(f"journal: {e}")
             return False
     
-    def run(self):
-        """Run the production pipeline"""
+    def queue_writes(self, writes, write_queue):
+        """Hand writes to the writer stage in batches of MONDAY_ITEMS_PER_MUTATION"""
+        for start in range(0, len(writes), MONDAY_ITEMS_PER_MUTATION):
+            write_queue.put(writes[start:start + MONDAY_ITEMS_PER_MUTATION])
+    
+    def write_batches(self, write_queue):
+        """Writer stage: send queued batches to Monday until a None sentinel arrives"""
+        while True:
+            batch = write_queue.get()
+            if batch is None:
+                return
+            try:
+                self.flush_writes(batch)
+            except Exception as e:
+                logging.error(f"Unexpected error writing to Monday: {str(e)}")
+                self.count('failed', len(batch))
+    
+    def run(self, deadline=None, cursor=None):
+        """Run the production pipeline
+        
+        Args:
+            deadline: Deadline after which no more chunks are read
+            cursor: continuation cursor from an earlier invocation of this run
+        """
+        self.deadline = deadline or Deadline()
         
         start_time = datetime.now()
+        http_transport.reset_stats()
         
         logging.info("="*70)
         logging.info("🚀 PRODUCTION RUN - FB Metrics Sync")
         logging.info(f"Started at: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
         logging.info("="*70)
         
-        # Initialize BigQuery
-        if not self.init_bigquery():
-            logging.error("Failed to initialize BigQuery")
-            return False
+        # Import the BigQuery client in the background while the Monday items are fetched
+        warehouse.preload()
         
-        # Get all items from Monday
+        # Get items from Monday (incremental after the first run)
         items = self.get_all_items()
         if not items:
             logging.error("Failed to fetch items from Monday")
             return False
         
+        # Initialize BigQuery (one client per process, reused by warm invocations)
+        if not self.init_bigquery():
+            logging.error("Failed to initialize BigQuery")
+            return False
+        
         # Filter items by group
         logging.info(f"\nFiltering items by groups...")
         logging.info(f"  Include groups: {INCLUDE_GROUPS}")
         logging.info(f"  Exclude groups: {EXCLUDE_GROUPS}")
         
-        filtered_items = [item for item in items if self.should_process_item(item)]
-        self.stats['filtered_out'] = len(items) - len(filtered_items)
+        # Ordered by item ID, so a continuation cursor's position means the same items on any instance
+        filtered_items = sorted((item for item in items if self.should_process_item(item)), key=lambda item: int(item['id']))
         self.stats['total'] = len(filtered_items)
         
-        logging.info(f"  Total items: {len(items)}")
-        logging.info(f"  Filtered out: {self.stats['filtered_out']}")
         logging.info(f"  To process: {len(filtered_items)}")
         
         if not filtered_items:
             logging.warning("No items to process after filtering")
             return False
         
-        # Calculate as of date (yesterday)
-        as_of_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        # Calculate as of date (yesterday); a continuation keeps the date its run started with
+        as_of_date = cursor['as_of_date'] if cursor else (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
         logging.info(f"\n📅 Using data as of: {as_of_date}")
         
-        # Process each filtered item
+        # Load what was last written; a forced full refresh rewrites every cell
+        self.write_state.load()
+        if MONDAY_FULL_REFRESH or self.catalog.last_refresh['mode'] == 'full':
+            # Without the activity log since the last run, any cell may have been edited on the board
+            self.write_state.reset()
+        else:
+            edited = self.write_state.invalidate(self.catalog.cell_activity)
+            self.count('cells_edited_on_board', edited)
+            if edited:
+                logging.info(f"✏️ {edited} cells were changed on the board since they were written; writing them again")
+        
+        # Resume an unfinished run for this as-of date: skip done items, replay pending writes
+        self.journal = self.open_journal()
+        self.journal_run = self.journal.open_run(run_key(BOARD_ID, as_of_date))
+        replay = []
+        if self.journal_run.resumed:
+            done_ids = self.journal_run.done()
+            # Cells acknowledged before the interruption never reached the saved write state
+            for item_id, column_values in self.journal_run.acknowledged().items():
+                self.write_state.record(item_id, column_values)
+            pending = {str(item_id): (item_id, item_name, column_values)
+                       for item_id, item_name, column_values in self.journal_run.pending()}
+            replay = [pending[str(item['id'])] for item in filtered_items if str(item['id']) in pending]
+            remaining = [item for item in filtered_items if str(item['id']) not in done_ids and str(item['id']) not in pending]
+            self.count('resumed_done', len(filtered_items) - len(remaining) - len(replay))
+            self.count('replayed', len(replay))
+            logging.info(f"\n♻️ Resuming run {self.journal_run.run_id}: {self.stats['resumed_done']} items done, "
+                         f"{len(replay)} pending writes to replay, {len(remaining)} items left to read")
+            filtered_items = remaining
+        
+        # A continuation starts at its cursor's item, even if the journal of earlier invocations is lost
+        next_item_id = (cursor or {}).get('next_item_id')
+        if next_item_id is not None:
+            earlier = [item for item in filtered_items if int(item['id']) < int(next_item_id)]
+            filtered_items = filtered_items[len(earlier):]
+            self.count('earlier_invocations', len(earlier))
+            logging.info(f"\n⏩ Continuing from item {next_item_id}: {len(earlier)} items were handled by earlier invocations")
+        
+        # One BigQuery read for every item, then writers send the updates to Monday chunk by chunk
         logging.info("\n" + "="*70)
-        logging.info("Processing items...")
+        logging.info(f"Processing items (one BigQuery read per source, {MONDAY_WRITER_WORKERS} Monday writers)...")
         logging.info("="*70)
         
-        for index, item in enumerate(filtered_items, start=1):
-            try:
-                self.process_item(item, index, as_of_date)
-            except Exception as e:
-                logging.error(f"Unexpected error: {str(e)}")
-                self.stats['failed'] += 1
+        indexed_items = list(enumerate(filtered_items, start=1))
+        chunks = [indexed_items[i:i + MONDAY_ITEMS_PER_MUTATION] for i in range(0, len(indexed_items), MONDAY_ITEMS_PER_MUTATION)]
+        write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        
+        writers = [
+            threading.Thread(target=self.write_batches, args=(write_queue,), daemon=True)
+            for _ in range(MONDAY_WRITER_WORKERS)
+        ]
+        for writer in writers:
+            writer.start()
+        
+        try:
+            # Journaled writes from the interrupted run go out first, while BigQuery is read
+            for item_id, item_name, _ in replay:
+                logging.info(f"  ↻ Replaying journaled write: {item_name[:50]}")
+            self.queue_writes(replay, write_queue)
             
-            # Progress indicator every 10 items
-            if index % 10 == 0:
-                logging.info(f"\n--- Progress: {index}/{len(filtered_items)} items processed ---")
+            metrics_by_cgid = self.read_metrics(filtered_items, as_of_date) if filtered_items else None
+            if metrics_by_cgid is not None:
+                for done, chunk in enumerate(chunks, start=1):
+                    # The first chunk always goes out, so every continuation moves the cursor forward
+                    if done > 1 and self.deadline.expired():
+                        next_item_id = chunk[0][1]['id']
+                        self.count('deferred', sum(len(rest) for rest in chunks[done - 1:]))
+                        break
+                    self.queue_chunk(chunk, as_of_date, metrics_by_cgid, write_queue)
+                    logging.info(f"\n--- Progress: {done}/{len(chunks)} chunks queued for Monday ---")
+        finally:
+            # One sentinel per writer, even if queueing failed, so the writers drain and stop
+            for _ in writers:
+                write_queue.put(None)
+            for writer in writers:
+                writer.join()
+        
+        self.write_state.save()
+        
+        # Items that failed or were deferred stay pending or unjournaled, so the next run picks them up
+        if self.stats['deferred']:
+            self.cursor = {'as_of_date': as_of_date, 'next_item_id': str(next_item_id), 'remaining_items': self.stats['deferred']}
+            logging.info(f"\n⏱️ Time budget spent, {self.stats['deferred']} items deferred to the next invocation")
+        elif self.stats['failed'] == 0:
+            # If this fails the next run resumes a run with every item done, which writes nothing
+            self.journal_entries('finished', lambda: self.journal.finish_run(self.journal_run))
         
         # Print summary
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
+        self.stats['http'] = http_transport.request_stats()
+        self.stats['monday_budget'] = self.monday.budget_stats()
+        self.stats['time_budget'] = self.deadline.stats()
         
         self.print_summary(duration)
         
@@ -544,18 +591,35 @@ class ProductionPipeline:
         logging.info("📊 EXECUTION SUMMARY")
         logging.info("="*70)
         logging.info(f"Duration: {duration:.1f} seconds")
-        logging.info(f"\nTotal Items on Board: {self.stats['total'] + self.stats['filtered_out']}")
-        logging.info(f"Filtered Out (wrong groups): {self.stats['filtered_out']}")
-        logging.info(f"Items Processed: {self.stats['total']}")
+        # Items finished by an interrupted run or an earlier invocation were not processed by this one
+        processed = self.stats['total'] - self.stats['resumed_done'] - self.stats['earlier_invocations']
+        logging.info(f"\nItems in Included Groups: {self.stats['total']}")
+        logging.info(f"Items Processed: {processed}")
         logging.info(f"\n✅ Successfully Updated: {self.stats['success']}")
         logging.info(f"⊘ No CGID: {self.stats['no_cgid']}")
         logging.info(f"⊘ No Data in BQ: {self.stats['no_data']}")
         logging.info(f"❌ Failed: {self.stats['failed']}")
-        
-        if self.stats['total'] > 0:
-            success_rate = (self.stats['success'] / self.stats['total'] * 100)
+        logging.info(f"= Unchanged (no write): {self.stats['unchanged']}")
+        logging.info(f"⏱️ Deferred to next invocation: {self.stats['deferred']}")
+        logging.info(f"Cells written: {self.stats['cells_written']} | Cells skipped: {self.stats['cells_skipped']} | "
+                     f"Changed on board since written: {self.stats['cells_edited_on_board']}")
+        if self.stats['earlier_invocations']:
+            logging.info(f"⏩ Handled by earlier invocations: {self.stats['earlier_invocations']}")
+        if self.journal_run and self.journal_run.resumed:
+            logging.info(f"♻️ Resumed run: {self.stats['resumed_done']} items already done, {self.stats['replayed']} writes replayed")
+        
+        if processed > 0:
+            success_rate = (self.stats['success'] / processed * 100)
             logging.info(f"\n✨ Success Rate: {success_rate:.1f}%")
         
+        budget = self.stats.get('monday_budget')
+        if budget:
+            logging.info(f"⏳ Monday budget: {budget['requests']} requests, {budget['paced_waits']} paced waits, "
+                         f"{budget['exhausted_retries']} exhausted retries, {budget['waited_seconds']:.1f}s waiting")
+        
+        for host, counters in self.stats.get('http', {}).items():
+            logging.info(f"🌐 {host}: {counters['requests']} requests, {counters['retries']} retries, {counters['errors']} errors, avg {counters['avg_ms']}ms, max {counters['max_ms']}ms")
+        
         logging.info("="*70)
 
 def main(request=None):
@@ -565,10 +629,25 @@ def main(request=None):
         request: Flask request object (for Cloud Functions)
     """
     try:
+        # Requests get a time budget and may carry a cursor; local runs go to the end
+        request_json = (request.get_json(silent=True) or {}) if request else {}
+        deadline = Deadline.for_request(request_json) if request else Deadline()
+        
         pipeline = ProductionPipeline()
-        success = pipeline.run()
+        success = pipeline.run(deadline, request_json.get('cursor'))
         
         # Return response for Cloud Functions
+        if request and pipeline.cursor:
+            if JOURNAL_BACKEND != 'bigquery':
+                # The cursor still moves the continuation forward, but pending writes and failures stay on this instance
+                logging.warning("⚠️ JOURNAL_BACKEND is not bigquery; the continuation skips to the cursor item "
+                                "without retrying this invocation's pending or failed items")
+            return {
+                'status': 'in_progress',
+                'cursor': pipeline.cursor,
+                'continuation_task': enqueue_continuation(continuation_payload(request_json, pipeline.cursor)),
+                'stats': pipeline.stats
+            }, 202
         if request:
             return {
                 'status': 'success' if success else 'partial_success',
@@ -1,9 +1,10 @@
-import requests
+import http_transport
 import json
-import time
 import logging
 from datetime import datetime, timedelta
-from google.cloud import bigquery
+import warehouse
+import bq_results
+from monday_client import MondayClient
 
 # Configure logging
 logging.basicConfig(
@@ -45,6 +46,7 @@ LEAD_COLUMNS = [
 class ProductionPipeline:
     def __init__(self):
         self.monday_headers = {"Authorization": MONDAY_API_TOKEN}
+        self.monday = MondayClient(MONDAY_API_URL, self.monday_headers, timeout=30)
         self.bq_client = None
         self.stats = {
             'total': 0,
@@ -58,7 +60,7 @@ class ProductionPipeline:
         """Initialize BigQuery client"""
         logging.info("Initializing BigQuery connection...")
         try:
-            self.bq_client = bigquery.Client(project=PROJECT_ID)
+            self.bq_client = warehouse.get_client(PROJECT_ID)
             logging.info("✅ BigQuery client initialized")
             return True
         except Exception as e:
@@ -87,7 +89,7 @@ class ProductionPipeline:
         '''
         
         try:
-            response = requests.post(
+            response = http_transport.post(
                 MONDAY_API_URL,
                 json={
                     "query": query, 
@@ -141,13 +143,11 @@ class ProductionPipeline:
             GROUP BY cgid, client_name
             """
             
-            df = self.bq_client.query(query).to_dataframe()
+            row = bq_results.first_row(self.bq_client.query(query))
             
-            if len(df) == 0:
+            if row is None:
                 return None
             
-            row = df.iloc[0]
-            
             # Calculate total leads
             total_leads = (
                 row['survey_leads'] + 
@@ -268,21 +268,8 @@ class ProductionPipeline:
         }
         
         try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.monday_headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'errors' not in data:
-                    return True
-                else:
-                    return False
-            else:
-                return False
+            data = self.monday.execute(mutation, variables)
+            return 'errors' not in data
                 
         except Exception as e:
             return False
@@ -310,18 +297,8 @@ class ProductionPipeline:
         }
         
         try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.monday_headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'errors' not in data:
-                    return True
-            return False
+            data = self.monday.execute(mutation, variables)
+            return 'errors' not in data
                 
         except Exception as e:
             return False
@@ -347,8 +324,6 @@ class ProductionPipeline:
                 
                 if self.update_monday_cell(item_id, column_id, value):
                     success_count += 1
-                
-                time.sleep(0.15)  # Rate limiting
         
         return success_count == total_count
     
@@ -0,0 +1,282 @@
+"""Daily metric series with prefix sums for arbitrary metric windows.
+
+Each source (e.g. Meta) is read with one BigQuery job for all the
+board's CGIDs, returning a daily series (row count plus the source's
+summed series, e.g. leads and spend) covering the widest configured
+window. The series are held as NumPy arrays with cumulative sums along
+the date axis, so any window total, CPL or daily average is the
+difference of two prefix sums, whatever the window.
+
+Sources, windows and the Monday columns computed from them are declared
+in metric_windows.json (override with METRIC_WINDOWS_PATH), so a new
+14-day or 90-day column needs a config entry and no extra query. Every
+column names the Monday column it is written to (monday_column), and
+only sources with at least one column are read.
+
+Window types:
+    trailing        {"days": N, "offset_days": 0}  N days ending offset_days before the as-of date
+    month_to_date   first of the as-of month to the as-of date
+    last_month      the calendar month before the as-of month
+
+Sources:
+    view            dataset.view to read, qualified with the project at query time
+    date_column     DATE column of the view (default report_date)
+    series          {name: [view columns summed into it]}
+    unique_by       columns identifying one row per CGID and day when the
+                    view repeats them (e.g. once per mapping month)
+
+Measures: rows, any series of the column's source, cpl (spend / leads)
+and avg_daily_<measure>. spend, cpl and daily averages are rounded to
+cents; every other measure is a whole number.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+import bq_results
+
+METRIC_WINDOWS_PATH = os.environ.get(
+    'METRIC_WINDOWS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metric_windows.json')
+)
+EPOCH = date(1970, 1, 1)
+AVG_DAILY_PREFIX = 'avg_daily_'
+DECIMAL_MEASURES = ('spend', 'cpl')
+
+
+def window_bounds(spec, as_of):
+    """(start, end) dates, inclusive, of one window for an as-of date."""
+    kind = spec['type']
+    if kind == 'trailing':
+        end = as_of - timedelta(days=spec.get('offset_days', 0))
+        return end - timedelta(days=spec['days'] - 1), end
+    if kind == 'month_to_date':
+        return as_of.replace(day=1), as_of
+    if kind == 'last_month':
+        end = as_of.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    raise ValueError(f"Unknown window type: {kind}")
+
+
+class MetricSource:
+    """One view read per batch of CGIDs, summed into named daily series."""
+
+    def __init__(self, name, view, series, date_column='report_date', unique_by=()):
+        self.name = name
+        self.view = view
+        self.series = series
+        self.date_column = date_column
+        self.unique_by = list(unique_by)
+
+    @classmethod
+    def from_config(cls, name, spec):
+        return cls(name, spec['view'], spec['series'], spec.get('date_column', 'report_date'), spec.get('unique_by', ()))
+
+    def query(self, project):
+        """Daily totals of every series per CGID between @scan_start and @scan_end."""
+        sums = ',\n                '.join(
+            f"SUM({' + '.join(f'COALESCE({column}, 0)' for column in columns)}) AS {name}"
+            for name, columns in self.series.items()
+        )
+        source = f"`{project}.{self.view}`"
+        where = f"""WHERE cgid IN UNNEST(@cgids)
+              AND {self.date_column} BETWEEN @scan_start AND @scan_end"""
+        if self.unique_by:
+            # Keep one row per unit (e.g. location) and day before summing
+            keys = ', '.join(self.unique_by)
+            columns = sorted({column for columns in self.series.values() for column in columns})
+            picked = ', '.join(f"MAX({column}) AS {column}" for column in columns)
+            source = f"""(
+                SELECT cgid, {self.date_column}, {keys}, {picked}
+                FROM {source}
+                {where}
+                GROUP BY cgid, {self.date_column}, {keys}
+            )"""
+            where = ''
+        return f"""
+            SELECT
+                cgid,
+                {self.date_column} AS report_date,
+                {sums},
+                COUNT(*) AS row_count
+            FROM {source}
+            {where}
+            GROUP BY cgid, {self.date_column}
+        """
+
+
+class MetricConfig:
+    """Metric sources and windows, and the Monday columns computed from them."""
+
+    def __init__(self, windows, columns, sources, as_of_date_column=None):
+        for name, column in columns.items():
+            if column['window'] not in windows:
+                raise ValueError(f"Column {name} uses undefined window {column['window']}")
+            if column['source'] not in sources:
+                raise ValueError(f"Column {name} uses undefined source {column['source']}")
+            if not column.get('monday_column'):
+                raise ValueError(f"Column {name} has no monday_column")
+        self.windows = windows
+        self.columns = columns
+        self.sources = sources
+        self.as_of_date_column = as_of_date_column
+
+    @classmethod
+    def load(cls, path=None):
+        with open(path or METRIC_WINDOWS_PATH) as f:
+            config = json.load(f)
+        sources = {name: MetricSource.from_config(name, spec) for name, spec in config['sources'].items()}
+        return cls(config['windows'], config['columns'], sources, config.get('as_of_date_column'))
+
+    def monday_columns(self):
+        """{metric name: Monday column ID}, including fb_as_of_date."""
+        columns = {name: column['monday_column'] for name, column in self.columns.items()}
+        if self.as_of_date_column:
+            columns['fb_as_of_date'] = self.as_of_date_column
+        return columns
+
+    def source_columns(self, source):
+        return {name: column for name, column in self.columns.items() if column['source'] == source}
+
+    def active_sources(self):
+        """Sources with at least one configured column, in config order."""
+        return [source for name, source in self.sources.items() if self.source_columns(name)]
+
+    def window_ranges(self, as_of):
+        return {name: window_bounds(spec, as_of) for name, spec in self.windows.items()}
+
+    def scan_range(self, as_of):
+        """Widest date range any window needs."""
+        ranges = self.window_ranges(as_of).values()
+        return min(start for start, _ in ranges), max(end for _, end in ranges)
+
+    def fetch_metrics(self, client, project, cgids, as_of, on_error=None):
+        """{cgid: metrics} across every source, with one BigQuery job per source.
+
+        All jobs are started before any result is read, so the sources
+        are queried concurrently. A CGID gets a source's columns only if
+        that source has rows for it in one of their windows. With
+        on_error(source, error), a failing source is reported and left
+        out instead of failing the whole batch.
+        """
+        cgids = list(cgids)
+        start, end = self.scan_range(as_of)
+        jobs = []
+        for source in self.active_sources():
+            try:
+                jobs.append((source, start_daily_series(client, project, source, cgids, start, end)))
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(source, e)
+
+        metrics = {}
+        for source, job in jobs:
+            try:
+                series = read_daily_series(job, source, cgids, start, end)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(source, e)
+                continue
+            for cgid, values in series.compute_metrics(self, as_of, source.name).items():
+                metrics.setdefault(cgid, {'as_of_date': as_of.isoformat()}).update(values)
+        return metrics
+
+
+class DailySeries:
+    """Daily values per key (CGID) with prefix sums along the date axis."""
+
+    def __init__(self, keys, start, values):
+        self.keys = list(keys)
+        self.start = start
+        self.days = next(iter(values.values())).shape[1] if values else 0
+        # prefix[name][:, i] is the total of the first i days, so a window is two lookups
+        self.prefix = {
+            name: np.concatenate([np.zeros((len(self.keys), 1)), np.cumsum(series, axis=1)], axis=1)
+            for name, series in values.items()
+        }
+
+    @classmethod
+    def from_arrow(cls, table, keys, start, end, columns, key_column='cgid', date_column='report_date'):
+        """Build the series from an Arrow table with one row per key and date."""
+        import pyarrow
+        import pyarrow.compute as pc
+
+        keys = list(keys)
+        days = (end - start).days + 1
+        values = {name: np.zeros((len(keys), days)) for name in columns}
+        if table.num_rows:
+            key_index = pc.index_in(table[key_column], value_set=pyarrow.array(keys, type=table[key_column].type))
+            key_index = key_index.fill_null(-1).to_numpy(zero_copy_only=False)
+            day_index = table[date_column].cast(pyarrow.int32()).to_numpy(zero_copy_only=False) - (start - EPOCH).days
+            valid = (key_index >= 0) & (day_index >= 0) & (day_index < days)
+            for name in columns:
+                column = table[name].fill_null(0).cast(pyarrow.float64()).to_numpy(zero_copy_only=False)
+                np.add.at(values[name], (key_index[valid], day_index[valid]), column[valid])
+        return cls(keys, start, values)
+
+    def window_total(self, name, start, end):
+        """Total of one series over [start, end] for every key."""
+        first = min(max((start - self.start).days, 0), self.days)
+        last = min(max((end - self.start).days + 1, 0), self.days)
+        if last <= first:
+            return np.zeros(len(self.keys))
+        prefix = self.prefix[name]
+        # Differences of large prefix sums carry float noise; drop it before rounding to cents
+        return np.round(prefix[:, last] - prefix[:, first], 6)
+
+    def measure(self, measure, start, end):
+        """Values of one measure over [start, end] for every key."""
+        if measure == 'cpl':
+            leads = self.window_total('leads', start, end)
+            spend = self.window_total('spend', start, end)
+            return np.divide(spend, leads, out=np.zeros_like(spend), where=leads > 0)
+        if measure.startswith(AVG_DAILY_PREFIX):
+            return self.measure(measure[len(AVG_DAILY_PREFIX):], start, end) / ((end - start).days + 1)
+        if measure not in self.prefix:
+            raise ValueError(f"Unknown measure: {measure}")
+        return self.window_total(measure, start, end)
+
+    def compute_metrics(self, config, as_of, source):
+        """{key: metrics} of one source's columns, for keys with rows in any of their windows."""
+        columns = config.source_columns(source)
+        ranges = config.window_ranges(as_of)
+        has_data = np.zeros(len(self.keys), dtype=bool)
+        for window in {column['window'] for column in columns.values()}:
+            has_data |= self.window_total('rows', *ranges[window]) > 0
+
+        computed = {}
+        for name, column in columns.items():
+            values = self.measure(column['measure'], *ranges[column['window']])
+            if column['measure'] in DECIMAL_MEASURES or column['measure'].startswith(AVG_DAILY_PREFIX):
+                computed[name] = [round(float(value), 2) for value in values]
+            else:
+                computed[name] = [int(round(value)) for value in values]
+
+        return {
+            key: {name: values[index] for name, values in computed.items()}
+            for index, key in enumerate(self.keys)
+            if has_data[index]
+        }
+
+
+def start_daily_series(client, project, source, cgids, start, end):
+    """Start one source's daily series job for many CGIDs."""
+    from google.cloud import bigquery
+
+    job_config = bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ArrayQueryParameter('cgids', 'STRING', list(cgids)),
+        bigquery.ScalarQueryParameter('scan_start', 'DATE', start),
+        bigquery.ScalarQueryParameter('scan_end', 'DATE', end)
+    ])
+    return client.query(source.query(project), job_config=job_config)
+
+
+def read_daily_series(job, source, cgids, start, end):
+    """Wait for a daily series job and load its rows into a DailySeries."""
+    table = bq_results.arrow_table(job)
+    table = table.rename_columns(['rows' if name == 'row_count' else name for name in table.column_names])
+    return DailySeries.from_arrow(table, cgids, start, end, list(source.series) + ['rows'])
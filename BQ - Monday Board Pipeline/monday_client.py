@@ -0,0 +1,140 @@
+"""Monday GraphQL client paced by the account's complexity budget.
+
+Every query also asks for `complexity { before after query reset_in_x_seconds }`,
+so the client always knows how much budget is left and when it resets.
+Requests are sent freely while the budget lasts and held back once the next
+one would dig into the last (1 - target_utilization) of it. When Monday
+reports the budget as exhausted (or answers 429) the client waits exactly
+as long as Monday says and sends the same request again, instead of
+failing the item.
+"""
+import logging
+import re
+import threading
+import time
+
+import http_transport
+
+COMPLEXITY_FIELD = 'complexity { before after query reset_in_x_seconds }'
+RESET_IN_PATTERN = re.compile(r'reset in (\d+) seconds?', re.IGNORECASE)
+
+
+def add_complexity_field(query):
+    """Request the complexity budget alongside the query's own fields."""
+    opening = query.index('{')
+    return f"{query[:opening + 1]}\n    {COMPLEXITY_FIELD}{query[opening + 1:]}"
+
+
+def budget_exhausted_wait(errors):
+    """Seconds Monday asks us to wait if an error is budget exhaustion, else None."""
+    for error in errors or []:
+        extensions = error.get('extensions') or {}
+        message = str(error.get('message', ''))
+        if extensions.get('code') != 'COMPLEXITY_BUDGET_EXHAUSTED' and 'budget exhausted' not in message.lower():
+            continue
+        if extensions.get('retry_in_seconds') is not None:
+            return float(extensions['retry_in_seconds'])
+        match = RESET_IN_PATTERN.search(message)
+        return float(match.group(1)) if match else 60.0
+    return None
+
+
+class MondayClient:
+    """Monday API client that paces itself against the complexity budget."""
+
+    def __init__(self, api_url, headers, target_utilization=0.9, max_attempts=5, timeout=60):
+        self.api_url = api_url
+        self.headers = headers
+        self.target_utilization = target_utilization
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.budget = None       # Budget per reset period, learned from `before`
+        self.remaining = None    # Live estimate of what's left
+        self.reset_at = 0.0      # time.monotonic() when the budget refills
+        self.costs = {}          # query text -> last reported cost
+        self.stats = {'requests': 0, 'paced_waits': 0, 'exhausted_retries': 0, 'waited_seconds': 0.0}
+
+    def reserve(self, query):
+        """Wait until sending a query keeps us within the target share of the budget."""
+        while True:
+            with self.lock:
+                cost = self.costs.get(query, 0)
+                now = time.monotonic()
+                if self.remaining is None or now >= self.reset_at:
+                    if self.budget is not None and now >= self.reset_at:
+                        self.remaining = self.budget
+                    wait = 0
+                else:
+                    floor = self.budget * (1 - self.target_utilization)
+                    wait = self.reset_at - now if self.remaining - cost < floor else 0
+                if not wait:
+                    if self.remaining is not None:
+                        # Hold the cost so concurrent writers don't all spend the same budget
+                        self.remaining -= cost
+                    return
+                self.stats['paced_waits'] += 1
+                self.stats['waited_seconds'] += wait
+            logging.info(f"⏳ Monday budget at {self.remaining}/{self.budget}, waiting {wait:.1f}s for reset")
+            time.sleep(wait)
+
+    def update_budget(self, query, complexity):
+        if not complexity:
+            return
+        with self.lock:
+            self.budget = max(self.budget or 0, complexity['before'])
+            self.remaining = complexity['after']
+            self.reset_at = time.monotonic() + complexity['reset_in_x_seconds']
+            self.costs[query] = complexity.get('query') or complexity['before'] - complexity['after']
+
+    def wait_for_reset(self, seconds):
+        with self.lock:
+            self.remaining = 0
+            self.reset_at = time.monotonic() + seconds
+            self.stats['exhausted_retries'] += 1
+            self.stats['waited_seconds'] += seconds
+        logging.warning(f"⏳ Monday budget exhausted, retrying in {seconds:.0f}s")
+        time.sleep(seconds)
+
+    def execute(self, query, variables=None, timeout=None):
+        """Send a query or mutation and return the parsed response body.
+
+        Budget exhaustion is waited out and retried. Raises RuntimeError on
+        other HTTP failures; GraphQL errors are left in the body for callers.
+        """
+        tracked_query = add_complexity_field(query)
+        payload = {"query": tracked_query}
+        if variables is not None:
+            payload["variables"] = variables
+
+        for attempt in range(1, self.max_attempts + 1):
+            self.reserve(query)
+            with self.lock:
+                self.stats['requests'] += 1
+            # 429s are waited out below, not retried by the transport as well
+            response = http_transport.post(
+                self.api_url,
+                json=payload,
+                headers=self.headers,
+                timeout=timeout or self.timeout,
+                handles_rate_limits=True
+            )
+            if response.status_code == 429:
+                wait = float(response.headers.get('Retry-After') or 60)
+            elif response.status_code != 200:
+                raise RuntimeError(f"HTTP error: {response.status_code}")
+            else:
+                body = response.json()
+                data = body.get('data') or {}
+                self.update_budget(query, data.pop('complexity', None))
+                wait = budget_exhausted_wait(body.get('errors'))
+                if wait is None:
+                    return body
+            if attempt < self.max_attempts:
+                self.wait_for_reset(wait)
+
+        raise RuntimeError(f"Monday budget still exhausted after {self.max_attempts} attempts")
+
+    def budget_stats(self):
+        with self.lock:
+            return dict(self.stats, waited_seconds=round(self.stats['waited_seconds'], 1), budget=self.budget, remaining=self.remaining)
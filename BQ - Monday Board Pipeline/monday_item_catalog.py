@@ -0,0 +1,227 @@
+"""Incremental catalog of the Monday board items the metrics sync processes.
+
+Only items in the included groups are read, and only their CGID column.
+A local JSON snapshot (item id -> item with CGID and group)
+is kept between runs. Later runs read the board's activity log since the
+last sync and refetch just the items that changed, so board reads scale
+with the number of changes instead of the board size.
+
+Activity on the ignored (metric) columns doesn't refetch an item, but is
+kept in cell_activity, so the sync can tell when a written cell was
+changed on the board afterwards.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+ITEM_FIELDS = '''
+    id
+    name
+    state
+    group {
+        id
+        title
+    }
+    column_values(ids: $column_ids) {
+        id
+        value
+    }
+'''
+
+# Activity logs don't go back forever; past this age do a full refresh instead
+MAX_SNAPSHOT_AGE = timedelta(days=7)
+# Re-read a little before the last sync to cover clock skew between us and Monday
+ACTIVITY_LOG_OVERLAP = timedelta(minutes=5)
+
+
+class ItemCatalog:
+    """Snapshot of included board items, refreshed from Monday's activity log."""
+
+    def __init__(self, path, client, board_id, include_groups, cgid_column, ignore_columns=()):
+        self.path = path
+        self.client = client
+        self.board_id = str(board_id)
+        self.include_groups = list(include_groups)
+        self.cgid_column = cgid_column
+        self.ignore_columns = set(ignore_columns)
+        self.items = {}
+        self.synced_at = None
+        self.cell_activity = {}  # item id -> {ignored column id: epoch seconds of its latest change}
+        self.last_refresh = {'mode': None, 'changed_items': 0, 'requests': 0}
+
+    def graphql(self, query, variables):
+        """Run one GraphQL request and return its data, raising on errors."""
+        self.last_refresh['requests'] += 1
+        data = self.client.execute(query, variables)
+        if 'errors' in data:
+            raise RuntimeError(f"API error: {data['errors']}")
+        return data['data']
+
+    def load(self):
+        """Load the snapshot if it belongs to this board and group list."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable item catalog {self.path}: {str(e)}")
+            return False
+        if snapshot.get('board_id') != self.board_id or snapshot.get('include_groups') != self.include_groups:
+            return False
+        self.items = snapshot.get('items', {})
+        self.synced_at = datetime.fromisoformat(snapshot['synced_at'])
+        return True
+
+    def save(self):
+        snapshot = {
+            'board_id': self.board_id,
+            'include_groups': self.include_groups,
+            'synced_at': self.synced_at.isoformat(),
+            'items': self.items
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, force_full=False):
+        """Bring the catalog up to date and return its items.
+
+        Uses the activity log when a recent snapshot exists, otherwise
+        reads the included groups in full.
+        """
+        self.last_refresh = {'mode': None, 'changed_items': 0, 'requests': 0}
+        self.cell_activity = {}
+        started_at = datetime.utcnow()
+        loaded = not force_full and self.load()
+        if loaded and started_at - self.synced_at < MAX_SNAPSHOT_AGE:
+            try:
+                self.incremental_refresh(self.synced_at - ACTIVITY_LOG_OVERLAP)
+                self.last_refresh['mode'] = 'incremental'
+            except Exception as e:
+                logging.warning(f"Incremental item refresh failed, doing a full refresh: {str(e)}")
+                self.full_refresh()
+        else:
+            self.full_refresh()
+        self.synced_at = started_at
+        self.save()
+        return list(self.items.values())
+
+    def full_refresh(self):
+        """Read every item in the included groups."""
+        logging.info(f"Fetching items from groups {self.include_groups}...")
+        self.last_refresh['mode'] = 'full'
+        query = f'''
+        query ($board_id: ID!, $group_ids: [String], $column_ids: [String!]) {{
+            boards(ids: [$board_id]) {{
+                groups(ids: $group_ids) {{
+                    id
+                    items_page(limit: 100) {{
+                        cursor
+                        items {{ {ITEM_FIELDS} }}
+                    }}
+                }}
+            }}
+        }}
+        '''
+        next_page_query = f'''
+        query ($cursor: String!, $column_ids: [String!]) {{
+            next_items_page(limit: 100, cursor: $cursor) {{
+                cursor
+                items {{ {ITEM_FIELDS} }}
+            }}
+        }}
+        '''
+        data = self.graphql(query, {
+            "board_id": self.board_id,
+            "group_ids": self.include_groups,
+            "column_ids": [self.cgid_column]
+        })
+        items = {}
+        for group in data['boards'][0]['groups']:
+            page = group['items_page']
+            group_items = 0
+            while True:
+                for item in page['items']:
+                    items[str(item['id'])] = item
+                group_items += len(page['items'])
+                logging.info(f"  Group {group['id']}: {group_items} items so far")
+                if not page.get('cursor'):
+                    break
+                page = self.graphql(next_page_query, {
+                    "cursor": page['cursor'],
+                    "column_ids": [self.cgid_column]
+                })['next_items_page']
+        self.items = items
+        self.last_refresh['changed_items'] = len(items)
+
+    def changed_item_ids(self, since):
+        """IDs of items with any activity on the board since a timestamp."""
+        query = '''
+        query ($board_id: ID!, $from: ISO8601DateTime, $page: Int) {
+            boards(ids: [$board_id]) {
+                activity_logs(from: $from, limit: 500, page: $page) {
+                    created_at
+                    data
+                }
+            }
+        }
+        '''
+        item_ids = set()
+        page = 1
+        while True:
+            logs = self.graphql(query, {
+                "board_id": self.board_id,
+                "from": since.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                "page": page
+            })['boards'][0]['activity_logs']
+            for log in logs:
+                try:
+                    data = json.loads(log['data'])
+                except (TypeError, ValueError):
+                    continue
+                item_id = data.get('pulse_id') or data.get('item_id')
+                if not item_id:
+                    continue
+                # Metric cells don't change anything the catalog stores; just note when they changed
+                if data.get('column_id') in self.ignore_columns:
+                    self.note_cell_activity(str(item_id), data['column_id'], log.get('created_at'))
+                    continue
+                item_ids.add(str(item_id))
+            if len(logs) < 500:
+                return item_ids
+            page += 1
+
+    def note_cell_activity(self, item_id, column_id, created_at):
+        try:
+            # created_at is a 17-digit unix time in units of 100ns
+            changed_at = int(created_at) / 10_000_000
+        except (TypeError, ValueError):
+            return
+        columns = self.cell_activity.setdefault(item_id, {})
+        columns[column_id] = max(columns.get(column_id, 0), changed_at)
+
+    def incremental_refresh(self, since):
+        """Refetch only items with activity since the last sync."""
+        item_ids = sorted(self.changed_item_ids(since))
+        logging.info(f"{len(item_ids)} items changed since {since.isoformat()}")
+        query = f'''
+        query ($ids: [ID!], $column_ids: [String!]) {{
+            items(ids: $ids, limit: 100) {{ {ITEM_FIELDS} }}
+        }}
+        '''
+        fetched = {}
+        for offset in range(0, len(item_ids), 100):
+            batch = item_ids[offset:offset + 100]
+            for item in self.graphql(query, {"ids": batch, "column_ids": [self.cgid_column]})['items']:
+                fetched[str(item['id'])] = item
+        for item_id in item_ids:
+            item = fetched.get(item_id)
+            # Deleted, archived or moved to another group: drop from the catalog
+            if not item or item.get('state', 'active') != 'active' or (item.get('group') or {}).get('id') not in self.include_groups:
+                self.items.pop(item_id, None)
+            else:
+                self.items[item_id] = item
+        self.last_refresh['changed_items'] = len(item_ids)
@@ -0,0 +1,242 @@
+"""Write-ahead journal of a Monday metrics sync run.
+
+Before an item's cells are queued for Monday, the computed column values
+are journaled as pending; once Monday acknowledges the mutation the item
+is marked done. Items with nothing to write are marked done right away.
+
+A run is identified by the board and its as-of date. If a run stops
+halfway (crash or Cloud Function timeout), the next run for the same
+as-of date resumes it: done items are skipped and pending items are
+replayed from their journaled values, without querying BigQuery again.
+So recovery costs as much as the unfinished work, not the board size.
+Once a run finishes, the next run for the same date starts a new one.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+PENDING = 'pending'
+DONE = 'done'
+# Run-level entries use an empty item_id
+RUN_STARTED = 'started'
+RUN_FINISHED = 'finished'
+
+
+def run_key(board_id, as_of_date):
+    return f"{board_id}:{as_of_date}"
+
+
+def recorded_at():
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+class RunState:
+    """Journaled items of one run: item id -> (status, item_name, column_values)."""
+
+    def __init__(self, key, run_id, items=None, resumed=False):
+        self.key = key
+        self.run_id = run_id
+        self.items = items or {}
+        self.resumed = resumed
+
+    def done(self):
+        return {item_id for item_id, (status, _, _) in self.items.items() if status == DONE}
+
+    def acknowledged(self):
+        """{item_id: column_values} of done items whose cells Monday acknowledged."""
+        return {
+            item_id: column_values
+            for item_id, (status, _, column_values) in self.items.items()
+            if status == DONE and column_values
+        }
+
+    def pending(self):
+        """[(item_id, item_name, column_values)] journaled but not acknowledged by Monday."""
+        return [
+            (item_id, item_name, column_values)
+            for item_id, (status, item_name, column_values) in self.items.items()
+            if status == PENDING
+        ]
+
+
+class SQLiteRunJournal:
+    """Run journal in a local SQLite file, for local and single-instance runs.
+
+    Holds one connection for its lifetime; create it once per process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS monday_sync_journal (
+                run_key TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                item_name TEXT,
+                status TEXT NOT NULL,
+                column_values TEXT,
+                recorded_at TEXT NOT NULL,
+                PRIMARY KEY (run_id, item_id)
+            )
+        """)
+        self.conn.commit()
+
+    def open_run(self, key):
+        """Resume the unfinished run for a key, or start a new one."""
+        with self.lock:
+            latest = self.conn.execute(
+                "SELECT run_id, status FROM monday_sync_journal WHERE run_key = ? AND item_id = '' "
+                "ORDER BY recorded_at DESC LIMIT 1",
+                (key,)
+            ).fetchone()
+            if latest and latest[1] != RUN_FINISHED:
+                rows = self.conn.execute(
+                    "SELECT item_id, status, item_name, column_values FROM monday_sync_journal "
+                    "WHERE run_id = ? AND item_id != ''",
+                    (latest[0],)
+                ).fetchall()
+                return RunState(key, latest[0], {
+                    item_id: (status, item_name, json.loads(column_values or '{}'))
+                    for item_id, status, item_name, column_values in rows
+                }, resumed=True)
+
+            # Older runs are never resumed, so only the new run is kept
+            run_id = f"{key}:{recorded_at()}"
+            self.conn.execute("DELETE FROM monday_sync_journal")
+            self.conn.execute(
+                "INSERT INTO monday_sync_journal VALUES (?, ?, '', NULL, ?, NULL, ?)",
+                (key, run_id, RUN_STARTED, recorded_at())
+            )
+            self.conn.commit()
+        return RunState(key, run_id)
+
+    def record_pending(self, run, writes):
+        """Journal [(item_id, item_name, column_values)] before they are sent."""
+        self._record(run, [(item_id, item_name, PENDING, column_values) for item_id, item_name, column_values in writes])
+
+    def record_done(self, run, entries):
+        """Mark [(item_id, column_values or None)] done: acknowledged by Monday, or nothing to write."""
+        self._record(run, [(item_id, None, DONE, column_values) for item_id, column_values in entries])
+
+    def finish_run(self, run):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE monday_sync_journal SET status = ?, recorded_at = ? WHERE run_id = ? AND item_id = ''",
+                (RUN_FINISHED, recorded_at(), run.run_id)
+            )
+            self.conn.commit()
+
+    def _record(self, run, entries):
+        if not entries:
+            return
+        now = recorded_at()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO monday_sync_journal VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_id, item_id) DO UPDATE SET status = excluded.status, recorded_at = excluded.recorded_at, "
+                "item_name = COALESCE(excluded.item_name, item_name), column_values = COALESCE(excluded.column_values, column_values)",
+                [
+                    (run.key, run.run_id, str(item_id), item_name, status,
+                     json.dumps(column_values) if column_values is not None else None, now)
+                    for item_id, item_name, status, column_values in entries
+                ]
+            )
+            self.conn.commit()
+
+
+class BigQueryRunJournal:
+    """Run journal in a BigQuery table, shared by all instances in prod.
+
+    Rows are only appended (streaming inserts); the latest row per item
+    wins. The table is partitioned by day and old partitions expire.
+    """
+
+    def __init__(self, client, table_id, expiration_days=7):
+        from google.api_core.exceptions import NotFound
+        from google.cloud import bigquery
+
+        self.client = client
+        self.table_id = table_id
+        try:
+            client.get_table(table_id)
+        except NotFound:
+            schema = [
+                bigquery.SchemaField("run_key", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("run_id", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("item_id", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("item_name", "STRING"),
+                bigquery.SchemaField("status", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("column_values", "STRING"),
+                bigquery.SchemaField("recorded_at", "TIMESTAMP", mode="REQUIRED"),
+            ]
+            table = bigquery.Table(table_id, schema=schema)
+            table.time_partitioning = bigquery.TimePartitioning(
+                field="recorded_at", expiration_ms=expiration_days * 24 * 3600 * 1000
+            )
+            client.create_table(table)
+
+    def open_run(self, key):
+        """Resume the unfinished run for a key, or start a new one."""
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("run_key", "STRING", key)]
+        )
+        # Latest entry per item of the newest run for this key
+        rows = list(self.client.query(f"""
+            WITH latest_run AS (
+                SELECT run_id
+                FROM `{self.table_id}`
+                WHERE run_key = @run_key AND item_id = ''
+                ORDER BY recorded_at DESC
+                LIMIT 1
+            )
+            SELECT run_id, item_id, item_name, status, column_values
+            FROM `{self.table_id}`
+            WHERE run_id = (SELECT run_id FROM latest_run)
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY item_id ORDER BY recorded_at DESC) = 1
+        """, job_config=job_config).result())
+        latest = {row['item_id']: row for row in rows}
+        run_row = latest.pop('', None)
+
+        if run_row and run_row['status'] != RUN_FINISHED:
+            return RunState(key, run_row['run_id'], {
+                item_id: (row['status'], row['item_name'], json.loads(row['column_values'] or '{}'))
+                for item_id, row in latest.items()
+            }, resumed=True)
+
+        run_id = f"{key}:{recorded_at()}"
+        self._insert([{'run_key': key, 'run_id': run_id, 'item_id': '', 'status': RUN_STARTED}])
+        return RunState(key, run_id)
+
+    def record_pending(self, run, writes):
+        """Journal [(item_id, item_name, column_values)] before they are sent."""
+        self._insert([
+            {'run_key': run.key, 'run_id': run.run_id, 'item_id': str(item_id), 'item_name': item_name,
+             'status': PENDING, 'column_values': json.dumps(column_values)}
+            for item_id, item_name, column_values in writes
+        ])
+
+    def record_done(self, run, entries):
+        """Mark [(item_id, column_values or None)] done: acknowledged by Monday, or nothing to write."""
+        self._insert([
+            {'run_key': run.key, 'run_id': run.run_id, 'item_id': str(item_id), 'status': DONE,
+             'column_values': json.dumps(column_values) if column_values is not None else None}
+            for item_id, column_values in entries
+        ])
+
+    def finish_run(self, run):
+        self._insert([{'run_key': run.key, 'run_id': run.run_id, 'item_id': '', 'status': RUN_FINISHED}])
+
+    def _insert(self, rows):
+        if not rows:
+            return
+        now = recorded_at()
+        errors = self.client.insert_rows_json(self.table_id, [dict(row, recorded_at=now) for row in rows])
+        if errors:
+            # A journal that misses entries would replay or skip the wrong items on resume
+            raise RuntimeError(f"Error writing run journal: {errors}")
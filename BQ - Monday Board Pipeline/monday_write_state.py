@@ -0,0 +1,98 @@
+"""Last-written Monday column values, used to skip writes that change nothing.
+
+Keeps item id -> {column_id: value} for every cell the sync has written,
+and when each item was last written, persisted as a local JSON file
+between runs. Numeric cells are compared with a small tolerance so CPL
+rounding noise doesn't trigger a write.
+
+A cell changed on the board after it was written (by hand, or by a sync
+on another instance) is forgotten via invalidate(), so it is written
+again instead of being treated as unchanged.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+# Activity this soon after our own write is taken to be that write (clock skew with Monday)
+OWN_WRITE_GRACE_SECONDS = 10
+
+
+class WriteState:
+    """Persisted values of the cells last written to each item."""
+
+    def __init__(self, path, tolerance=0.005):
+        self.path = path
+        self.tolerance = tolerance
+        self.lock = threading.Lock()
+        self.values = {}
+        self.written_at = {}  # item id -> epoch seconds of the last acknowledged write
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable write state {self.path}: {str(e)}")
+            state = {}
+        if 'values' in state:
+            self.values, self.written_at = state['values'], state.get('written_at', {})
+        else:
+            # Older files hold only the values; any later board activity invalidates them
+            self.values, self.written_at = state, {}
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with self.lock, open(tmp_path, 'w') as f:
+            json.dump({'values': self.values, 'written_at': self.written_at}, f)
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        self.values = {}
+        self.written_at = {}
+
+    def same_value(self, old, new):
+        if old == new:
+            return True
+        try:
+            return abs(float(old) - float(new)) <= self.tolerance
+        except (TypeError, ValueError):
+            return False
+
+    def changed_columns(self, item_id, column_values):
+        """Subset of column_values that differs from what was last written."""
+        with self.lock:
+            written = dict(self.values.get(str(item_id), {}))
+        return {
+            column_id: value
+            for column_id, value in column_values.items()
+            if column_id not in written or not self.same_value(written[column_id], value)
+        }
+
+    def record(self, item_id, column_values):
+        """Remember values Monday acknowledged for an item."""
+        with self.lock:
+            self.values.setdefault(str(item_id), {}).update(column_values)
+            self.written_at[str(item_id)] = time.time()
+
+    def invalidate(self, cell_activity):
+        """Forget cells changed on the board after we wrote them.
+
+        cell_activity is {item id: {column id: epoch seconds of the change}},
+        as collected by ItemCatalog. Returns the number of cells forgotten.
+        """
+        forgotten = 0
+        with self.lock:
+            for item_id, columns in cell_activity.items():
+                written = self.values.get(str(item_id))
+                if not written:
+                    continue
+                written_at = self.written_at.get(str(item_id), 0)
+                for column_id, changed_at in columns.items():
+                    if column_id in written and changed_at > written_at + OWN_WRITE_GRACE_SECONDS:
+                        del written[column_id]
+                        forgotten += 1
+        return forgotten
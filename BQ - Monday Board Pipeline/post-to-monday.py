@@ -1,8 +1,9 @@
-import requests
+import http_transport
 import json
-import time
 import logging
+import os
 from datetime import datetime
+from monday_client import MondayClient
 
 # Configure logging
 logging.basicConfig(
@@ -11,7 +12,7 @@ logging.basicConfig(
 )
 
 # Monday.com Configuration
-MONDAY_API_URL = "https://api.monday.com/v2"
+MONDAY_API_URL = os.environ.get('MONDAY_API_URL', 'https://api.monday.com/v2')
 MONDAY_API_TOKEN = "monday_board_token_here"  # Replace with your actual token
 BOARD_ID = 1981285971  # Your board ID from the JSON
 
@@ -66,6 +67,7 @@ DUMMY_DATA = {
 class MondayAPITester:
     def __init__(self):
         self.headers = {"Authorization": MONDAY_API_TOKEN}
+        self.monday = MondayClient(MONDAY_API_URL, self.headers, timeout=30)
         self.test_results = []
 
     def test_connection(self):
@@ -82,7 +84,7 @@ class MondayAPITester:
         '''
         
         try:
-            response = requests.post(
+            response = http_transport.post(
                 MONDAY_API_URL,
                 json={"query": query},
                 headers=self.headers,
@@ -123,7 +125,7 @@ class MondayAPITester:
         '''
         
         try:
-            response = requests.post(
+            response = http_transport.post(
                 MONDAY_API_URL,
                 json={"query": query, "variables": {"board_id": str(BOARD_ID)}},
                 headers=self.headers
@@ -167,7 +169,7 @@ class MondayAPITester:
         '''
         
         try:
-            response = requests.post(
+            response = http_transport.post(
                 MONDAY_API_URL,
                 json={"query": query, "variables": {"board_id": str(BOARD_ID)}},
                 headers=self.headers
@@ -227,21 +229,11 @@ class MondayAPITester:
         }
         
         try:
-            response = requests.post(
-                MONDAY_API_URL,
-                json={"query": mutation, "variables": variables},
-                headers=self.headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'errors' not in data:
-                    return {'success': True, 'data': data}
-                else:
-                    return {'success': False, 'error': data['errors']}
+            data = self.monday.execute(mutation, variables)
+            if 'errors' not in data:
+                return {'success': True, 'data': data}
             else:
-                return {'success': False, 'error': f"HTTP {response.status_code}"}
+                return {'success': False, 'error': data['errors']}
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -297,7 +289,6 @@ class MondayAPITester:
         for metric_name, value in client_data.items():
             if self.test_single_update(client_code, metric_name, value):
                 success_count += 1
-            time.sleep(0.2)  # Rate limiting
         
         logging.info(f"Bulk update for {client_code}: {success_count}/{len(client_data)} successful")
         return success_count == len(client_data)
@@ -334,6 +325,8 @@ class MondayAPITester:
         successful_tests = sum(1 for test in self.test_results if test['success'])
         logging.info(f"Successful: {successful_tests}")
         logging.info(f"Failed: {len(self.test_results) - successful_tests}")
+        for host, counters in http_transport.request_stats().items():
+            logging.info(f"HTTP {host}: {counters['requests']} requests, avg {counters['avg_ms']}ms, max {counters['max_ms']}ms")
         
         if successful_tests == len(self.test_results):
             logging.info("🎉 All tests passed!")
@@ -0,0 +1,285 @@
+"""Tests for the Monday metrics sync, run offline.
+
+The run journal and write state use temporary files, metric sources are
+read from the DuckDB stand-in in "Local Warehouse/", and whole runs go
+against fake_monday_server.py.
+
+    python -m pytest -q test_monday_sync.py
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+import bench_monday_sync
+from fake_monday_server import start_server
+from metric_windows import MetricConfig, MetricSource
+from monday_run_journal import SQLiteRunJournal, run_key
+from monday_write_state import OWN_WRITE_GRACE_SECONDS, WriteState
+
+LOCAL_WAREHOUSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Local Warehouse')
+
+
+# Run journal
+
+def test_journal_resumes_unfinished_run(tmp_path):
+    path = str(tmp_path / 'journal.sqlite')
+    journal = SQLiteRunJournal(path)
+    run = journal.open_run(run_key('board', '2024-06-01'))
+    assert not run.resumed
+    journal.record_pending(run, [('1', 'Item 1', {'numbers4': 3}), ('2', 'Item 2', {'numbers4': 5})])
+    journal.record_done(run, [('1', {'numbers4': 3}), ('3', None)])
+
+    # A new process opens the same file and picks the run up
+    resumed = SQLiteRunJournal(path).open_run(run_key('board', '2024-06-01'))
+    assert resumed.resumed
+    assert resumed.run_id == run.run_id
+    assert resumed.done() == {'1', '3'}
+    assert resumed.pending() == [('2', 'Item 2', {'numbers4': 5})]
+    # Items with nothing to write are done but were never acknowledged
+    assert resumed.acknowledged() == {'1': {'numbers4': 3}}
+
+
+def test_journal_done_keeps_pending_item_name(tmp_path):
+    journal = SQLiteRunJournal(str(tmp_path / 'journal.sqlite'))
+    run = journal.open_run(run_key('board', '2024-06-01'))
+    journal.record_pending(run, [('1', 'Item 1', {'numbers4': 3})])
+    journal.record_done(run, [('1', None)])
+    resumed = journal.open_run(run_key('board', '2024-06-01'))
+    assert resumed.items['1'] == ('done', 'Item 1', {'numbers4': 3})
+
+
+def test_journal_finished_run_starts_new_one(tmp_path):
+    journal = SQLiteRunJournal(str(tmp_path / 'journal.sqlite'))
+    run = journal.open_run(run_key('board', '2024-06-01'))
+    journal.record_pending(run, [('1', 'Item 1', {'numbers4': 3})])
+    journal.finish_run(run)
+
+    # Same date, but nothing left to resume; the old entries are dropped
+    next_run = journal.open_run(run_key('board', '2024-06-01'))
+    assert not next_run.resumed
+    assert next_run.run_id != run.run_id
+    assert next_run.items == {}
+    assert journal.conn.execute("SELECT COUNT(*) FROM monday_sync_journal WHERE run_id = ?", (run.run_id,)).fetchone()[0] == 0
+
+
+def test_journal_keys_runs_by_date(tmp_path):
+    journal = SQLiteRunJournal(str(tmp_path / 'journal.sqlite'))
+    run = journal.open_run(run_key('board', '2024-06-01'))
+    journal.record_pending(run, [('1', 'Item 1', {'numbers4': 3})])
+    assert not journal.open_run(run_key('board', '2024-06-02')).resumed
+
+
+# Write state
+
+def test_write_state_tolerance():
+    state = WriteState('unused.json', tolerance=0.005)
+    state.record('1', {'numbers4': '12.50', 'text': 'a'})
+    assert state.changed_columns('1', {'numbers4': 12.504, 'text': 'a'}) == {}
+    assert state.changed_columns('1', {'numbers4': 12.51}) == {'numbers4': 12.51}
+    assert state.changed_columns('1', {'text': 'b'}) == {'text': 'b'}
+    # Unwritten cells and items always differ
+    assert state.changed_columns('1', {'numbers3': 0}) == {'numbers3': 0}
+    assert state.changed_columns('2', {'numbers4': 12.5}) == {'numbers4': 12.5}
+
+
+def test_write_state_round_trip(tmp_path):
+    path = str(tmp_path / 'written.json')
+    state = WriteState(path)
+    state.record(1, {'numbers4': 3})
+    state.save()
+
+    loaded = WriteState(path)
+    loaded.load()
+    assert loaded.values == {'1': {'numbers4': 3}}
+    assert loaded.changed_columns(1, {'numbers4': 3}) == {}
+
+
+def test_write_state_ignores_unreadable_file(tmp_path):
+    path = tmp_path / 'written.json'
+    path.write_text('{not json')
+    state = WriteState(str(path))
+    state.load()
+    assert state.values == {}
+
+
+def test_write_state_invalidate_forgets_later_edits():
+    state = WriteState('unused.json')
+    state.record('1', {'numbers4': 3, 'numbers3': 4})
+    written_at = state.written_at['1']
+
+    forgotten = state.invalidate({
+        '1': {
+            'numbers4': written_at + OWN_WRITE_GRACE_SECONDS + 60,  # Edited on the board
+            'numbers3': written_at + 1,  # Our own write, seen with clock skew
+            'numbers27': written_at + 600  # Never written by the sync
+        },
+        '2': {'numbers4': written_at + 600}
+    })
+    assert forgotten == 1
+    assert state.changed_columns('1', {'numbers4': 3, 'numbers3': 4}) == {'numbers4': 3}
+
+
+# Metric sources
+
+@pytest.fixture
+def duckdb_client(tmp_path):
+    pytest.importorskip('duckdb')
+    if LOCAL_WAREHOUSE_DIR not in sys.path:
+        sys.path.insert(0, LOCAL_WAREHOUSE_DIR)
+    from duckdb_warehouse import DuckDBClient
+
+    return DuckDBClient(project='test', path=str(tmp_path / 'warehouse.duckdb'))
+
+
+def test_config_requires_monday_column():
+    sources = {'meta': MetricSource('meta', 'dashboard_views.meta', {'leads': ['leads']})}
+    windows = {'7_days': {'type': 'trailing', 'days': 7}}
+    with pytest.raises(ValueError, match='no monday_column'):
+        MetricConfig(windows, {'fb_leads_7_days': {'source': 'meta', 'window': '7_days', 'measure': 'leads'}}, sources)
+
+
+def test_config_reads_second_source(duckdb_client):
+    as_of = date(2024, 6, 30)
+    duckdb_client.query("""
+        CREATE TABLE `test.dashboard_views.meta` AS
+        SELECT * FROM (VALUES
+            ('cg1', DATE '2024-06-29', 2, 10.0),
+            ('cg1', DATE '2024-06-30', 1, 5.5),
+            ('cg2', DATE '2024-06-30', 0, 4.0)
+        ) AS t(cgid, report_date, leads, total_spend)
+    """).result()
+    # The GMB view repeats each location-day once per mapping month
+    duckdb_client.query("""
+        CREATE TABLE `test.dashboard_views.gmb` AS
+        SELECT * FROM (VALUES
+            ('cg1', 'loc1', DATE '2024-06-30', '2024-05', 7),
+            ('cg1', 'loc1', DATE '2024-06-30', '2024-06', 7),
+            ('cg1', 'loc2', DATE '2024-06-30', '2024-06', 2),
+            ('cg3', 'loc3', DATE '2024-06-20', '2024-06', 9)
+        ) AS t(cgid, location_id, date, mapping_month, CALL_CLICKS)
+    """).result()
+    sources = {
+        'meta': MetricSource('meta', 'dashboard_views.meta', {'leads': ['leads'], 'spend': ['total_spend']}),
+        'gmb': MetricSource('gmb', 'dashboard_views.gmb', {'calls': ['CALL_CLICKS']},
+                            date_column='date', unique_by=['location_id'])
+    }
+    config = MetricConfig(
+        {'7_days': {'type': 'trailing', 'days': 7}},
+        {
+            'fb_leads_7_days': {'source': 'meta', 'window': '7_days', 'measure': 'leads', 'monday_column': 'numbers4'},
+            'fb_spend_7_days': {'source': 'meta', 'window': '7_days', 'measure': 'spend', 'monday_column': 'numbers3'},
+            'gmb_calls_7_days': {'source': 'gmb', 'window': '7_days', 'measure': 'calls', 'monday_column': 'numbers9'}
+        },
+        sources
+    )
+    assert [source.name for source in config.active_sources()] == ['meta', 'gmb']
+    assert config.monday_columns()['gmb_calls_7_days'] == 'numbers9'
+
+    metrics = config.fetch_metrics(duckdb_client, 'test', ['cg1', 'cg2', 'cg3'], as_of)
+    assert metrics['cg1'] == {'as_of_date': '2024-06-30', 'fb_leads_7_days': 3, 'fb_spend_7_days': 15.5, 'gmb_calls_7_days': 9}
+    # A CGID only gets the columns of sources with rows in their windows
+    assert metrics['cg2'] == {'as_of_date': '2024-06-30', 'fb_leads_7_days': 0, 'fb_spend_7_days': 4.0}
+    assert 'cg3' not in metrics
+
+
+def test_config_without_columns_skips_source():
+    sources = {
+        'meta': MetricSource('meta', 'dashboard_views.meta', {'leads': ['leads']}),
+        'gmb': MetricSource('gmb', 'dashboard_views.gmb', {'calls': ['CALL_CLICKS']})
+    }
+    config = MetricConfig(
+        {'7_days': {'type': 'trailing', 'days': 7}},
+        {'fb_leads_7_days': {'source': 'meta', 'window': '7_days', 'measure': 'leads', 'monday_column': 'numbers4'}},
+        sources
+    )
+    assert [source.name for source in config.active_sources()] == ['meta']
+
+
+def test_shipped_config_loads():
+    config = MetricConfig.load()
+    assert config.active_sources()
+    assert all(config.monday_columns().values())
+
+
+# Whole runs
+
+@pytest.fixture
+def monday_server():
+    server = start_server(120, latency_ms=0)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def sync_env(monday_server, tmp_path, monkeypatch):
+    for name, value in {
+        'MONDAY_API_URL': monday_server.url,
+        'MONDAY_API_TOKEN': 'fake',
+        'MONDAY_CATALOG_PATH': str(tmp_path / 'catalog.json'),
+        'MONDAY_WRITE_STATE_PATH': str(tmp_path / 'written.json'),
+        'JOURNAL_BACKEND': 'sqlite',
+        'JOURNAL_PATH': str(tmp_path / 'journal.sqlite'),
+        'MONDAY_ITEMS_PER_MUTATION': '25'
+    }.items():
+        monkeypatch.setenv(name, value)
+
+
+class CountingBigQueryClient(bench_monday_sync.FakeBigQueryClient):
+    def __init__(self):
+        super().__init__()
+        self.cgids_read = 0
+
+    def query(self, query, job_config=None):
+        self.cgids_read += len(next(p for p in job_config.query_parameters if p.name == 'cgids').values)
+        return super().query(query, job_config)
+
+
+def new_pipeline():
+    """A ProductionPipeline from a fresh import, as on a cold instance."""
+    module = bench_monday_sync.load_sync_module()
+    pipeline = module.ProductionPipeline()
+    pipeline.bq_client = CountingBigQueryClient()
+    pipeline.init_bigquery = lambda: True
+    return module, pipeline
+
+
+def test_run_resumes_from_journal(sync_env):
+    # The first run loses every Monday write after the first mutation
+    module, pipeline = new_pipeline()
+    sync = pipeline.sync_items_to_monday
+    calls = []
+    pipeline.sync_items_to_monday = lambda writes: calls.append(len(writes)) or (sync(writes) if len(calls) == 1 else set())
+    assert not pipeline.run()
+    total = pipeline.stats['total']
+    written = pipeline.stats['success']
+    assert 0 < written < total
+
+    # The next run replays the pending writes without reading BigQuery for them
+    module, pipeline = new_pipeline()
+    assert pipeline.run()
+    assert pipeline.stats['resumed_done'] == written
+    assert pipeline.stats['replayed'] == total - written
+    assert pipeline.bq_client.cgids_read == 0
+
+    # The run finished, so the next one starts over and finds nothing changed
+    module, pipeline = new_pipeline()
+    assert pipeline.run()
+    assert pipeline.stats['replayed'] == 0
+    assert pipeline.stats['cells_written'] == 0
+
+
+def test_run_continues_from_cursor(sync_env):
+    module, pipeline = new_pipeline()
+    expired = module.Deadline(budget_seconds=0)
+    assert pipeline.run(deadline=expired)
+    cursor = pipeline.cursor
+    assert cursor['remaining_items'] == pipeline.stats['total'] - 25
+
+    # A fresh instance without the journal still moves on from the cursor
+    os.remove(os.environ['JOURNAL_PATH'])
+    module, pipeline = new_pipeline()
+    assert pipeline.run(deadline=module.Deadline(budget_seconds=0), cursor=cursor)
+    assert pipeline.stats['earlier_invocations'] == 25
+    assert pipeline.cursor['next_item_id'] != cursor['next_item_id']
@@ -0,0 +1,64 @@
+"""Warehouse client factory: BigQuery in production, DuckDB locally.
+
+Set WAREHOUSE_BACKEND=duckdb to run a pipeline against the DuckDB
+stand-in in "Local Warehouse/" instead of a GCP project.
+
+Client libraries are imported on first use, not at module load, and each
+client is created once per process and reused by warm invocations. Entry
+points call preload() when a request arrives so the (slow) client import
+overlaps with their first API calls.
+
+Each pipeline folder ships its own copy of this file because every folder
+is deployed as a separate Cloud Function.
+"""
+import importlib
+import logging
+import os
+import sys
+import threading
+
+WAREHOUSE_BACKEND = os.environ.get('WAREHOUSE_BACKEND', 'bigquery').lower()
+LOCAL_WAREHOUSE_DIR = os.environ.get(
+    'LOCAL_WAREHOUSE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Local Warehouse')
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _backend_module():
+    if WAREHOUSE_BACKEND == 'duckdb':
+        if LOCAL_WAREHOUSE_DIR not in sys.path:
+            sys.path.insert(0, LOCAL_WAREHOUSE_DIR)
+        return 'duckdb_warehouse'
+    if WAREHOUSE_BACKEND != 'bigquery':
+        raise ValueError(f"Unknown WAREHOUSE_BACKEND: {WAREHOUSE_BACKEND}")
+    return 'google.cloud.bigquery'
+
+
+def _import_backend():
+    try:
+        importlib.import_module(_backend_module())
+    except Exception as e:
+        # get_client() imports again and raises where the caller can handle it
+        logging.warning(f"⚠️ Warehouse preload failed: {e}")
+
+
+def preload():
+    """Start importing the warehouse client library in a background thread."""
+    threading.Thread(target=_import_backend, name='warehouse-preload', daemon=True).start()
+
+
+def get_client(project=None):
+    """Return the process-wide BigQuery client (or DuckDB stand-in) for a project."""
+    with _clients_lock:
+        client = _clients.get(project)
+        if client is None:
+            module = importlib.import_module(_backend_module())
+            if WAREHOUSE_BACKEND == 'duckdb':
+                client = module.DuckDBClient(project=project)
+            else:
+                client = module.Client(project=project)
+            _clients[project] = client
+        return client
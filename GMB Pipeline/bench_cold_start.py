@@ -0,0 +1,200 @@
+"""Cold-start benchmark for gmb_fetch_performance.
+
+Reports two things to track over time:
+
+* a `python -X importtime` breakdown of loading gmb-pipeline.py (total
+  and the slowest top-level imports), and
+* time to first response: a fresh interpreter loads the module and
+  serves one daily run, then a second (warm) run in the same process.
+
+The Business Profile APIs and the OAuth token endpoint are answered by a
+local stand-in server (fake_gmb_server.py) with a fixed latency per request. Each cold start
+begins without a location catalog, so it lists accounts and locations;
+the warm run reuses the catalog. Secret Manager and BigQuery calls are stubbed, but
+their client libraries are still imported when first used, so import
+costs are measured the same as in production.
+
+Usage:
+    python bench_cold_start.py --locations 20 --repeat 5
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_gmb_server import SyntheticGMB, start_server
+
+PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_SCRIPT = os.path.join(PIPELINE_DIR, 'gmb-pipeline.py')
+IMPORTTIME_PATTERN = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+LOAD_PIPELINE = (
+    "import importlib.util as u; "
+    f"s = u.spec_from_file_location('gmb_pipeline', {PIPELINE_SCRIPT!r}); "
+    "m = u.module_from_spec(s); s.loader.exec_module(m)"
+)
+
+logger = logging.getLogger('bench')
+
+
+class StubJob:
+    def result(self, *args, **kwargs):
+        return []
+
+
+class StubWarehouseClient:
+    """Takes the pipeline's BigQuery calls without network I/O."""
+
+    def __init__(self, project):
+        from google.cloud import bigquery
+        self.bigquery = bigquery
+        self.project = project
+
+    def dataset(self, dataset_id):
+        return self.bigquery.DatasetReference(self.project, dataset_id)
+
+    def get_table(self, table):
+        from google.api_core.exceptions import NotFound
+        # Nothing persists, so every table is created on first use
+        raise NotFound(f"Not found: Table {table}")
+
+    def create_table(self, table, exists_ok=False):
+        return table
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs):
+        return StubJob()
+
+    def query(self, query, job_config=None, **kwargs):
+        return StubJob()
+
+    def delete_table(self, table, not_found_ok=False):
+        pass
+
+
+class StubSecretClient:
+    class Response:
+        class Payload:
+            data = b'stand-in-secret'
+        payload = Payload()
+
+    def access_secret_version(self, name):
+        return self.Response()
+
+
+def stub_secret_client():
+    from google.cloud import secretmanager  # Same import the real client needs
+    return StubSecretClient()
+
+
+class Request:
+    def __init__(self, body):
+        self.body = body
+
+    def get_json(self, silent=False):
+        return self.body
+
+
+def run_child():
+    """Load the pipeline, serve a cold then a warm request and print timings as JSON."""
+    started = time.time()
+    spec = importlib.util.spec_from_file_location('gmb_pipeline', PIPELINE_SCRIPT)
+    pipeline = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pipeline)
+    loaded = time.time()
+
+    clients = {}
+
+    def get_client(project=None):
+        if project not in clients:
+            clients[project] = StubWarehouseClient(project)
+        return clients[project]
+
+    pipeline.warehouse.get_client = get_client
+    pipeline.credentials._secret_client = stub_secret_client
+    pipeline.credentials.token_url = os.environ['BENCH_TOKEN_URL']
+
+    body, status = pipeline.gmb_fetch_performance(Request({}))
+    first_response = time.time()
+    warm_start = time.perf_counter()
+    warm_body, warm_status = pipeline.gmb_fetch_performance(Request({}))
+    warm_seconds = time.perf_counter() - warm_start
+    print(json.dumps({
+        'started': started,
+        'loaded': loaded,
+        'first_response': first_response,
+        'warm_seconds': warm_seconds,
+        'status': status,
+        'warm_status': warm_status,
+        'message': body.get('message')
+    }))
+
+
+def importtime_breakdown(top):
+    """Total import time of gmb-pipeline.py and its slowest top-level imports (ms)."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', LOAD_PIPELINE],
+                            cwd=PIPELINE_DIR, capture_output=True, text=True, check=True).stderr
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            entries.append((len(match.group(3)), match.group(4), int(match.group(2)) / 1000))
+    top_level = [(name, ms) for depth, name, ms in entries if depth == 1]
+    return sum(ms for _, ms in top_level), sorted(top_level, key=lambda entry: -entry[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, default=20, help='Locations served by the stand-in API')
+    parser.add_argument('--api-latency-ms', type=float, default=50, help='Stand-in API latency per request')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh processes to start; medians are reported')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.CRITICAL)
+        run_child()
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    total_ms, slowest = importtime_breakdown(args.top)
+    logger.info(f"Import time for gmb-pipeline.py: {total_ms:.0f} ms")
+    for name, ms in slowest:
+        logger.info(f"  {name:<40} {ms:>8.1f} ms")
+
+    server = start_server(SyntheticGMB(1, args.locations, 30), latency_ms=args.api_latency_ms)
+    catalog_dir = tempfile.TemporaryDirectory()
+    catalog_path = os.path.join(catalog_dir.name, 'gmb_location_catalog.json')
+    env = dict(os.environ, **server.pipeline_env(), BENCH_TOKEN_URL=server.token_url, REQUESTS_PER_SECOND='1000', WAREHOUSE_BACKEND='bigquery',
+               LOCATION_CATALOG_BACKEND='file', LOCATION_CATALOG_PATH=catalog_path)
+
+    loads, first_responses, warm = [], [], []
+    for _ in range(args.repeat):
+        if os.path.exists(catalog_path):
+            os.remove(catalog_path)
+        spawned = time.time()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=PIPELINE_DIR,
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if result['status'] != 200:
+            logger.warning(f"⚠️ Run returned {result['status']}: {result['message']}")
+        loads.append(result['loaded'] - spawned)
+        first_responses.append(result['first_response'] - spawned)
+        warm.append(result['warm_seconds'])
+    server.shutdown()
+    catalog_dir.cleanup()
+
+    logger.info(f"\n{args.repeat} cold starts, {args.locations} locations, {args.api_latency_ms:g} ms API latency (median / min):")
+    logger.info(f"  process start -> module loaded   {statistics.median(loads):.3f}s / {min(loads):.3f}s")
+    logger.info(f"  process start -> first response  {statistics.median(first_responses):.3f}s / {min(first_responses):.3f}s")
+    logger.info(f"  warm invocation                  {statistics.median(warm):.3f}s / {min(warm):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Micro-benchmark: gmb_parser vs the previous per-datapoint pivot.
+
+Builds synthetic fetchMultiDailyMetricsTimeSeries payloads and times
+both code paths up to the same output, NDJSON-encoded rows ready to
+write, reporting CPU time and peak traced memory. The columnar path is
+parse_daily_metrics plus build_metric_rows from gmb-pipeline.py.
+
+Usage:
+    python bench_gmb_parser.py --locations 200 --days 365
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from gmb_fixtures import load_pipeline
+
+METRICS = [
+    'BUSINESS_IMPRESSIONS_DESKTOP_MAPS',
+    'BUSINESS_IMPRESSIONS_DESKTOP_SEARCH',
+    'BUSINESS_IMPRESSIONS_MOBILE_MAPS',
+    'BUSINESS_IMPRESSIONS_MOBILE_SEARCH',
+    'BUSINESS_CONVERSATIONS',
+    'BUSINESS_DIRECTION_REQUESTS',
+    'CALL_CLICKS',
+    'WEBSITE_CLICKS',
+    'BUSINESS_BOOKINGS',
+    'BUSINESS_FOOD_ORDERS',
+    'BUSINESS_FOOD_MENU_CLICKS'
+]
+
+ACCOUNT_ID = '100000'
+LOCATION_TITLE = 'Clinic 100000-0'
+STORE_CODE = 'S100000-0'
+
+logger = logging.getLogger('bench')
+pipeline = load_pipeline()
+
+
+def make_payload(start_date, days):
+    """Synthesize one location's response covering `days` days."""
+    dated_values = [
+        {'date': {'year': d.year, 'month': d.month, 'day': d.day}, 'value': str(i % 50)}
+        for i, d in enumerate(start_date + timedelta(days=n) for n in range(days))
+    ]
+    return {
+        'multiDailyMetricTimeSeries': [{
+            'dailyMetricTimeSeries': [
+                {'dailyMetric': metric, 'timeSeries': {'datedValues': dated_values}}
+                for metric in METRICS
+            ]
+        }]
+    }
+
+
+def encode_rows(rows):
+    """Rows as the sink buffers them: one NDJSON line each."""
+    return [json.dumps(row).encode('utf-8') for row in rows]
+
+
+def legacy_parse(data, location_id, start_date, end_date):
+    """The pre-gmb_parser path from insert_metrics_to_bigquery."""
+    logger.info(f"Raw response for {location_id}: {json.dumps(data)}")
+    rows_to_insert = []
+    load_timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
+    metrics_by_date = {}
+    for metric_series in data.get('multiDailyMetricTimeSeries', []):
+        for daily_metric in metric_series.get('dailyMetricTimeSeries', []):
+            metric_name = daily_metric.get('dailyMetric')
+            for dated_value in daily_metric.get('timeSeries', {}).get('datedValues', []):
+                try:
+                    date_key = date(
+                        int(dated_value['date']['year']),
+                        int(dated_value['date']['month']),
+                        int(dated_value['date']['day'])
+                    ).isoformat()
+                    date_obj = date.fromisoformat(date_key)
+                    if date_obj < start_date or date_obj > end_date:
+                        continue
+                except Exception:
+                    continue
+                value = int(dated_value.get('value', 0))
+                if value == 0:
+                    logger.warning(f"Zero value for {metric_name} on {date_key} for {location_id}")
+                if date_key not in metrics_by_date:
+                    metrics_by_date[date_key] = {metric: 0 for metric in METRICS}
+                metrics_by_date[date_key][metric_name] = value
+    for date_key, metric_values in metrics_by_date.items():
+        row = {
+            'store_id': STORE_CODE,
+            'account_id': ACCOUNT_ID,
+            'location_id': location_id,
+            'location_title': LOCATION_TITLE,
+            'store_code': STORE_CODE,
+            'is_verified': True,
+            'date': date_key,
+            'load_timestamp': load_timestamp
+        }
+        for metric in METRICS:
+            row[metric] = metric_values.get(metric, 0)
+        rows_to_insert.append(row)
+    struct_rows = [
+        {
+            'store_id': row['store_id'],
+            'account_id': row['account_id'],
+            'location_id': row['location_id'],
+            'location_title': row['location_title'],
+            'store_code': row['store_code'],
+            'is_verified': row['is_verified'],
+            'date': row['date'],
+            **{metric: row[metric] for metric in METRICS},
+            'load_timestamp': row['load_timestamp']
+        }
+        for row in rows_to_insert
+    ]
+    # The rows were sent as a JSON query parameter; encode them the same way as the new path
+    return encode_rows(struct_rows)
+
+
+def columnar_parse(data, location_id, start_date, end_date):
+    """The current path: build_metric_rows (parse_daily_metrics + row dicts), then the sink's encoding."""
+    rows = pipeline.build_metric_rows(ACCOUNT_ID, location_id, LOCATION_TITLE, STORE_CODE, True, data, start_date, end_date)
+    return encode_rows(rows)
+
+
+def run(name, parse, payloads, start_date, end_date):
+    # Time first, then repeat under tracemalloc, which slows allocation down
+    cpu_start = time.process_time()
+    results = [parse(payload, str(i), start_date, end_date) for i, payload in enumerate(payloads)]
+    cpu = time.process_time() - cpu_start
+    del results
+    tracemalloc.start()
+    results = [parse(payload, str(i), start_date, end_date) for i, payload in enumerate(payloads)]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    datapoints = sum(len(r) for r in results) * len(METRICS)
+    print(f"{name:<10} cpu={cpu:8.3f}s  peak={peak / 1024 / 1024:8.1f} MiB  datapoints={datapoints}")
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--locations', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    # Match production: INFO logging, with handler output discarded
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()], force=True)
+
+    start_date = date(2024, 1, 1)
+    end_date = start_date + timedelta(days=args.days - 1)
+    payloads = [make_payload(start_date, args.days) for _ in range(args.locations)]
+    print(f"{args.locations} locations x {args.days} days x {len(METRICS)} metrics")
+
+    legacy = run('legacy', legacy_parse, payloads, start_date, end_date)
+    columnar = run('columnar', columnar_parse, payloads, start_date, end_date)
+    print(f"speedup: {legacy / columnar:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
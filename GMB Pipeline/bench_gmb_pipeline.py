@@ -0,0 +1,235 @@
+"""End-to-end benchmark for gmb_fetch_performance, fully offline.
+
+Drives the handler against fake_gmb_server.py (synthetic accounts x
+locations x days, or a gmb_fixtures.py recording) and a local warehouse,
+and reports per run: wall time, locations/s, API calls by endpoint,
+429s and 403s, and BigQuery jobs (queries, MERGEs, loads).
+
+Scenarios run in order against the same warehouse and location catalog:
+
+    daily       a daily run
+    rerun       the same daily run again (watermarks and catalog are warm)
+    backfill    a --backfill-days backfill ending at T-2, with --load-mode
+
+The warehouse is the DuckDB stand-in in "Local Warehouse/" by default, or
+a stub that accepts every job (--warehouse stub) when DuckDB is not
+installed; watermarks are then always empty. Secret Manager is stubbed.
+
+Usage:
+    python bench_gmb_pipeline.py --accounts 2 --locations 100 --latency-ms 50
+    python bench_gmb_pipeline.py --scenarios backfill --backfill-days 365 --load-mode partition
+    python bench_gmb_pipeline.py --fixtures fixtures/gmb_daily.ndjson.gz --scenarios daily
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from fake_gmb_server import ReplayedGMB, SyntheticGMB, start_server
+from gmb_fixtures import FixtureSet, Request
+
+PIPELINE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gmb-pipeline.py')
+API_CALLS = ('token', 'accounts', 'locations', 'performance')
+PROCESSED_PATTERN = re.compile(r'Processed (\d+) locations')
+
+logger = logging.getLogger('bench')
+
+
+class StubJob:
+    def result(self, *args, **kwargs):
+        return []
+
+
+class StubWarehouseClient:
+    """Accepts the pipeline's BigQuery calls without doing anything."""
+
+    def __init__(self, project):
+        from google.cloud import bigquery
+        self.bigquery = bigquery
+        self.project = project
+
+    def dataset(self, dataset_id):
+        return self.bigquery.DatasetReference(self.project, dataset_id)
+
+    def get_table(self, table):
+        from google.api_core.exceptions import NotFound
+        # Nothing persists, so every table is created on first use
+        raise NotFound(f"Not found: Table {table}")
+
+    def create_table(self, table, exists_ok=False):
+        return table
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs):
+        return StubJob()
+
+    def load_table_from_json(self, json_rows, destination, job_config=None, **kwargs):
+        return StubJob()
+
+    def query(self, query, job_config=None, **kwargs):
+        return StubJob()
+
+    def delete_table(self, table, not_found_ok=False):
+        pass
+
+
+class CountingWarehouseClient:
+    """Wraps a warehouse client and counts the BigQuery jobs it is asked to run."""
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def count(self, kind):
+        with self.lock:
+            self.jobs[kind] = self.jobs.get(kind, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.jobs)
+
+    def query(self, query, *args, **kwargs):
+        keyword = query.lstrip().split(None, 1)[0].upper()
+        self.count('merge' if keyword == 'MERGE' else 'select' if keyword in ('SELECT', 'WITH') else 'other_query')
+        return self.client.query(query, *args, **kwargs)
+
+    def load_table_from_file(self, *args, **kwargs):
+        self.count('load')
+        return self.client.load_table_from_file(*args, **kwargs)
+
+    def load_table_from_json(self, *args, **kwargs):
+        self.count('load')
+        return self.client.load_table_from_json(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class StubSecretClient:
+    class Response:
+        class Payload:
+            data = b'stand-in-secret'
+        payload = Payload()
+
+    def access_secret_version(self, name):
+        return self.Response()
+
+
+def load_pipeline(server, workdir, warehouse_backend, requests_per_second):
+    """Import gmb-pipeline.py configured for the fake API and a scratch warehouse."""
+    os.environ.update(server.pipeline_env())
+    os.environ.update({
+        'REQUESTS_PER_SECOND': str(requests_per_second),
+        'WAREHOUSE_BACKEND': 'duckdb' if warehouse_backend == 'duckdb' else 'bigquery',
+        'LOCAL_WAREHOUSE_DB': os.path.join(workdir, 'warehouse.duckdb'),
+        'LOCATION_CATALOG_BACKEND': 'file',
+        'LOCATION_CATALOG_PATH': os.path.join(workdir, 'location_catalog.json'),
+        'CHECKPOINT_BACKEND': 'sqlite',
+        'CHECKPOINT_PATH': os.path.join(workdir, 'checkpoints.sqlite')
+    })
+    spec = importlib.util.spec_from_file_location('gmb_pipeline', PIPELINE_SCRIPT)
+    pipeline = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pipeline)
+
+    if warehouse_backend == 'duckdb':
+        client = CountingWarehouseClient(pipeline.warehouse.get_client(pipeline.PROJECT_ID))
+    else:
+        client = CountingWarehouseClient(StubWarehouseClient(pipeline.PROJECT_ID))
+    pipeline.warehouse.get_client = lambda project=None: client
+    pipeline.credentials._secret_client = lambda: StubSecretClient()
+    pipeline.credentials.token_url = server.token_url
+    return pipeline, client
+
+
+def scenario_payload(name, args):
+    payload = {'max_concurrency': args.concurrency}
+    if name == 'backfill':
+        end_date = date.today() - timedelta(days=2)
+        payload.update({
+            'backfill': True,
+            'start_date': (end_date - timedelta(days=args.backfill_days - 1)).isoformat(),
+            'end_date': end_date.isoformat(),
+            'load_mode': args.load_mode
+        })
+    elif name not in ('daily', 'rerun'):
+        raise ValueError(f"Unknown scenario: {name}")
+    return payload
+
+
+def run_scenario(pipeline, server, client, name, payload):
+    """Run the handler once and return its timings and counters."""
+    api_before, jobs_before = server.snapshot(), client.snapshot()
+    started = time.perf_counter()
+    body, status = pipeline.gmb_fetch_performance(Request(payload))
+    seconds = time.perf_counter() - started
+    api_after, jobs_after = server.snapshot(), client.snapshot()
+    processed = PROCESSED_PATTERN.match(body.get('message', ''))
+    return {
+        'scenario': name,
+        'status': status,
+        'seconds': seconds,
+        'locations': int(processed.group(1)) if processed else 0,
+        'failed': len(body.get('failed_locations', [])),
+        'api': {key: api_after[key] - api_before[key] for key in api_after},
+        'jobs': {key: jobs_after.get(key, 0) - jobs_before.get(key, 0) for key in jobs_after}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=2, help='Synthetic accounts')
+    parser.add_argument('--locations', type=int, default=50, help='Synthetic locations per account')
+    parser.add_argument('--days', type=int, default=400, help='Days of synthetic history')
+    parser.add_argument('--fixtures', help='Replay a gmb_fixtures.py recording instead of synthetic data')
+    parser.add_argument('--scenarios', default='daily,rerun,backfill', help='Comma-separated: daily, rerun, backfill')
+    parser.add_argument('--backfill-days', type=int, default=90)
+    parser.add_argument('--load-mode', default='merge', choices=('merge', 'partition'), help='Backfill load mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='max_concurrency of each run')
+    parser.add_argument('--requests-per-second', type=float, default=1000, help='Pipeline rate limit per host')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Fake API latency per request')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--forbidden-rate', type=float, default=0.0, help='Share of locations answered with 403')
+    parser.add_argument('--warehouse', default='duckdb', choices=('duckdb', 'stub'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    logger.setLevel(logging.INFO)
+    if args.fixtures:
+        source = ReplayedGMB(FixtureSet.load(args.fixtures))
+        described = f"replaying {args.fixtures}"
+    else:
+        source = SyntheticGMB(args.accounts, args.locations, args.days, args.forbidden_rate)
+        described = f"{args.accounts} accounts x {args.locations} locations x {args.days} days"
+    server = start_server(source, latency_ms=args.latency_ms, rate_limit_rate=args.rate_limit_rate, retry_after=0)
+    workdir = tempfile.mkdtemp(prefix='bench_gmb_')
+    try:
+        pipeline, client = load_pipeline(server, workdir, args.warehouse, args.requests_per_second)
+        results = [
+            run_scenario(pipeline, server, client, name, scenario_payload(name, args))
+            for name in args.scenarios.split(',')
+        ]
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    logger.info(f"\n{described}, {args.latency_ms:g} ms API latency, {args.concurrency} workers, {args.warehouse} warehouse")
+    logger.info(f"{'scenario':<10} {'HTTP':>4} {'seconds':>8} {'loc/s':>7} {'locs':>5} {'failed':>6} {'API':>5} "
+                f"{'token':>5} {'accts':>5} {'lists':>5} {'perf':>5} {'429':>4} {'403':>4} {'BQ jobs':>7}  job breakdown")
+    for result in results:
+        api, jobs = result['api'], result['jobs']
+        rate = result['locations'] / result['seconds'] if result['seconds'] else 0
+        breakdown = ', '.join(f"{count} {kind}" for kind, count in sorted(jobs.items()) if count)
+        logger.info(f"{result['scenario']:<10} {result['status']:>4} {result['seconds']:>8.2f} {rate:>7.1f} {result['locations']:>5} "
+                    f"{result['failed']:>6} {sum(api[key] for key in API_CALLS):>5} {api['token']:>5} {api['accounts']:>5} "
+                    f"{api['locations']:>5} {api['performance']:>5} {api['rate_limited']:>4} {api['forbidden']:>4} "
+                    f"{sum(jobs.values()):>7}  {breakdown}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Time budget and continuation for one Cloud Function invocation.
+
+An entry point creates a Deadline when a request arrives and checks it
+before dispatching each unit of work. Once the budget is spent it stops
+dispatching, finishes what is in flight, and returns a continuation
+cursor in its response. Re-invoking with {"cursor": ...} picks up where
+the previous invocation stopped:
+
+* locally, run_until_done() calls the handler in a loop until no cursor
+  is returned;
+* in prod, set CONTINUATION_QUEUE and CONTINUATION_URL and the handler
+  enqueues its own continuation as a Cloud Tasks HTTP task.
+
+The default budget is TIME_BUDGET_FRACTION of FUNCTION_TIMEOUT_SECONDS,
+leaving the rest for in-flight work and the final writes. A request can
+override it with "time_budget_seconds".
+
+Each pipeline folder ships its own copy of this file because every folder
+is deployed as a separate Cloud Function.
+"""
+import json
+import logging
+import os
+import time
+
+FUNCTION_TIMEOUT_SECONDS = float(os.environ.get('FUNCTION_TIMEOUT_SECONDS', '540'))
+TIME_BUDGET_FRACTION = float(os.environ.get('TIME_BUDGET_FRACTION', '0.8'))
+CONTINUATION_QUEUE = os.environ.get('CONTINUATION_QUEUE')  # projects/<project>/locations/<region>/queues/<queue>
+CONTINUATION_URL = os.environ.get('CONTINUATION_URL')  # This function's HTTPS trigger URL
+CONTINUATION_SERVICE_ACCOUNT = os.environ.get('CONTINUATION_SERVICE_ACCOUNT')  # OIDC identity for the task
+
+logger = logging.getLogger(__name__)
+
+
+class Deadline:
+    """Time budget measured from when the request arrived; None never expires."""
+
+    def __init__(self, budget_seconds=None):
+        self.budget_seconds = budget_seconds
+        self.started = time.monotonic()
+
+    @classmethod
+    def for_request(cls, request_json):
+        budget = request_json.get('time_budget_seconds')
+        return cls(float(budget) if budget is not None else FUNCTION_TIMEOUT_SECONDS * TIME_BUDGET_FRACTION)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        if self.budget_seconds is None:
+            return float('inf')
+        return self.budget_seconds - self.elapsed()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def stats(self):
+        return {'budget_seconds': self.budget_seconds, 'elapsed_seconds': round(self.elapsed(), 1)}
+
+
+def continuation_payload(request_json, cursor):
+    """The original request with the cursor to resume from."""
+    return dict(request_json, cursor=cursor)
+
+
+def enqueue_continuation(payload):
+    """Schedule the next invocation as a Cloud Tasks HTTP task; returns the task name or None."""
+    if not (CONTINUATION_QUEUE and CONTINUATION_URL):
+        return None
+    from google.cloud import tasks_v2
+
+    http_request = {
+        'http_method': tasks_v2.HttpMethod.POST,
+        'url': CONTINUATION_URL,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(payload).encode()
+    }
+    if CONTINUATION_SERVICE_ACCOUNT:
+        http_request['oidc_token'] = {'service_account_email': CONTINUATION_SERVICE_ACCOUNT}
+    try:
+        task = tasks_v2.CloudTasksClient().create_task(parent=CONTINUATION_QUEUE, task={'http_request': http_request})
+    except Exception as e:
+        logger.error(f"❌ Failed to enqueue continuation: {e}")
+        return None
+    logger.info(f"⏭️ Continuation enqueued: {task.name}")
+    return task.name
+
+
+def run_until_done(invoke, payload=None, max_invocations=100):
+    """Local driver: call invoke(payload) -> (body, status) until no cursor comes back."""
+    payload = dict(payload or {})
+    responses = []
+    for invocation in range(1, max_invocations + 1):
+        body, status = invoke(payload)
+        responses.append((body, status))
+        cursor = body.get('cursor')
+        logger.info(f"Invocation {invocation}: HTTP {status}, {'cursor ' + json.dumps(cursor) if cursor else 'done'}")
+        if not cursor:
+            break
+        payload = continuation_payload(payload, cursor)
+    return responses
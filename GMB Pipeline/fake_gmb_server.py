@@ -0,0 +1,256 @@
+"""Local stand-in for the Business Profile APIs, for benchmarks and dry runs.
+
+Serves the endpoints gmb-pipeline.py calls: the OAuth token exchange,
+accounts and locations listing (paged by pageSize / pageToken) and
+fetchMultiDailyMetricsTimeSeries. The data is either synthetic (N
+accounts x M locations with D days of history up to today) or replayed
+from a recording made with gmb_fixtures.py. Requests can be slowed down,
+answered with 429s, and a share of locations can be refused with 403s
+to exercise the retry and skip paths.
+
+bench_gmb_pipeline.py starts it in-process. To run it on its own and
+point a pipeline at it with ACCOUNTS_URL, LOCATIONS_URL_BASE and
+PERFORMANCE_URL_BASE:
+
+    python fake_gmb_server.py --accounts 3 --locations 100 --days 400 --latency-ms 50
+    python fake_gmb_server.py --fixtures fixtures/gmb_daily.ndjson.gz
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from gmb_fixtures import PERFORMANCE_PATH, FixtureSet
+
+LOCATIONS_PATH = re.compile(r'/accounts/([^/]+)/locations$')
+DEFAULT_PAGE_SIZE = 100
+
+
+def stable_fraction(*parts):
+    """Deterministic value in [0, 1) for a key, so reruns see the same data."""
+    return zlib.crc32('|'.join(str(part) for part in parts).encode()) / 2**32
+
+
+class SyntheticGMB:
+    """accounts x locations, each with `days` days of metrics ending today."""
+
+    def __init__(self, accounts, locations_per_account, days, forbidden_rate=0.0):
+        self.accounts = [str(100000 + index) for index in range(accounts)]
+        self.locations = {
+            account_id: [
+                {'name': f"locations/{account_id}{index:05d}", 'title': f"Clinic {account_id}-{index}",
+                 'storeCode': f"S{account_id}-{index}", 'metadata': {'hasVoiceOfMerchant': True}}
+                for index in range(locations_per_account)
+            ]
+            for account_id in self.accounts
+        }
+        self.first_day = date.today() - timedelta(days=days - 1)
+        self.forbidden_rate = forbidden_rate
+
+    def page(self, path, query):
+        if path.endswith('/accounts'):
+            return 200, 'accounts', [{'name': f"accounts/{account_id}"} for account_id in self.accounts]
+        match = LOCATIONS_PATH.search(path)
+        if match and match.group(1) in self.locations:
+            return 200, 'locations', self.locations[match.group(1)]
+        return 404, None, {'error': {'code': 404, 'message': 'Not found'}}
+
+    def performance(self, location_id, metrics, start, end):
+        if stable_fraction('forbidden', location_id) < self.forbidden_rate:
+            return 403, {'error': {'code': 403, 'message': 'The caller does not have permission'}}
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        return 200, {'multiDailyMetricTimeSeries': [{'dailyMetricTimeSeries': [
+            {'dailyMetric': metric, 'timeSeries': {'datedValues': [
+                {'date': {'year': day.year, 'month': day.month, 'day': day.day}, 'value': str(int(stable_fraction(location_id, metric, day) * 50))}
+                if self.first_day <= day <= date.today() else
+                {'date': {'year': day.year, 'month': day.month, 'day': day.day}}
+                for day in days
+            ]}}
+            for metric in metrics
+        ]}]}
+
+
+class ReplayedGMB:
+    """Responses from a gmb_fixtures.py recording."""
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def page(self, path, query):
+        recorded = self.fixtures.page(path, query)
+        if recorded is None:
+            return 404, None, {'error': {'code': 404, 'message': f'No recording for {path}'}}
+        # Recorded pages are served as they were, page tokens included
+        status, body = recorded
+        return status, None, body
+
+    def performance(self, location_id, metrics, start, end):
+        if location_id in self.fixtures.performance_errors:
+            return self.fixtures.performance_errors[location_id]
+        if location_id not in self.fixtures.performance:
+            return 404, {'error': {'code': 404, 'message': f'No recording for location {location_id}'}}
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        series = []
+        for metric in metrics:
+            values = self.fixtures.daily_values(location_id, metric)
+            dated_values = []
+            for day in days:
+                value = values.get((day.year, day.month, day.day))
+                if value is not None:
+                    dated_values.append({'date': {'year': day.year, 'month': day.month, 'day': day.day}, 'value': value})
+            series.append({'dailyMetric': metric, 'timeSeries': {'datedValues': dated_values}})
+        return 200, {'multiDailyMetricTimeSeries': [{'dailyMetricTimeSeries': series}]}
+
+
+class FakeGMBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, source, latency_ms=0, rate_limit_rate=0.0, retry_after=1):
+        super().__init__(address, FakeGMBHandler)
+        self.source = source
+        self.latency_ms = latency_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'token': 0, 'accounts': 0, 'locations': 0, 'performance': 0, 'rate_limited': 0, 'forbidden': 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def pipeline_env(self):
+        """Environment variables that point gmb-pipeline.py at this server."""
+        return {
+            'ACCOUNTS_URL': f"{self.url}/v1/accounts",
+            'LOCATIONS_URL_BASE': f"{self.url}/v1",
+            'PERFORMANCE_URL_BASE': f"{self.url}/v1"
+        }
+
+    @property
+    def token_url(self):
+        return f"{self.url}/token"
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self.stats_lock:
+            return dict(self.stats)
+
+
+class FakeGMBHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def throttle(self):
+        """Apply latency and 429 injection; True if the request was answered with a 429."""
+        server = self.server
+        server.count('requests')
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+        if server.rate_limit_rate and random.random() < server.rate_limit_rate:
+            server.count('rate_limited')
+            self.send_json(429, {'error': {'code': 429, 'message': 'Quota exceeded'}}, {'Retry-After': str(server.retry_after)})
+            return True
+        return False
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.throttle():
+            return
+        self.server.count('token')
+        self.send_json(200, {'access_token': 'fake-gmb-token', 'expires_in': 3600, 'token_type': 'Bearer'})
+
+    def do_GET(self):
+        if self.throttle():
+            return
+        server = self.server
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        performance = PERFORMANCE_PATH.search(url.path)
+        if performance:
+            server.count('performance')
+            try:
+                start, end = (
+                    date(*(int(query[f'dailyRange.{bound}.{part}'][0]) for part in ('year', 'month', 'day')))
+                    for bound in ('start_date', 'end_date')
+                )
+            except (KeyError, ValueError):
+                self.send_json(400, {'error': {'code': 400, 'message': 'Invalid dailyRange'}})
+                return
+            status, body = server.source.performance(performance.group(1), query.get('dailyMetrics', []), start, end)
+            if status == 403:
+                server.count('forbidden')
+            self.send_json(status, body)
+            return
+
+        server.count('locations' if LOCATIONS_PATH.search(url.path) else 'accounts')
+        status, field, entries = server.source.page(url.path, query)
+        if field is None:
+            self.send_json(status, entries)
+            return
+        # Synthetic listings are paged here the same way the API pages them
+        size = int((query.get('pageSize') or [DEFAULT_PAGE_SIZE])[0])
+        offset = int((query.get('pageToken') or ['0'])[0])
+        body = {field: entries[offset:offset + size]}
+        if offset + size < len(entries):
+            body['nextPageToken'] = str(offset + size)
+        self.send_json(status, body)
+
+
+def start_server(source, port=0, **options):
+    """Start a fake Business Profile API in a background thread and return the server."""
+    server = FakeGMBServer(('127.0.0.1', port), source, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=2)
+    parser.add_argument('--locations', type=int, default=50, help='Locations per account')
+    parser.add_argument('--days', type=int, default=400, help='Days of synthetic history up to today')
+    parser.add_argument('--fixtures', help='Replay a gmb_fixtures.py recording instead of synthetic data')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with 429')
+    parser.add_argument('--forbidden-rate', type=float, default=0.0, help='Share of locations answered with 403')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.fixtures:
+        source = ReplayedGMB(FixtureSet.load(args.fixtures))
+        described = f"replaying {args.fixtures}"
+    else:
+        source = SyntheticGMB(args.accounts, args.locations, args.days, args.forbidden_rate)
+        described = f"{args.accounts} accounts x {args.locations} locations x {args.days} days"
+    server = FakeGMBServer(('127.0.0.1', args.port), source, latency_ms=args.latency_ms, rate_limit_rate=args.rate_limit_rate)
+    logging.info(f"Fake Business Profile API ({described}) at {server.url}, token URL {server.token_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info(f"Stopped: {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
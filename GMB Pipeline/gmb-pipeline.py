@@ -1,12 +1,26 @@
 import functions_framework
-from google.cloud import secretmanager, bigquery
+import warehouse
 import requests
+import http_transport
 import logging
 import json
+import io
 import os
-from urllib.parse import urlencode
-from datetime import datetime, date, timedelta
-from google.api_core.exceptions import NotFound
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+from datetime import datetime, timedelta
+from gmb_credentials import CredentialManager
+from gmb_location_catalog import BigQueryCatalogStore, FileCatalogStore, LocationCatalog
+from deadline import Deadline, continuation_payload, enqueue_continuation
+from gmb_parser import parse_daily_metrics
+from gmb_schema import MetricsTableSchema, SchemaManager
+from gmb_backfill import (
+    BackfillChunk, BigQueryCheckpointStore, SQLiteCheckpointStore,
+    location_id_of, pending_jobs, plan_backfill, plan_incremental, summarize_plan
+)
 
 # Configure logging for Cloud Logging (minimal)
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +33,27 @@ TABLE_ID = os.environ.get('TABLE_ID', 'daily_metrics')
 ACCOUNTS_URL = os.environ.get('ACCOUNTS_URL', 'https://mybusinessbusinessinformation.googleapis.com/v1/accounts')
 LOCATIONS_URL_BASE = os.environ.get('LOCATIONS_URL_BASE', 'https://mybusinessbusinessinformation.googleapis.com/v1')
 PERFORMANCE_URL_BASE = os.environ.get('PERFORMANCE_URL_BASE', 'https://businessprofileperformance.googleapis.com/v1')
+MAX_CONCURRENCY = int(os.environ.get('MAX_CONCURRENCY', '8'))  # Parallel location workers
+REQUESTS_PER_SECOND = float(os.environ.get('REQUESTS_PER_SECOND', '10'))  # Per-host API rate limit, 0 for none
+SINK_MAX_BUFFER_MB = int(os.environ.get('SINK_MAX_BUFFER_MB', '64'))  # Buffered rows before an early flush
+STAGING_TABLE_EXPIRATION_HOURS = float(os.environ.get('STAGING_TABLE_EXPIRATION_HOURS', '24'))  # Leftover staging tables are dropped after this
+RAW_PAYLOAD_SAMPLE_RATE = float(os.environ.get('RAW_PAYLOAD_SAMPLE_RATE', '0'))  # Fraction of raw API responses to log (debug)
+BACKFILL_WINDOW_DAYS = int(os.environ.get('BACKFILL_WINDOW_DAYS', '31'))  # Days fetched per API call in backfills
+BACKFILL_SHARD_SIZE = int(os.environ.get('BACKFILL_SHARD_SIZE', '50'))  # Locations merged and checkpointed together
+BACKFILL_LOAD_MODE = os.environ.get('BACKFILL_LOAD_MODE', 'merge')  # 'merge' rows, or 'partition' to overwrite whole days
+PARTITION_LOAD_CONCURRENCY = int(os.environ.get('PARTITION_LOAD_CONCURRENCY', '8'))  # Day partitions loaded at the same time
+CHECKPOINT_BACKEND = os.environ.get('CHECKPOINT_BACKEND', 'sqlite')  # 'sqlite' locally, 'bigquery' in prod
+CHECKPOINT_PATH = os.environ.get('CHECKPOINT_PATH', '/tmp/gmb_backfill_checkpoints.sqlite')
+CHECKPOINT_TABLE_ID = os.environ.get('CHECKPOINT_TABLE_ID', 'backfill_checkpoints')
+SECRET_TTL_SECONDS = int(os.environ.get('SECRET_TTL_SECONDS', '3600'))  # Secret Manager cache lifetime
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.environ.get('TOKEN_REFRESH_MARGIN_SECONDS', '300'))  # Refresh this long before expiry
+LOCATION_CATALOG_BACKEND = os.environ.get('LOCATION_CATALOG_BACKEND', 'file')  # 'file' locally, 'bigquery' in prod
+LOCATION_CATALOG_PATH = os.environ.get('LOCATION_CATALOG_PATH', '/tmp/gmb_location_catalog.json')
+LOCATION_CATALOG_TABLE_ID = os.environ.get('LOCATION_CATALOG_TABLE_ID', 'location_catalog')
+LOCATION_CATALOG_TTL_HOURS = float(os.environ.get('LOCATION_CATALOG_TTL_HOURS', '24'))  # Relist accounts/locations after this
+LOCATION_CATALOG_REFRESH = os.environ.get('LOCATION_CATALOG_REFRESH', 'stale')  # 'stale' lists inline, 'background' during the run
+INCREMENTAL_DAILY = os.environ.get('INCREMENTAL_DAILY', 'true').lower() == 'true'  # Daily runs fetch only dates not loaded yet
+RESTATEMENT_DAYS = int(os.environ.get('RESTATEMENT_DAYS', '1'))  # Loaded days refetched in case Google revises them
 
 # Metrics from fetchMultiDailyMetricsTimeSeries
 METRICS = [
@@ -35,92 +70,86 @@ METRICS = [
     'BUSINESS_FOOD_MENU_CLICKS'
 ]
 
+class TokenBucket:
+    """Thread-safe token bucket limiting the request rate to one host; a rate of 0 or less means no limit."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(url):
+    """Return the shared token bucket for the host of a URL."""
+    host = urlparse(url).netloc
+    with _rate_limiters_lock:
+        if host not in _rate_limiters:
+            _rate_limiters[host] = TokenBucket(REQUESTS_PER_SECOND)
+        return _rate_limiters[host]
+
+# Shared by every worker thread and reused across warm invocations
+credentials = CredentialManager(PROJECT_ID, secret_ttl=SECRET_TTL_SECONDS, refresh_margin=TOKEN_REFRESH_MARGIN_SECONDS)
+
 def get_secret(secret_id):
-    """Retrieve a secret from Secret Manager."""
-    try:
-        client = secretmanager.SecretManagerServiceClient()
-        secret_name = f"projects/{PROJECT_ID}/secrets/{secret_id}/versions/latest"
-        response = client.access_secret_version(name=secret_name)
-        return response.payload.data.decode('UTF-8')
-    except Exception as e:
-        logger.error(f"Error accessing secret {secret_id}: {e}")
-        raise
+    """Retrieve a secret from Secret Manager (cached per process)."""
+    return credentials.get_secret(secret_id)
 
 def get_access_token():
-    """Get access token using refresh token from Secret Manager."""
-    try:
-        client_id = get_secret('gmb-client-id')
-        client_secret = get_secret('gmb-client-secret')
-        refresh_token = get_secret('gmb-refresh-token')
-        data = {
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'refresh_token': refresh_token,
-            'grant_type': 'refresh_token'
-        }
-        response = requests.post('https://oauth2.googleapis.com/token', data=data)
-        if response.status_code != 200:
-            logger.error(f"Token refresh failed: {response.status_code} {response.text}")
-            response.raise_for_status()
-        return response.json()['access_token']
-    except requests.HTTPError as e:
-        logger.error(f"HTTP error refreshing access token: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Error refreshing access token: {e}")
-        raise
+    """Get a cached access token, refreshed from Secret Manager credentials before it expires."""
+    return credentials.get_access_token()
+
+# Metrics table columns, load schema and MERGE are all generated from this definition
+TABLE_SCHEMA = MetricsTableSchema(METRICS)
+schema_manager = SchemaManager(TABLE_SCHEMA, f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}")
+
+def get_table_schema():
+    """Schema shared by the metrics table and its staging tables."""
+    return TABLE_SCHEMA.fields()
 
 def create_bigquery_table():
-    """Create a date-partitioned BigQuery table with pivoted metric columns."""
+    """Create the date-partitioned metrics table, or add columns for new METRICS (once per process)."""
     try:
-        client = bigquery.Client(project=PROJECT_ID)
-        dataset_ref = client.dataset(DATASET_ID)
-        table_ref = dataset_ref.table(TABLE_ID)
-        schema = [
-            bigquery.SchemaField("store_id", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("account_id", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("location_id", "STRING", mode="REQUIRED"),
-            bigquery.SchemaField("location_title", "STRING"),
-            bigquery.SchemaField("store_code", "STRING"),
-            bigquery.SchemaField("is_verified", "BOOLEAN"),
-            bigquery.SchemaField("date", "DATE", mode="REQUIRED"),
-        ]
-        for metric in METRICS:
-            schema.append(bigquery.SchemaField(metric, "INTEGER", mode="NULLABLE"))
-        schema.append(bigquery.SchemaField("load_timestamp", "TIMESTAMP", mode="REQUIRED"))
-        
-        table = bigquery.Table(table_ref, schema=schema)
-        table.time_partitioning = bigquery.TimePartitioning(
-            type_=bigquery.TimePartitioningType.DAY,
-            field="date"
-        )
-        try:
-            client.get_table(table_ref)
-        except NotFound:
-            client.create_table(table)
+        schema_manager.ensure(warehouse.get_client(PROJECT_ID))
     except Exception as e:
         logger.error(f"Error creating BigQuery table: {e}")
         raise
 
-def list_accounts(access_token, target_account_ids=None):
-    """List all GMB accounts with pagination."""
+def list_accounts():
+    """List the IDs of all GMB accounts with pagination; raises on API errors."""
     accounts = []
     page_token = None
     try:
-        headers = {'Authorization': f'Bearer {access_token}'}
         while True:
+            headers = {'Authorization': f'Bearer {get_access_token()}'}
             params = {'pageSize': 100}
             if page_token:
                 params['pageToken'] = page_token
-            response = requests.get(ACCOUNTS_URL, headers=headers, params=params)
+            get_rate_limiter(ACCOUNTS_URL).acquire()
+            response = http_transport.get(ACCOUNTS_URL, headers=headers, params=params)
             if response.status_code != 200:
                 logger.error(f"Accounts request failed: {response.status_code} {response.text}")
                 response.raise_for_status()
             data = response.json()
-            new_accounts = data.get('accounts', [])
-            if target_account_ids:
-                new_accounts = [a for a in new_accounts if a['name'].split('/')[-1] in target_account_ids]
-            accounts.extend(new_accounts)
+            accounts.extend(account['name'].split('/')[-1] for account in data.get('accounts', []))
             page_token = data.get('nextPageToken')
             if not page_token:
                 break
@@ -128,45 +157,44 @@ def list_accounts(access_token, target_account_ids=None):
         return accounts
     except requests.HTTPError as e:
         logger.error(f"HTTP error listing accounts: {e}")
-        return []
+        raise
     except Exception as e:
         logger.error(f"Error listing accounts: {e}")
-        return []
+        raise
 
-def list_locations(access_token, account_id):
-    """List only verified locations for a specific account with pagination."""
+def list_locations(account_id):
+    """List all locations, verified or not, for a specific account with pagination; raises on API errors."""
     locations = []
     page_token = None
     try:
-        headers = {'Authorization': f'Bearer {access_token}'}
         while True:
+            headers = {'Authorization': f'Bearer {get_access_token()}'}
             params = {'readMask': 'name,storeCode,title,metadata', 'pageSize': 100}
             if page_token:
                 params['pageToken'] = page_token
             locations_url = f"{LOCATIONS_URL_BASE}/accounts/{account_id}/locations"
-            response = requests.get(locations_url, headers=headers, params=params)
+            get_rate_limiter(locations_url).acquire()
+            response = http_transport.get(locations_url, headers=headers, params=params)
             if response.status_code != 200:
                 logger.error(f"Locations request failed for account {account_id}: {response.status_code} {response.text}")
                 response.raise_for_status()
             data = response.json()
-            new_locations = [loc for loc in data.get('locations', []) if loc.get('metadata', {}).get('hasVoiceOfMerchant', False)]
-            locations.extend(new_locations)
+            locations.extend(data.get('locations', []))
             page_token = data.get('nextPageToken')
             if not page_token:
                 break
-        logger.info(f"Found {len(locations)} verified locations for account {account_id}")
+        logger.info(f"Found {len(locations)} locations for account {account_id}")
         return locations
     except requests.HTTPError as e:
         logger.error(f"HTTP error listing locations for account {account_id}: {e}")
-        return []
+        raise
     except Exception as e:
         logger.error(f"Error listing locations for account {account_id}: {e}")
-        return []
+        raise
 
-def fetch_performance_data(access_token, location_id, location_title, store_code, is_verified, start_date, end_date, max_retries=3, delay=2):
+def fetch_performance_data(location_id, location_title, store_code, is_verified, start_date, end_date, max_retries=3, delay=2):
     """Fetch performance data for a specific location and date range with retries."""
     performance_url = f"{PERFORMANCE_URL_BASE}/locations/{location_id}:fetchMultiDailyMetricsTimeSeries"
-    headers = {'Authorization': f'Bearer {access_token}'}
     params = {
         'dailyRange.start_date.year': start_date.year,
         'dailyRange.start_date.month': start_date.month,
@@ -182,12 +210,21 @@ def fetch_performance_data(access_token, location_id, location_title, store_code
     
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, headers=headers)
+            access_token = get_access_token()
+            get_rate_limiter(url).acquire()
+            # 429s are retried by the loop below, not by the transport as well
+            response = http_transport.get(url, headers={'Authorization': f'Bearer {access_token}'}, handles_rate_limits=True)
+            if response.status_code == 401 and attempt < max_retries - 1:
+                # Token revoked or expired early; refresh once and retry
+                logger.warning(f"Access token rejected for location {location_id}, refreshing")
+                credentials.invalidate_token(access_token)
+                continue
             if response.status_code != 200:
                 logger.error(f"Failed for location {location_id}: {response.status_code} {response.text}")
                 response.raise_for_status()
             data = response.json()
-            logger.info(f"Raw response for {location_id}: {json.dumps(data)}")
+            if RAW_PAYLOAD_SAMPLE_RATE and random.random() < RAW_PAYLOAD_SAMPLE_RATE:
+                logger.info(f"Raw response for {location_id}: {json.dumps(data)}")
             return data
         except requests.HTTPError as e:
             if response.status_code == 403:
@@ -197,8 +234,7 @@ def fetch_performance_data(access_token, location_id, location_title, store_code
                 if attempt == max_retries - 1:
                     logger.error(f"Max retries reached for location {location_id}")
                     return None
-                from time import sleep
-                sleep(delay * (2 ** attempt))
+                time.sleep(delay * (2 ** attempt))
             else:
                 logger.error(f"HTTP error for location {location_id}: {e}")
                 return None
@@ -207,117 +243,403 @@ def fetch_performance_data(access_token, location_id, location_title, store_code
             return None
     return None
 
-def insert_metrics_to_bigquery(account_id, location_id, location_title, store_code, is_verified, data, start_date, end_date, backfill=False):
-    """Insert or update metrics into BigQuery using MERGE for backfill or daily overwrite."""
-    try:
-        client = bigquery.Client(project=PROJECT_ID)
-        table_ref = client.dataset(DATASET_ID).table(TABLE_ID)
-        
-        rows_to_insert = []
-        load_timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')  # Format as TIMESTAMP string
-        metrics_by_date = {}
-
-        if data and 'multiDailyMetricTimeSeries' in data:
-            for metric_series in data.get('multiDailyMetricTimeSeries', []):
-                for daily_metric in metric_series.get('dailyMetricTimeSeries', []):
-                    metric_name = daily_metric.get('dailyMetric')
-                    time_series = daily_metric.get('timeSeries', {}).get('datedValues', [])
-                    for dated_value in time_series:
-                        try:
-                            date_key = date(
-                                int(dated_value['date']['year']),
-                                int(dated_value['date']['month']),
-                                int(dated_value['date']['day'])
-                            ).isoformat()  # Keep as ISO string for DATE casting
-                            date_obj = date.fromisoformat(date_key)
-                            # Filter dates for backfill
-                            if backfill and (date_obj < start_date or date_obj > end_date):
-                                logger.warning(f"Skipping date {date_key} outside backfill range {start_date} to {end_date} for location {location_id}")
-                                continue
-                        except Exception as e:
-                            logger.warning(f"Invalid date format for location {location_id}: {e}")
-                            continue
-                        value = int(dated_value.get('value', 0))
-                        if value == 0:
-                            logger.warning(f"Zero value for {metric_name} on {date_key} for {location_id}")
-                        if date_key not in metrics_by_date:
-                            metrics_by_date[date_key] = {metric: 0 for metric in METRICS}
-                        metrics_by_date[date_key][metric_name] = value
-
-        for date_key, metric_values in metrics_by_date.items():
-            row = {
-                'store_id': store_code or 'unknown_store',
-                'account_id': account_id,
-                'location_id': location_id,
-                'location_title': location_title,
-                'store_code': store_code or 'unknown_store',
-                'is_verified': bool(is_verified),  # Ensure boolean type
-                'date': date_key,  # ISO string, will be cast to DATE
-                'load_timestamp': load_timestamp  # TIMESTAMP string
-            }
-            for metric in METRICS:
-                row[metric] = metric_values.get(metric, 0)
-            rows_to_insert.append(row)
+class BigQueryMetricsSink:
+    """Buffer pivoted rows from all locations and write them in bulk.
 
-        if rows_to_insert:
-            # Prepare rows as an array of structs for BigQuery
-            struct_rows = [
-                {
-                    'store_id': row['store_id'],
-                    'account_id': row['account_id'],
-                    'location_id': row['location_id'],
-                    'location_title': row['location_title'],
-                    'store_code': row['store_code'],
-                    'is_verified': row['is_verified'],
-                    'date': row['date'],  # ISO string for DATE
-                    **{metric: row[metric] for metric in METRICS},
-                    'load_timestamp': row['load_timestamp']  # TIMESTAMP string
-                }
-                for row in rows_to_insert
-            ]
+    Rows are kept in memory as NDJSON. On flush they are loaded into a
+    staging table with a single load job and merged into the metrics table
+    with a single MERGE keyed on (location_id, date). The MERGE only reads
+    the date partitions the buffered rows fall in. The buffer is flushed
+    early whenever it grows past max_buffer_bytes.
+
+    The buffer is swapped out under the lock and written outside it, so
+    workers keep adding rows while a chunk is loaded; writes themselves
+    run one at a time, so MERGEs never contend for the same partitions.
+    """
+
+    def __init__(self, max_buffer_bytes=None):
+        self.max_buffer_bytes = max_buffer_bytes or SINK_MAX_BUFFER_MB * 1024 * 1024
+        self.run_id = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.client = None
+        self.lines = []
+        self.buffer_bytes = 0
+        self.buffer_locations = set()
+        self.buffer_dates = None  # (min, max) ISO date of the buffered rows
+        self.chunks_flushed = 0
+        self.rows_written = 0
+        self.failed_location_ids = set()
+
+    def add(self, location_id, rows):
+        """Buffer rows for one location, flushing if the memory cap is reached."""
+        return self.add_encoded(location_id, [(row['date'], json.dumps(row).encode('utf-8')) for row in rows])
+
+    def add_encoded(self, location_id, entries):
+        """Buffer (date, JSON line) entries for one location, flushing if the memory cap is reached."""
+        dates = [date for date, _ in entries]
+        lines = [line for _, line in entries]
+        batch = None
+        with self.lock:
+            if dates:
+                low, high = self.buffer_dates or (dates[0], dates[0])
+                self.buffer_dates = (min(low, *dates), max(high, *dates))
+            self.lines.extend(lines)
+            self.buffer_bytes += sum(len(line) + 1 for line in lines)
+            self.buffer_locations.add(location_id)
+            if self.buffer_bytes >= self.max_buffer_bytes:
+                batch = self._take_buffer_locked()
+        if batch:
+            self._write(*batch)
+        return len(entries)
+
+    def flush(self):
+        """Load and merge everything buffered so far, after any early flush still running."""
+        with self.lock:
+            batch = self._take_buffer_locked()
+        if batch:
+            self._write(*batch)
+        else:
+            with self.write_lock:
+                pass
+        return self.rows_written
+
+    def pop_failed_locations(self):
+        """Return and clear the locations whose rows failed to load."""
+        with self.lock:
+            failed, self.failed_location_ids = self.failed_location_ids, set()
+        return failed
+
+    def _take_buffer_locked(self):
+        """Swap out the buffer; returns (lines, locations, dates, chunk number) or None if empty."""
+        if not self.lines:
+            return None
+        batch = (self.lines, self.buffer_locations, self.buffer_dates, self.chunks_flushed + 1)
+        self.lines, self.buffer_bytes, self.buffer_locations, self.buffer_dates = [], 0, set(), None
+        self.chunks_flushed += 1
+        return batch
 
-            # Use MERGE with ArrayQueryParameter
-            merge_query = f"""
-                WITH rows AS (
-                    SELECT * FROM UNNEST(@rows)
+    def _write(self, lines, locations, dates, chunk):
+        first_date, last_date = dates
+        staging_id = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}_staging_{self.run_id}_{chunk}"
+        with self.write_lock:
+            try:
+                from google.cloud import bigquery
+
+                if self.client is None:
+                    self.client = warehouse.get_client(PROJECT_ID)
+                # Expires on its own if the instance dies before the cleanup below
+                staging_table = bigquery.Table(staging_id, schema=get_table_schema())
+                staging_table.expires = datetime.utcnow() + timedelta(hours=STAGING_TABLE_EXPIRATION_HOURS)
+                self.client.create_table(staging_table)
+                job_config = bigquery.LoadJobConfig(
+                    schema=get_table_schema(),
+                    source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                    write_disposition=bigquery.WriteDisposition.WRITE_APPEND  # Into the empty table just created
+                )
+                load_job = self.client.load_table_from_file(io.BytesIO(b'\n'.join(lines)), staging_id, job_config=job_config)
+                load_job.result()
+
+                merge_query = TABLE_SCHEMA.merge_statement(
+                    f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}", staging_id, first_date, last_date
                 )
-                MERGE `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}` T
-                USING rows S
-                ON T.location_id = S.location_id AND T.date = S.date
-                WHEN MATCHED THEN
-                    UPDATE SET
-                        T.store_id = S.store_id,
-                        T.account_id = S.account_id,
-                        T.location_title = S.location_title,
-                        T.store_code = S.store_code,
-                        T.is_verified = S.is_verified,
-                        T.load_timestamp = S.load_timestamp,
-                        {', '.join([f'T.{metric} = S.{metric}' for metric in METRICS])}
-                WHEN NOT MATCHED THEN
-                    INSERT (store_id, account_id, location_id, location_title, store_code, is_verified, date, {', '.join(METRICS)}, load_timestamp)
-                    VALUES (S.store_id, S.account_id, S.location_id, S.location_title, S.store_code, S.is_verified, S.date, {', '.join([f'S.{metric}' for metric in METRICS])}, S.load_timestamp)
-            """
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ArrayQueryParameter("rows", "STRUCT<store_id STRING, account_id STRING, location_id STRING, location_title STRING, store_code STRING, is_verified BOOLEAN, date DATE, " + ", ".join([f"{metric} INTEGER" for metric in METRICS]) + ", load_timestamp TIMESTAMP>", struct_rows)
-                ],
-                use_legacy_sql=False
-            )
-            query_job = client.query(merge_query, job_config=job_config)
-            query_job.result()  # Wait for the job to complete
-            logger.info(f"Updated/Inserted {len(rows_to_insert)} rows.")
-            return len(rows_to_insert)
+                self.client.query(merge_query).result()
+                with self.lock:
+                    self.rows_written += len(lines)
+                logger.info(f"Updated/Inserted {len(lines)} rows for {len(locations)} locations in one MERGE.")
+            except Exception as e:
+                logger.error(f"Error loading/merging {len(lines)} rows for {len(locations)} locations: {e}")
+                with self.lock:
+                    self.failed_location_ids.update(locations)
+                # The table may have been changed underneath us; check it again on the next run
+                schema_manager.invalidate()
+            finally:
+                if self.client is not None:
+                    try:
+                        self.client.delete_table(staging_id, not_found_ok=True)
+                    except Exception as e:
+                        logger.warning(f"Could not delete staging table {staging_id}: {e}")
+
+class PartitionOverwriteSink:
+    """Buffer a window's rows from every location and replace whole day partitions.
+
+    On flush, each date's rows are written to daily_metrics$YYYYMMDD with
+    a WRITE_TRUNCATE load job; the loads of different days run
+    concurrently. There is no DML, but a partition is replaced by exactly
+    the rows buffered for it, so a flush must hold every location already
+    in its dates (see can_replace()). Anything less goes through
+    merge_into() instead.
+
+    A window cannot be loaded in parts, so it cannot flush early. Once the
+    buffer grows past max_buffer_bytes, the window spills: its rows go to
+    merge_sink, which flushes under its own cap, and the window is merged.
+    """
+
+    def __init__(self, merge_sink, concurrency=None, max_buffer_bytes=None):
+        self.merge_sink = merge_sink
+        self.concurrency = concurrency or PARTITION_LOAD_CONCURRENCY
+        self.max_buffer_bytes = max_buffer_bytes or SINK_MAX_BUFFER_MB * 1024 * 1024
+        self.lock = threading.Lock()
+        self.client = None
+        self.rows = {}  # location_id -> [(date, JSON line)]
+        self.buffer_bytes = 0
+        self.spilled = False
+        self.chunks_flushed = 0
+        self.partitions_loaded = 0
+        self.rows_written = 0
+        self.failed_location_ids = set()
+
+    def add(self, location_id, rows):
+        entries = [(row['date'], json.dumps(row).encode('utf-8')) for row in rows]
+        with self.lock:
+            if self.spilled:
+                spill = {location_id: entries}
+            else:
+                self.rows.setdefault(location_id, []).extend(entries)
+                self.buffer_bytes += sum(len(line) + 1 for _, line in entries)
+                if self.buffer_bytes < self.max_buffer_bytes:
+                    return len(rows)
+                logger.warning(f"⚠️ Window buffer passed {self.max_buffer_bytes // (1024 * 1024)} MB, merging its rows instead of replacing partitions")
+                spill = self._take_buffer_locked()
+                self.spilled = True
+        for spilled_id, spilled_entries in spill.items():
+            self.merge_sink.add_encoded(spilled_id, spilled_entries)
+        return len(rows)
+
+    def can_replace(self, location_ids, start_date, end_date):
+        """Whether a flush keeps every location with rows between start_date and end_date.
+
+        location_ids are the locations fetched without error. Any other
+        location already in those partitions would lose its rows.
+        """
+        if self.spilled:
+            return False
+        from google.cloud import bigquery
+
+        if self.client is None:
+            self.client = warehouse.get_client(PROJECT_ID)
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter('start_date', 'DATE', start_date),
+                bigquery.ScalarQueryParameter('end_date', 'DATE', end_date)
+            ]
+        )
+        try:
+            rows = self.client.query(f"""
+                SELECT DISTINCT location_id
+                FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+                WHERE date BETWEEN @start_date AND @end_date
+            """, job_config=job_config).result()
+            existing = {row['location_id'] for row in rows}
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read the locations in partitions {start_date} to {end_date}: {e}")
+            return False
+        missing = existing - set(location_ids)
+        if missing:
+            logger.info(f"{len(missing)} locations in partitions {start_date} to {end_date} were not fetched")
+        return not missing
+
+    def merge_into(self, sink):
+        """Hand the buffered rows to a MERGE sink instead, for incomplete windows."""
+        with self.lock:
+            buffered = self._take_buffer_locked()
+        for location_id, entries in buffered.items():
+            sink.add_encoded(location_id, entries)
+
+    def flush(self):
+        """Replace every day partition with rows in the buffer."""
+        with self.lock:
+            buffered = self._take_buffer_locked()
+        if not buffered:
+            return self.rows_written
+        days = {}
+        for location_id, entries in buffered.items():
+            for date, line in entries:
+                days.setdefault(date, []).append((location_id, line))
+        self.chunks_flushed += 1
+        if self.client is None:
+            self.client = warehouse.get_client(PROJECT_ID)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            loaded = list(executor.map(self.load_partition, days.keys(), days.values()))
+        for day, ok in zip(days, loaded):
+            if ok:
+                self.partitions_loaded += 1
+                self.rows_written += len(days[day])
+            else:
+                self.failed_location_ids.update(location_id for location_id, _ in days[day])
+        logger.info(f"Replaced {sum(loaded)} of {len(days)} day partitions for {len(buffered)} locations with load jobs.")
+        return self.rows_written
+
+    def load_partition(self, day, entries):
+        from google.cloud import bigquery
+
+        partition_id = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}${day.replace('-', '')}"
+        job_config = bigquery.LoadJobConfig(
+            schema=get_table_schema(),
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        )
+        try:
+            payload = b'\n'.join(line for _, line in entries)
+            self.client.load_table_from_file(io.BytesIO(payload), partition_id, job_config=job_config).result()
+            return True
+        except Exception as e:
+            logger.error(f"Error loading partition {partition_id} ({len(entries)} rows): {e}")
+            schema_manager.invalidate()
+            return False
+
+    def pop_failed_locations(self):
+        """Return and clear the locations whose rows failed to load."""
+        with self.lock:
+            failed, self.failed_location_ids = self.failed_location_ids, set()
+        return failed
+
+    def _take_buffer_locked(self):
+        """Swap out the buffer and start the next window unspilled."""
+        buffered = self.rows
+        self.rows, self.buffer_bytes, self.spilled = {}, 0, False
+        return buffered
+
+def build_metric_rows(account_id, location_id, location_title, store_code, is_verified, data, start_date, end_date):
+    """Pivot a fetchMultiDailyMetricsTimeSeries response into one row per date."""
+    columns, skipped = parse_daily_metrics(data, METRICS, start_date, end_date)
+    if skipped:
+        logger.warning(f"Skipped {skipped} datapoints with invalid dates for location {location_id}")
+
+    load_timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')  # TIMESTAMP string, UTC
+    rows_to_insert = []
+    for date_key, metric_values in columns.iter_rows():
+        row = {
+            'store_id': store_code or 'unknown_store',
+            'account_id': account_id,
+            'location_id': location_id,
+            'location_title': location_title,
+            'store_code': store_code or 'unknown_store',
+            'is_verified': bool(is_verified),  # Ensure boolean type
+            'date': date_key,  # ISO string, will be cast to DATE
+            'load_timestamp': load_timestamp  # TIMESTAMP string
+        }
+        row.update(metric_values)
+        rows_to_insert.append(row)
+    return rows_to_insert
+
+def insert_metrics_to_bigquery(sink, account_id, location_id, location_title, store_code, is_verified, data, start_date, end_date):
+    """Pivot metrics for one location and buffer them in the bulk sink."""
+    try:
+        rows_to_insert = build_metric_rows(account_id, location_id, location_title, store_code, is_verified, data, start_date, end_date)
+        if rows_to_insert:
+            return sink.add(location_id, rows_to_insert)
         return 0
     except Exception as e:
         logger.error(f"Error inserting/updating data for location {location_id}: {e}")
         return 0
 
+def read_watermarks(since):
+    """{location_id: (last loaded date, date of the last load)} from one query over the metrics table."""
+    from google.cloud import bigquery
+
+    client = warehouse.get_client(PROJECT_ID)
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter('since', 'DATE', since)]
+    )
+    # Only partitions from the start of the daily window are scanned
+    rows = client.query(f"""
+        SELECT location_id, MAX(date) AS max_date, MAX(load_timestamp) AS last_load
+        FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+        WHERE date >= @since
+        GROUP BY location_id
+    """, job_config=job_config).result()
+    return {row['location_id']: (row['max_date'], row['last_load'].date()) for row in rows}
+
+_location_catalog = None
+_location_catalog_lock = threading.Lock()
+
+def get_location_catalog():
+    """Process-wide location catalog, backed by LOCATION_CATALOG_BACKEND."""
+    global _location_catalog
+    with _location_catalog_lock:
+        if _location_catalog is None:
+            if LOCATION_CATALOG_BACKEND == 'bigquery':
+                client = warehouse.get_client(PROJECT_ID)
+                store = BigQueryCatalogStore(client, f"{PROJECT_ID}.{DATASET_ID}.{LOCATION_CATALOG_TABLE_ID}")
+            else:
+                store = FileCatalogStore(LOCATION_CATALOG_PATH)
+            _location_catalog = LocationCatalog(store, list_accounts, list_locations, LOCATION_CATALOG_TTL_HOURS * 3600)
+        return _location_catalog
+
+_checkpoint_store = None
+_checkpoint_store_lock = threading.Lock()
+
+def get_checkpoint_store():
+    """Process-wide checkpoint store for backfills, chosen by CHECKPOINT_BACKEND."""
+    global _checkpoint_store
+    with _checkpoint_store_lock:
+        if _checkpoint_store is None:
+            if CHECKPOINT_BACKEND == 'bigquery':
+                client = warehouse.get_client(PROJECT_ID)
+                _checkpoint_store = BigQueryCheckpointStore(client, f"{PROJECT_ID}.{DATASET_ID}.{CHECKPOINT_TABLE_ID}")
+            else:
+                _checkpoint_store = SQLiteCheckpointStore(CHECKPOINT_PATH)
+        return _checkpoint_store
+
+def process_location(sink, account_id, location, start_date, end_date):
+    """Fetch metrics for one location into the sink, timing the API fetch."""
+    location_id = location['name'].split('/')[-1]
+    # The API omits empty fields, and a cached catalog entry may hold None
+    location_title = location.get('title') or 'Unknown'
+    store_code = location.get('storeCode') or 'unknown_store'
+    is_verified = location.get('metadata', {}).get('hasVoiceOfMerchant', True)
+    result = {
+        'account_id': account_id,
+        'location_id': location_id,
+        'location_title': location_title,
+        'store_code': store_code,
+        'is_verified': is_verified,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'rows': 0,
+        'error': None
+    }
+    fetch_start = time.monotonic()
+    performance_data = fetch_performance_data(location_id, location_title, store_code, is_verified, start_date, end_date)
+    result['latency_ms'] = round((time.monotonic() - fetch_start) * 1000)
+    if not performance_data:
+        result['error'] = 'No performance data'
+        return result
+    result['rows'] = insert_metrics_to_bigquery(sink, account_id, location_id, location_title, store_code, is_verified, performance_data, start_date, end_date)
+    if result['rows'] == 0:
+        result['error'] = 'Insert failed'
+    return result
+
+def daily_cursor(start_date, end_date, next_location=None):
+    """Continuation cursor of a daily run.
+
+    Full runs resume from a location position. Incremental runs replan
+    from their watermarks, and the handler adds the locations already
+    attempted, whose watermark may not move (no data yet, or an error).
+    """
+    cursor = {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+    if next_location is not None:
+        cursor['next_location'] = next_location
+    return cursor
+
+def process_location_within(deadline, sink, account_id, location, start_date, end_date):
+    """process_location, or None if the time budget ran out before the job started."""
+    if deadline.expired():
+        return None
+    return process_location(sink, account_id, location, start_date, end_date)
+
 @functions_framework.http
 def gmb_fetch_performance(request):
     """HTTP Cloud Run function to fetch GMB metrics and store in BigQuery."""
     try:
-        create_bigquery_table()
+        http_transport.reset_stats()
+        # The BigQuery import overlaps with the token refresh and account/location listing
+        warehouse.preload()
         request_json = request.get_json(silent=True) or {}
+        # Stop dispatching work before the function timeout; the response carries a cursor to continue from
+        deadline = Deadline.for_request(request_json)
+        cursor = request_json.get('cursor') or {}
         
         # Determine date range
         backfill = request_json.get('backfill', False)
@@ -330,67 +652,237 @@ def gmb_fetch_performance(request):
             except (KeyError, ValueError) as e:
                 logger.error(f"Invalid backfill parameters: {e}")
                 return {'status': 'error', 'message': f'Invalid backfill parameters: {e}', 'failed_locations': []}, 400
+        elif cursor:
+            # A continuation keeps the dates of the invocation that started the run
+            start_date = datetime.strptime(cursor['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(cursor['end_date'], '%Y-%m-%d').date()
         else:
             end_date = (datetime.utcnow() - timedelta(days=2)).date()  # T-2 to allow data processing
             start_date = end_date - timedelta(days=6)  # T-8 to T-2 (7 days)
+        # Incremental daily runs fetch each location from its watermark, not the whole window
+        incremental = not backfill and request_json.get('incremental', INCREMENTAL_DAILY)
         logger.info(f"Starting {'backfill' if backfill else 'daily'} run for {start_date} to {end_date}")
         
         # Get target account IDs if specified
         target_account_ids = request_json.get('target_account_ids', None)
         
-        access_token = get_access_token()
-        all_accounts = list_accounts(access_token, target_account_ids)
-        if not all_accounts:
+        # Fail fast on credential errors; workers reuse the cached token
+        get_access_token()
+        # Accounts and locations come from the catalog; the API is only listed when it is stale
+        catalog = get_location_catalog()
+        accounts = catalog.verified_locations(
+            target_account_ids,
+            force_refresh=request_json.get('refresh_locations', False),
+            background=LOCATION_CATALOG_REFRESH == 'background'
+        )
+        if not accounts:
             logger.error("No accounts found")
             return {'status': 'error', 'message': 'No accounts found', 'failed_locations': []}, 500
+        logger.info(f"Location catalog: {catalog.last_refresh['source']}, {catalog.last_refresh['age_seconds']}s old")
         
-        # Process all accounts
-        accounts = all_accounts
+        # Worker count can be overridden per request; 1 runs locations sequentially
+        max_concurrency = max(1, int(request_json.get('max_concurrency', MAX_CONCURRENCY)))
         
-        processed_locations = 0
-        failed_locations = []
-        total_rows = 0
-        for account in accounts:
-            account_id = account['name'].split('/')[-1]
-            locations = list_locations(access_token, account_id)
-            for location in locations:
-                location_id = location['name'].split('/')[-1]
-                location_title = location.get('title', 'Unknown')
-                store_code = location.get('storeCode', 'unknown_store')
-                is_verified = location.get('metadata', {}).get('hasVoiceOfMerchant', True)
-                performance_data = fetch_performance_data(access_token, location_id, location_title, store_code, is_verified, start_date, end_date)
-                if performance_data:
-                    rows_inserted = insert_metrics_to_bigquery(account_id, location_id, location_title, store_code, is_verified, performance_data, start_date, end_date)
-                    if rows_inserted > 0:
-                        processed_locations += 1
-                        total_rows += rows_inserted
+        location_jobs = [(account_id, location) for account_id, locations in accounts.items() for location in locations]
+        # Stable order, so a continuation cursor points at the same location
+        location_jobs.sort(key=lambda job: (job[0], location_id_of(job[1])))
+        
+        create_bigquery_table()
+        
+        # Backfills run as date windows x location shards with checkpoints; daily runs are one chunk,
+        # or one chunk per distinct date range when incremental
+        checkpoints = None
+        completed = set()
+        plan = None
+        incremental_stats = None
+        attempted = set()
+        load_mode = request_json.get('load_mode', BACKFILL_LOAD_MODE) if backfill else 'merge'
+        if load_mode == 'partition' and target_account_ids:
+            # Overwriting a day would drop the rows of every account left out of the run
+            logger.warning("⚠️ Partition overwrite needs every account; merging rows for target_account_ids instead")
+            load_mode = 'merge'
+        if backfill:
+            window_days = max(1, int(request_json.get('window_days', BACKFILL_WINDOW_DAYS)))
+            shard_size = max(1, int(request_json.get('shard_size', BACKFILL_SHARD_SIZE)))
+            if load_mode == 'partition':
+                # A day partition is written from every location at once, so each window is one chunk
+                shard_size = max(1, len(location_jobs))
+            run_key = f"{start_date}:{end_date}:{window_days}"
+            checkpoints = get_checkpoint_store()
+            completed = checkpoints.completed(run_key)
+            chunks = plan_backfill(location_jobs, start_date, end_date, window_days, shard_size)
+            plan = summarize_plan(chunks, completed, max_concurrency, REQUESTS_PER_SECOND)
+            logger.info(f"Backfill plan: {json.dumps(plan)}")
+            if request_json.get('plan_only'):
+                catalog.wait()
+                return {'status': 'planned', 'message': f'Planned backfill from {start_date} to {end_date}', 'plan': plan, 'failed_locations': []}, 200
+        elif incremental:
+            try:
+                watermarks = read_watermarks(start_date)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read watermarks, fetching the full window: {e}")
+                watermarks = {}
+            # Locations attempted by earlier invocations of this run are not fetched again
+            attempted = set(cursor.get('attempted', []))
+            planned_jobs = [job for job in location_jobs if location_id_of(job[1]) not in attempted]
+            chunks, skipped = plan_incremental(planned_jobs, watermarks, start_date, end_date, RESTATEMENT_DAYS, datetime.utcnow().date())
+            window_days = (end_date - start_date).days + 1
+            incremental_stats = {
+                'locations': len(location_jobs),
+                'attempted_earlier': len(location_jobs) - len(planned_jobs),
+                'skipped_locations': skipped,
+                'location_days': sum(((chunk.window_end - chunk.window_start).days + 1) * len(chunk.jobs) for chunk in chunks),
+                'full_location_days': window_days * len(location_jobs),
+                'date_ranges': len(chunks)
+            }
+            logger.info(f"Incremental plan: {json.dumps(incremental_stats)}")
+        else:
+            chunks = [BackfillChunk(start_date, end_date, location_jobs[cursor.get('next_location', 0):])]
+        first_chunk = cursor.get('next_chunk', 0) if backfill else 0
+        # Jobs of the first chunk that an earlier invocation already started, even without their checkpoints
+        first_job = cursor.get('next_job', 0) if backfill else 0
+        logger.info(f"Fetching {len(location_jobs)} locations in {len(chunks) - first_chunk} chunks with {max_concurrency} workers "
+                    f"({deadline.remaining():.0f}s time budget left)")
+        
+        merge_sink = BigQueryMetricsSink()
+        sink = PartitionOverwriteSink(merge_sink) if load_mode == 'partition' else merge_sink
+        merged_windows = 0
+        results = []
+        location_latency_ms = {}
+        next_cursor = None
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for chunk_index in range(first_chunk, len(chunks)):
+                chunk = chunks[chunk_index]
+                skip = first_job if chunk_index == first_chunk else 0
+                # The first chunk always starts, so every continuation moves the cursor forward
+                if deadline.expired() and chunk_index > first_chunk:
+                    if backfill:
+                        next_cursor = {'next_chunk': chunk_index, 'next_job': 0}
                     else:
-                        failed_locations.append({
-                            'account_id': account_id,
-                            'location_id': location_id,
-                            'location_title': location_title,
-                            'store_code': store_code,
-                            'is_verified': is_verified,
-                            'error': 'Insert failed'
-                        })
-                else:
-                    failed_locations.append({
-                        'account_id': account_id,
-                        'location_id': location_id,
-                        'location_title': location_title,
-                        'store_code': store_code,
-                        'is_verified': is_verified,
-                        'error': 'No performance data'
-                    })
+                        next_cursor = daily_cursor(start_date, end_date, None if incremental else cursor.get('next_location', 0))
+                    break
+                started = {location_id_of(location) for _, location in chunk.jobs[:skip]}
+                jobs = [job for job in pending_jobs(chunk, completed) if location_id_of(job[1]) not in started]
+                if not jobs:
+                    continue
+                futures = [
+                    # ... and its first job always runs
+                    executor.submit(process_location_within, Deadline() if chunk_index == first_chunk and n == 0 else deadline,
+                                    sink, account_id, location, chunk.window_start, chunk.window_end)
+                    for n, (account_id, location) in enumerate(jobs)
+                ]
+                chunk_results = [future.result() for future in futures]
+                
+                # Jobs start in submission order, so the ones skipped for time are a suffix
+                if None in chunk_results:
+                    deferred = chunk_results.index(None)
+                    logger.info(f"⏱️ Time budget spent, deferring {len(jobs) - deferred} of {len(jobs)} jobs in chunk {chunk_index}")
+                    if backfill:
+                        # Position of the first deferred job in the chunk, so progress survives a lost checkpoint store;
+                        # checkpoints still skip the jobs before it that finished
+                        deferred_id = location_id_of(jobs[deferred][1])
+                        next_job = next(n for n, (_, location) in enumerate(chunk.jobs) if location_id_of(location) == deferred_id)
+                        next_cursor = {'next_chunk': chunk_index, 'next_job': next_job}
+                    elif incremental:
+                        next_cursor = daily_cursor(start_date, end_date)  # Attempted locations are added below
+                    else:
+                        next_cursor = daily_cursor(start_date, end_date, cursor.get('next_location', 0) + deferred)
+                    chunk_results = chunk_results[:deferred]
+                
+                if sink is not merge_sink:
+                    # Only a window holding every location already in its partitions may replace them;
+                    # failed, deferred and checkpointed locations are not in the buffer
+                    fetched = {result['location_id'] for result in chunk_results if not result['error']}
+                    if not sink.can_replace(fetched, chunk.window_start, chunk.window_end):
+                        logger.info(f"Window {chunk.window_start} is incomplete, merging its rows instead of replacing partitions")
+                        sink.merge_into(merge_sink)
+                        merged_windows += 1
+                
+                # Merge the chunk before checkpointing it, so a crash never skips unloaded data
+                sink.flush()
+                merge_sink.flush()
+                failed_ids = sink.pop_failed_locations() | merge_sink.pop_failed_locations()
+                done = []
+                for result in chunk_results:
+                    if not result['error'] and result['location_id'] in failed_ids:
+                        result['error'] = 'Insert failed'
+                    if not result['error']:
+                        done.append((result['location_id'], chunk.window_start.isoformat()))
+                    location_latency_ms[result['location_id']] = location_latency_ms.get(result['location_id'], 0) + result['latency_ms']
+                if checkpoints and done:
+                    checkpoints.mark_completed(run_key, done)
+                results.extend(chunk_results)
+                if next_cursor:
+                    break
+        if next_cursor and incremental:
+            # A location without new data keeps its watermark; without this every continuation would fetch it again
+            next_cursor['attempted'] = sorted(attempted | {result['location_id'] for result in results})
+        total_rows = merge_sink.rows_written + (sink.rows_written if sink is not merge_sink else 0)
+        
+        processed_location_ids = set()
+        failed_locations = []
+        for result in results:
+            if result['error']:
+                failed_locations.append({
+                    'account_id': result['account_id'],
+                    'location_id': result['location_id'],
+                    'location_title': result['location_title'],
+                    'store_code': result['store_code'],
+                    'is_verified': result['is_verified'],
+                    'start_date': result['start_date'],
+                    'end_date': result['end_date'],
+                    'error': result['error']
+                })
+            else:
+                processed_location_ids.add(result['location_id'])
+        processed_locations = len(processed_location_ids)
         
         # Log total rows inserted
-        logger.info(f"Total rows inserted/updated: {total_rows}")
+        logger.info(f"Total rows inserted/updated: {total_rows} in {merge_sink.chunks_flushed} MERGE jobs"
+                    + (f" and {sink.partitions_loaded} partition loads" if sink is not merge_sink else ''))
+        # A background catalog refresh finishes within the request, while the instance still has CPU
+        catalog.wait()
         
         response = {
             'status': 'success' if processed_locations > 0 else 'partial_success',
             'message': f'Processed {processed_locations} locations for {len(accounts)} accounts from {start_date} to {end_date}',
-            'failed_locations': failed_locations
+            'failed_locations': failed_locations,
+            'location_latency_ms': location_latency_ms,
+            'http_stats': http_transport.request_stats(),
+            'location_catalog': catalog.last_refresh
         }
+        if incremental_stats:
+            response['incremental'] = incremental_stats
+        if backfill:
+            response['load'] = {
+                'mode': load_mode,
+                'merge_jobs': merge_sink.chunks_flushed,
+                'partitions_loaded': sink.partitions_loaded if sink is not merge_sink else 0,
+                'merged_windows': merged_windows
+            }
+        if next_cursor:
+            # Out of time: hand back a cursor (and enqueue the continuation if configured)
+            response['status'] = 'in_progress'
+            response['cursor'] = next_cursor
+            response['time_budget'] = deadline.stats()
+            if backfill and CHECKPOINT_BACKEND != 'bigquery':
+                # The cursor still moves forward, but a later rerun can't tell which jobs finished
+                logger.warning("⚠️ CHECKPOINT_BACKEND is not bigquery; checkpoints stay on this instance, "
+                               "so only the cursor carries progress to the continuation")
+            response['continuation_task'] = enqueue_continuation(continuation_payload(request_json, next_cursor))
+            logger.info(f"Response: {json.dumps(response)}")
+            return response, 202
+        if incremental_stats and incremental_stats['location_days'] == 0:
+            # Every location is already loaded through end_date
+            response['status'] = 'success'
+            logger.info(f"Response: {json.dumps(response)}")
+            return response, 200
+        if plan:
+            response['plan'] = plan
+            # A resumed backfill with nothing left to do is still a success
+            if plan['pending_calls'] == 0:
+                response['status'] = 'success'
+                return response, 200
         logger.info(f"Response: {json.dumps(response)}")
         return response, 200 if processed_locations > 0 else 500
     except Exception as e:
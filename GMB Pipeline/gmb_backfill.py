@@ -0,0 +1,185 @@
+"""Backfill planning and resumable checkpoints for the GMB pipeline.
+
+A backfill is split into date windows x location shards. Every
+(location, window) pair that has been merged into BigQuery is recorded
+in a checkpoint store, so a rerun of the same backfill only fetches the
+pairs that are still missing.
+
+Incremental daily runs are planned from per-location watermarks instead,
+so dates that are already loaded and final are not fetched again.
+"""
+import logging
+import math
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# One unit of backfill work: a date window and the (account_id, location) jobs in one shard
+BackfillChunk = namedtuple('BackfillChunk', ['window_start', 'window_end', 'jobs'])
+
+
+def location_id_of(location):
+    """Location ID from a Business Information API location resource."""
+    return location['name'].split('/')[-1]
+
+
+def split_date_range(start_date, end_date, window_days):
+    """Split [start_date, end_date] into consecutive windows of window_days."""
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(end_date, window_start + timedelta(days=window_days - 1))
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+
+def plan_backfill(location_jobs, start_date, end_date, window_days, shard_size):
+    """Build the chunk list, window-major so each window completes before the next."""
+    chunks = []
+    for window_start, window_end in split_date_range(start_date, end_date, window_days):
+        for offset in range(0, len(location_jobs), shard_size):
+            chunks.append(BackfillChunk(window_start, window_end, location_jobs[offset:offset + shard_size]))
+    return chunks
+
+
+def plan_incremental(location_jobs, watermarks, start_date, end_date, restatement_days, today):
+    """Chunks for an incremental daily run, one per distinct date range.
+
+    watermarks maps location_id -> (max loaded date, date of the last load).
+    A location is fetched from the day after its watermark, minus
+    restatement_days already-loaded days that may still be revised, and
+    never before start_date. Locations without a watermark get the full
+    range. Locations with nothing left to fetch, or already loaded through
+    end_date today (a rerun or continuation), are skipped. Returns
+    (chunks, skipped location count).
+    """
+    ranges = {}
+    skipped = 0
+    for account_id, location in location_jobs:
+        watermark = watermarks.get(location_id_of(location))
+        if watermark is None:
+            job_start = start_date
+        else:
+            max_date, last_load = watermark
+            job_start = max(start_date, max_date + timedelta(days=1 - restatement_days))
+            if job_start > end_date or (max_date >= end_date and last_load >= today):
+                skipped += 1
+                continue
+        ranges.setdefault(job_start, []).append((account_id, location))
+    return [BackfillChunk(job_start, end_date, jobs) for job_start, jobs in sorted(ranges.items())], skipped
+
+
+def pending_jobs(chunk, completed):
+    """Jobs in a chunk that have no checkpoint yet."""
+    window_key = chunk.window_start.isoformat()
+    return [
+        (account_id, location) for account_id, location in chunk.jobs
+        if (location_id_of(location), window_key) not in completed
+    ]
+
+
+def summarize_plan(chunks, completed, concurrency, requests_per_second, seconds_per_call=1.0):
+    """Expected API calls and wall time for the chunks still to run."""
+    total_calls = sum(len(chunk.jobs) for chunk in chunks)
+    pending_calls = sum(len(pending_jobs(chunk, completed)) for chunk in chunks)
+    pending_chunks = sum(1 for chunk in chunks if pending_jobs(chunk, completed))
+    # Bounded by whichever is slower: the rate limit or the worker pool
+    expected_seconds = max(
+        pending_calls / requests_per_second if requests_per_second > 0 else 0,
+        pending_calls * seconds_per_call / max(1, concurrency)
+    )
+    return {
+        'windows': len({chunk.window_start for chunk in chunks}),
+        'chunks': len(chunks),
+        'pending_chunks': pending_chunks,
+        'total_calls': total_calls,
+        'completed_calls': total_calls - pending_calls,
+        'pending_calls': pending_calls,
+        'expected_seconds': math.ceil(expected_seconds)
+    }
+
+
+class SQLiteCheckpointStore:
+    """Checkpoints in a local SQLite file, for local and single-instance runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                run_key TEXT NOT NULL,
+                location_id TEXT NOT NULL,
+                window_start TEXT NOT NULL,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (run_key, location_id, window_start)
+            )
+        """)
+        self.conn.commit()
+
+    def completed(self, run_key):
+        """Set of (location_id, window_start) pairs already done for a run."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT location_id, window_start FROM backfill_checkpoints WHERE run_key = ?",
+                (run_key,)
+            ).fetchall()
+        return set(rows)
+
+    def mark_completed(self, run_key, pairs):
+        """Record (location_id, window_start) pairs as done."""
+        completed_at = datetime.utcnow().isoformat()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO backfill_checkpoints VALUES (?, ?, ?, ?)",
+                [(run_key, location_id, window_start, completed_at) for location_id, window_start in pairs]
+            )
+            self.conn.commit()
+
+
+class BigQueryCheckpointStore:
+    """Checkpoints in a BigQuery control table, shared by all instances in prod."""
+
+    def __init__(self, client, table_id):
+        from google.api_core.exceptions import NotFound
+        from google.cloud import bigquery
+
+        self.client = client
+        self.table_id = table_id
+        try:
+            client.get_table(table_id)
+        except NotFound:
+            schema = [
+                bigquery.SchemaField("run_key", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("location_id", "STRING", mode="REQUIRED"),
+                bigquery.SchemaField("window_start", "DATE", mode="REQUIRED"),
+                bigquery.SchemaField("completed_at", "TIMESTAMP", mode="REQUIRED"),
+            ]
+            client.create_table(bigquery.Table(table_id, schema=schema))
+
+    def completed(self, run_key):
+        """Set of (location_id, window_start) pairs already done for a run."""
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("run_key", "STRING", run_key)]
+        )
+        rows = self.client.query(
+            f"SELECT DISTINCT location_id, window_start FROM `{self.table_id}` WHERE run_key = @run_key",
+            job_config=job_config
+        ).result()
+        return {(row['location_id'], row['window_start'].isoformat()) for row in rows}
+
+    def mark_completed(self, run_key, pairs):
+        """Record (location_id, window_start) pairs as done."""
+        completed_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        errors = self.client.insert_rows_json(self.table_id, [
+            {'run_key': run_key, 'location_id': location_id, 'window_start': window_start, 'completed_at': completed_at}
+            for location_id, window_start in pairs
+        ])
+        if errors:
+            logger.error(f"Error writing backfill checkpoints: {errors}")
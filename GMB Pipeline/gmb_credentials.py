@@ -0,0 +1,100 @@
+"""Process-wide credentials for the GMB pipeline.
+
+Keeps one Secret Manager client per process, caches secrets for a TTL and
+caches the OAuth access token, refreshing it shortly before it expires.
+Safe to share between concurrent fetch workers and warm invocations. The
+Secret Manager library is imported on first use, not at module load.
+"""
+import logging
+import threading
+import time
+
+import requests
+
+import http_transport
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = 'https://oauth2.googleapis.com/token'
+
+
+class CredentialManager:
+    """Cached Secret Manager secrets and a self-refreshing OAuth access token."""
+
+    def __init__(self, project_id, secret_ttl=3600, refresh_margin=300, token_url=TOKEN_URL):
+        self.project_id = project_id
+        self.secret_ttl = secret_ttl
+        self.refresh_margin = refresh_margin
+        self.token_url = token_url
+        self.lock = threading.Lock()
+        self.token_lock = threading.Lock()
+        self._client = None
+        self._secrets = {}  # secret_id -> (value, fetched_at)
+        self._token = None
+        self._token_expires_at = 0.0
+
+    def _secret_client(self):
+        with self.lock:
+            if self._client is None:
+                # Imported here: Secret Manager (and grpc) is only needed when the cache is cold
+                from google.cloud import secretmanager
+                self._client = secretmanager.SecretManagerServiceClient()
+            return self._client
+
+    def get_secret(self, secret_id):
+        """Retrieve a secret from Secret Manager, cached for secret_ttl seconds."""
+        with self.lock:
+            cached = self._secrets.get(secret_id)
+        if cached and time.monotonic() - cached[1] < self.secret_ttl:
+            return cached[0]
+        try:
+            secret_name = f"projects/{self.project_id}/secrets/{secret_id}/versions/latest"
+            response = self._secret_client().access_secret_version(name=secret_name)
+            value = response.payload.data.decode('UTF-8')
+        except Exception as e:
+            logger.error(f"Error accessing secret {secret_id}: {e}")
+            raise
+        with self.lock:
+            self._secrets[secret_id] = (value, time.monotonic())
+        return value
+
+    def get_access_token(self, force_refresh=False):
+        """Return a valid access token, refreshing it when close to expiry.
+
+        Only one worker refreshes at a time; the others wait for and reuse
+        the new token.
+        """
+        with self.token_lock:
+            if not force_refresh and self._token and time.monotonic() < self._token_expires_at - self.refresh_margin:
+                return self._token
+            self._token, expires_in = self._refresh_access_token()
+            self._token_expires_at = time.monotonic() + expires_in
+            return self._token
+
+    def invalidate_token(self, token):
+        """Drop a token the API rejected, unless another worker already replaced it."""
+        with self.token_lock:
+            if self._token == token:
+                self._token = None
+
+    def _refresh_access_token(self):
+        try:
+            data = {
+                'client_id': self.get_secret('gmb-client-id'),
+                'client_secret': self.get_secret('gmb-client-secret'),
+                'refresh_token': self.get_secret('gmb-refresh-token'),
+                'grant_type': 'refresh_token'
+            }
+            response = http_transport.post(self.token_url, data=data)
+            if response.status_code != 200:
+                logger.error(f"Token refresh failed: {response.status_code} {response.text}")
+                response.raise_for_status()
+            payload = response.json()
+            logger.info("Refreshed access token")
+            return payload['access_token'], int(payload.get('expires_in', 3600))
+        except requests.HTTPError as e:
+            logger.error(f"HTTP error refreshing access token: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error refreshing access token: {e}")
+            raise
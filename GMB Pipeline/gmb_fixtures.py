@@ -0,0 +1,185 @@
+"""Record Business Profile API responses as fixtures, and load them for replay.
+
+A recording is gzip-compressed NDJSON, one exchange per line:
+
+    {"method": "GET", "path": "/v1/accounts", "query": {"pageSize": ["100"]}, "status": 200, "body": {...}}
+
+Hosts, headers and the OAuth token exchange are never written, so a
+recording holds no credentials. fake_gmb_server.py replays a recording:
+listing pages are matched by path and page token, and performance
+responses are re-sliced to whatever date range a later run asks for.
+
+Record a live daily run (writes go to the local DuckDB warehouse, never
+to BigQuery):
+
+    python gmb_fixtures.py record --out fixtures/gmb_daily.ndjson.gz
+    python gmb_fixtures.py record --out fixtures/gmb_june.ndjson.gz \\
+        --payload '{"backfill": true, "start_date": "2024-06-01", "end_date": "2024-06-30"}'
+"""
+import argparse
+import gzip
+import importlib.util
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from urllib.parse import parse_qs, urlparse
+
+PIPELINE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gmb-pipeline.py')
+PERFORMANCE_PATH = re.compile(r'/locations/([^/:]+):fetchMultiDailyMetricsTimeSeries$')
+# Only Business Profile calls are recorded; the OAuth token exchange is not
+RECORDED_HOSTS = ('mybusinessbusinessinformation.googleapis.com', 'businessprofileperformance.googleapis.com')
+
+logger = logging.getLogger(__name__)
+
+
+def exchange_key(path, query):
+    """Replay key of a listing request: its path and page token."""
+    return path, (query.get('pageToken') or [None])[0]
+
+
+class FixtureRecorder:
+    """Wraps an HttpTransport and appends every Business Profile exchange to a recording."""
+
+    def __init__(self, path, hosts=RECORDED_HOSTS):
+        self.path = path
+        self.hosts = hosts
+        self.lock = threading.Lock()
+        self.file = None
+        self.transport = None
+        self.original_request = None
+        self.recorded = 0
+
+    def install(self, transport):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self.transport = transport
+        self.original_request = transport.request
+        transport.request = self.request
+        return self
+
+    def uninstall(self):
+        if self.transport is not None:
+            self.transport.request = self.original_request
+            self.transport = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def request(self, method, url, **kwargs):
+        response = self.original_request(method, url, **kwargs)
+        parsed = urlparse(url)
+        if method == 'GET' and parsed.netloc in self.hosts:
+            query = parse_qs(parsed.query)
+            for name, value in (kwargs.get('params') or {}).items():
+                query[name] = [str(item) for item in value] if isinstance(value, list) else [str(value)]
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            line = json.dumps({'method': method, 'path': parsed.path, 'query': query, 'status': response.status_code, 'body': body})
+            with self.lock:
+                self.file.write(line + '\n')
+                self.recorded += 1
+        return response
+
+
+class FixtureSet:
+    """A recording indexed for replay."""
+
+    def __init__(self, exchanges):
+        self.pages = {}  # (path, page token) -> (status, body)
+        self.performance = {}  # location_id -> {metric: {(year, month, day): value}}
+        self.performance_errors = {}  # location_id -> (status, body)
+        for exchange in exchanges:
+            match = PERFORMANCE_PATH.search(exchange['path'])
+            if not match:
+                self.pages[exchange_key(exchange['path'], exchange['query'])] = (exchange['status'], exchange['body'])
+                continue
+            location_id = match.group(1)
+            if exchange['status'] != 200:
+                self.performance_errors[location_id] = (exchange['status'], exchange['body'])
+                continue
+            series = self.performance.setdefault(location_id, {})
+            for metric_series in exchange['body'].get('multiDailyMetricTimeSeries', ()):
+                for daily_metric in metric_series.get('dailyMetricTimeSeries', ()):
+                    values = series.setdefault(daily_metric.get('dailyMetric'), {})
+                    for dated_value in daily_metric.get('timeSeries', {}).get('datedValues', ()):
+                        day = dated_value.get('date', {})
+                        values[(day.get('year'), day.get('month'), day.get('day'))] = dated_value.get('value')
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def page(self, path, query):
+        """(status, body) recorded for a listing page, or None."""
+        return self.pages.get(exchange_key(path, query))
+
+    def daily_values(self, location_id, metric):
+        """{(year, month, day): value} recorded for one location and metric, or None if it was never fetched."""
+        if location_id not in self.performance:
+            return None
+        return self.performance[location_id].get(metric, {})
+
+
+def load_pipeline():
+    spec = importlib.util.spec_from_file_location('gmb_pipeline', PIPELINE_SCRIPT)
+    pipeline = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pipeline)
+    return pipeline
+
+
+class Request:
+    def __init__(self, body):
+        self.body = body
+
+    def get_json(self, silent=False):
+        return self.body
+
+
+def record(out, payload):
+    """Run gmb_fetch_performance against the live APIs and record every response."""
+    # A scratch local warehouse, catalog and checkpoints, so nothing is skipped and BigQuery is never written
+    workdir = tempfile.mkdtemp(prefix='gmb_record_')
+    os.environ.update({
+        'WAREHOUSE_BACKEND': 'duckdb',
+        'LOCAL_WAREHOUSE_DB': os.path.join(workdir, 'warehouse.duckdb'),
+        'LOCATION_CATALOG_BACKEND': 'file',
+        'LOCATION_CATALOG_PATH': os.path.join(workdir, 'location_catalog.json'),
+        'CHECKPOINT_BACKEND': 'sqlite',
+        'CHECKPOINT_PATH': os.path.join(workdir, 'checkpoints.sqlite')
+    })
+    pipeline = load_pipeline()
+    recorder = FixtureRecorder(out).install(pipeline.http_transport.transport)
+    try:
+        body, status = pipeline.gmb_fetch_performance(Request(payload))
+    finally:
+        recorder.uninstall()
+        shutil.rmtree(workdir, ignore_errors=True)
+    logger.info(f"📼 Recorded {recorder.recorded} responses to {out} (run returned HTTP {status}: {body.get('message')})")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='Record one live run')
+    record_parser.add_argument('--out', required=True, help='Recording to write (.ndjson.gz)')
+    record_parser.add_argument('--payload', default='{}', help='Request JSON for gmb_fetch_performance')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    status = record(args.out, json.loads(args.payload))
+    sys.exit(0 if status < 400 else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Persistent catalog of GMB accounts and their locations.
+
+Listing every account and paging through its locations costs several API
+calls before the first metric is fetched, yet the location set rarely
+changes. The catalog keeps a snapshot (account -> locations with name,
+title, storeCode and hasVoiceOfMerchant) in memory, backed by a local
+JSON file or a BigQuery table, and only lists again once the snapshot is
+older than its TTL. Stale snapshots are refreshed inline, or in the
+background while the run uses the previous snapshot.
+
+Every refresh is compared with the previous snapshot, so added, removed,
+newly verified and no longer verified locations can be reported.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def is_verified(location):
+    return location.get('metadata', {}).get('hasVoiceOfMerchant', False)
+
+
+def catalog_entry(location):
+    """The fields of a listed location the pipeline uses."""
+    return {
+        'name': location['name'],
+        'title': location.get('title') or 'Unknown',
+        'storeCode': location.get('storeCode') or 'unknown_store',
+        'metadata': {'hasVoiceOfMerchant': is_verified(location)}
+    }
+
+
+def diff_snapshots(old_accounts, new_accounts):
+    """Location changes between two {account_id: [location]} snapshots."""
+    def index(accounts):
+        return {
+            location['name'].split('/')[-1]: (account_id, location)
+            for account_id, locations in accounts.items()
+            for location in locations
+        }
+
+    def summary(account_id, location_id, location):
+        return {'account_id': account_id, 'location_id': location_id, 'title': location.get('title') or 'Unknown'}
+
+    old, new = index(old_accounts), index(new_accounts)
+    changes = {'added': [], 'removed': [], 'verified': [], 'unverified': []}
+    for location_id, (account_id, location) in sorted(new.items()):
+        if location_id not in old:
+            changes['added'].append(summary(account_id, location_id, location))
+        elif is_verified(location) and not is_verified(old[location_id][1]):
+            changes['verified'].append(summary(account_id, location_id, location))
+        elif not is_verified(location) and is_verified(old[location_id][1]):
+            changes['unverified'].append(summary(account_id, location_id, location))
+    for location_id, (account_id, location) in sorted(old.items()):
+        if location_id not in new:
+            changes['removed'].append(summary(account_id, location_id, location))
+    return changes
+
+
+class FileCatalogStore:
+    """Catalog snapshot in a local JSON file, for local and single-instance runs."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """(synced_at, accounts) or None if there is no readable snapshot."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            return datetime.fromisoformat(snapshot['synced_at']), snapshot['accounts']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable location catalog {self.path}: {e}")
+            return None
+
+    def save(self, synced_at, accounts):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'synced_at': synced_at.isoformat(), 'accounts': accounts}, f)
+        os.replace(tmp_path, self.path)
+
+
+class BigQueryCatalogStore:
+    """Catalog snapshot in a BigQuery table, shared by all instances in prod.
+
+    One row per location; an account without locations is kept as a row
+    with a NULL location_id. Each save replaces the whole table.
+    """
+
+    def __init__(self, client, table_id):
+        from google.api_core.exceptions import NotFound
+        from google.cloud import bigquery
+
+        self.client = client
+        self.table_id = table_id
+        self.schema = [
+            bigquery.SchemaField("account_id", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("location_id", "STRING"),
+            bigquery.SchemaField("location_title", "STRING"),
+            bigquery.SchemaField("store_code", "STRING"),
+            bigquery.SchemaField("is_verified", "BOOLEAN"),
+            bigquery.SchemaField("synced_at", "TIMESTAMP", mode="REQUIRED"),
+        ]
+        try:
+            client.get_table(table_id)
+        except NotFound:
+            client.create_table(bigquery.Table(table_id, schema=self.schema))
+
+    def load(self):
+        """(synced_at, accounts) or None if the table is empty."""
+        rows = list(self.client.query(
+            f"SELECT account_id, location_id, location_title, store_code, is_verified, synced_at FROM `{self.table_id}`"
+        ).result())
+        if not rows:
+            return None
+        accounts = {}
+        for row in rows:
+            locations = accounts.setdefault(row['account_id'], [])
+            if row['location_id'] is not None:
+                locations.append({
+                    'name': f"locations/{row['location_id']}",
+                    'title': row['location_title'] or 'Unknown',
+                    'storeCode': row['store_code'] or 'unknown_store',
+                    'metadata': {'hasVoiceOfMerchant': bool(row['is_verified'])}
+                })
+        synced_at = min(row['synced_at'] for row in rows).replace(tzinfo=None)
+        return synced_at, accounts
+
+    def save(self, synced_at, accounts):
+        from google.cloud import bigquery
+
+        timestamp = synced_at.strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for account_id, locations in accounts.items():
+            if not locations:
+                rows.append({'account_id': account_id, 'location_id': None, 'synced_at': timestamp})
+            for location in locations:
+                rows.append({
+                    'account_id': account_id,
+                    'location_id': location['name'].split('/')[-1],
+                    'location_title': location.get('title') or 'Unknown',
+                    'store_code': location.get('storeCode') or 'unknown_store',
+                    'is_verified': is_verified(location),
+                    'synced_at': timestamp
+                })
+        job_config = bigquery.LoadJobConfig(
+            schema=self.schema,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        )
+        self.client.load_table_from_json(rows, self.table_id, job_config=job_config).result()
+
+
+class LocationCatalog:
+    """Accounts and locations, listed from the API only when the snapshot is stale.
+
+    list_accounts() returns account ids and list_locations(account_id)
+    returns every location of an account, verified or not; both raise on
+    failure, so a failed listing never empties the catalog.
+    """
+
+    def __init__(self, store, list_accounts, list_locations, ttl_seconds):
+        self.store = store
+        self.list_accounts = list_accounts
+        self.list_locations = list_locations
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.synced_at = None
+        self.accounts = None
+        self.background = None
+        self.last_refresh = {}
+
+    def age_seconds(self):
+        if self.synced_at is None:
+            return None
+        return (datetime.utcnow() - self.synced_at).total_seconds()
+
+    def stale(self, target_account_ids=None):
+        if self.accounts is None or self.age_seconds() >= self.ttl_seconds:
+            return True
+        # An account asked for by name but never listed may be new
+        return any(account_id not in self.accounts for account_id in target_account_ids or ())
+
+    def verified_locations(self, target_account_ids=None, force_refresh=False, background=False):
+        """{account_id: [verified locations]}, refreshing the snapshot if needed.
+
+        With background=True a stale snapshot is returned as is and
+        refreshed in a thread; call wait() before reporting the changes.
+        """
+        with self.lock:
+            if self.accounts is None:
+                loaded = self.store.load()
+                if loaded:
+                    self.synced_at, self.accounts = loaded
+            self.last_refresh = {'source': 'cache', 'changes': None}
+            if force_refresh or self.stale(target_account_ids):
+                if background and self.accounts is not None and not force_refresh:
+                    self.last_refresh['source'] = 'background'
+                    self.background = threading.Thread(target=self.refresh, name='location-catalog-refresh', daemon=True)
+                    self.background.start()
+                else:
+                    self.refresh_locked()
+            accounts = self.accounts or {}
+            self.last_refresh.update({'age_seconds': round(self.age_seconds() or 0), 'accounts': len(accounts)})
+        return {
+            account_id: [location for location in locations if is_verified(location)]
+            for account_id, locations in accounts.items()
+            if not target_account_ids or account_id in target_account_ids
+        }
+
+    def wait(self):
+        """Wait for a background refresh to finish."""
+        if self.background is not None:
+            self.background.join()
+            self.background = None
+
+    def refresh(self):
+        with self.lock:
+            self.refresh_locked()
+
+    def refresh_locked(self):
+        """List all accounts and locations and record what changed."""
+        synced_at = datetime.utcnow()
+        try:
+            accounts = {
+                account_id: [catalog_entry(location) for location in self.list_locations(account_id)]
+                for account_id in self.list_accounts()
+            }
+        except Exception as e:
+            # Keep serving the previous snapshot, if any
+            logger.error(f"❌ Location catalog refresh failed: {e}")
+            self.last_refresh['error'] = str(e)
+            return
+        changes = diff_snapshots(self.accounts or {}, accounts) if self.accounts is not None else None
+        self.synced_at, self.accounts = synced_at, accounts
+        if self.last_refresh.get('source') != 'background':
+            self.last_refresh['source'] = 'refreshed'
+        self.last_refresh['changes'] = changes
+        try:
+            self.store.save(synced_at, accounts)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save the location catalog: {e}")
+        locations = sum(len(locations) for locations in accounts.values())
+        counts = ', '.join(f"{len(entries)} {kind}" for kind, entries in (changes or {}).items())
+        logger.info(f"🗂️ Location catalog refreshed: {len(accounts)} accounts, {locations} locations"
+                    + (f" ({counts})" if counts else ''))
@@ -0,0 +1,84 @@
+"""Single-pass parser for fetchMultiDailyMetricsTimeSeries responses.
+
+Turns the nested multiDailyMetricTimeSeries JSON into compact columns:
+one array of date ordinals and one int array per requested metric.
+"""
+from array import array
+from datetime import date
+
+
+class DailyMetricColumns:
+    """Daily metrics for one location stored column-wise.
+
+    ordinals[i] is the date (as date.toordinal()) of row i and
+    values[metric][i] is that metric's value on the same date.
+    """
+
+    __slots__ = ('metrics', 'ordinals', 'values')
+
+    def __init__(self, metrics):
+        self.metrics = list(metrics)
+        self.ordinals = array('l')
+        self.values = {metric: array('q') for metric in self.metrics}
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def iter_rows(self):
+        """Yield (iso_date, {metric: value}) per date in response order."""
+        values = self.values
+        for index, ordinal in enumerate(self.ordinals):
+            yield date.fromordinal(ordinal).isoformat(), {metric: values[metric][index] for metric in self.metrics}
+
+
+def parse_daily_metrics(data, metrics, start_date=None, end_date=None):
+    """Parse one response into DailyMetricColumns in a single pass.
+
+    Dates outside [start_date, end_date] are dropped when bounds are given.
+    Metrics not listed in `metrics` are ignored and missing values are 0.
+    Returns (columns, skipped) where skipped counts malformed datapoints.
+    """
+    columns = DailyMetricColumns(metrics)
+    if not data:
+        return columns, 0
+
+    ordinals = columns.ordinals
+    values = columns.values
+    all_values = list(values.values())
+    min_ordinal = start_date.toordinal() if start_date else None
+    max_ordinal = end_date.toordinal() if end_date else None
+    row_by_date = {}  # (year, month, day) -> row index, or None when out of range
+    skipped = 0
+
+    for metric_series in data.get('multiDailyMetricTimeSeries', ()):
+        for daily_metric in metric_series.get('dailyMetricTimeSeries', ()):
+            metric_values = values.get(daily_metric.get('dailyMetric'))
+            if metric_values is None:
+                continue
+            for dated_value in daily_metric.get('timeSeries', {}).get('datedValues', ()):
+                try:
+                    day = dated_value['date']
+                    key = (day['year'], day['month'], day['day'])
+                except (KeyError, TypeError):
+                    skipped += 1
+                    continue
+                if key in row_by_date:
+                    row = row_by_date[key]
+                else:
+                    try:
+                        ordinal = date(int(key[0]), int(key[1]), int(key[2])).toordinal()
+                    except (TypeError, ValueError):
+                        skipped += 1
+                        continue
+                    if (min_ordinal is not None and ordinal < min_ordinal) or (max_ordinal is not None and ordinal > max_ordinal):
+                        row = None
+                    else:
+                        row = len(ordinals)
+                        ordinals.append(ordinal)
+                        for column in all_values:
+                            column.append(0)
+                    row_by_date[key] = row
+                if row is not None:
+                    metric_values[row] = int(dated_value.get('value', 0))
+
+    return columns, skipped
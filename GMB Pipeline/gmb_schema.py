@@ -0,0 +1,140 @@
+"""Schema of the GMB metrics table, defined once, and its upkeep.
+
+MetricsTableSchema lists the columns (fixed dimensions, one INTEGER
+column per metric, load_timestamp). The load job schema and the MERGE
+column lists are generated from it, so adding a metric to METRICS is the
+only change needed.
+
+SchemaManager checks the table once per process: it creates the table
+if it is missing, and adds a NULLABLE column for each new metric with
+ALTER TABLE ADD COLUMN. Columns are never dropped or retyped; a metric
+removed from METRICS keeps its column and stops being written.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify a row; the MERGE matches on them and never updates them
+KEY_COLUMNS = ('location_id', 'date')
+DIMENSION_COLUMNS = [
+    ('store_id', 'STRING', 'REQUIRED'),
+    ('account_id', 'STRING', 'REQUIRED'),
+    ('location_id', 'STRING', 'REQUIRED'),
+    ('location_title', 'STRING', 'NULLABLE'),
+    ('store_code', 'STRING', 'NULLABLE'),
+    ('is_verified', 'BOOLEAN', 'NULLABLE'),
+    ('date', 'DATE', 'REQUIRED'),
+]
+LOAD_TIMESTAMP_COLUMN = ('load_timestamp', 'TIMESTAMP', 'REQUIRED')
+# Legacy SQL type names in SchemaField -> GoogleSQL names for DDL
+DDL_TYPES = {'INTEGER': 'INT64', 'FLOAT': 'FLOAT64', 'BOOLEAN': 'BOOL'}
+
+
+class MetricsTableSchema:
+    """Columns of the metrics table and the statements generated from them."""
+
+    def __init__(self, metrics, partition_field='date'):
+        self.metrics = list(metrics)
+        self.partition_field = partition_field
+        self.columns = (
+            DIMENSION_COLUMNS
+            + [(metric, 'INTEGER', 'NULLABLE') for metric in self.metrics]
+            + [LOAD_TIMESTAMP_COLUMN]
+        )
+        self.names = [name for name, _, _ in self.columns]
+        self._fields = None
+
+    def fields(self):
+        """bigquery.SchemaField list, built once."""
+        if self._fields is None:
+            from google.cloud import bigquery
+
+            self._fields = [bigquery.SchemaField(name, type_, mode=mode) for name, type_, mode in self.columns]
+        return self._fields
+
+    def table(self, table_id):
+        """A bigquery.Table with this schema, partitioned by day."""
+        from google.cloud import bigquery
+
+        table = bigquery.Table(table_id, schema=self.fields())
+        table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY,
+            field=self.partition_field
+        )
+        return table
+
+    def merge_statement(self, table_id, staging_id, first_date, last_date):
+        """MERGE of a staging table into the metrics table, keyed on (location_id, date).
+
+        Keeps one row per key so the MERGE never matches a target row twice;
+        the constant date range on T prunes the target to the partitions being written.
+        """
+        updated = [name for name in self.names if name not in KEY_COLUMNS]
+        return f"""
+            MERGE `{table_id}` T
+            USING (
+                SELECT * EXCEPT(row_num) FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY {', '.join(KEY_COLUMNS)} ORDER BY load_timestamp DESC) AS row_num
+                    FROM `{staging_id}`
+                )
+                WHERE row_num = 1
+            ) S
+            ON {' AND '.join(f'T.{name} = S.{name}' for name in KEY_COLUMNS)}
+                AND T.{self.partition_field} BETWEEN DATE '{first_date}' AND DATE '{last_date}'
+            WHEN MATCHED THEN
+                UPDATE SET {', '.join(f'T.{name} = S.{name}' for name in updated)}
+            WHEN NOT MATCHED THEN
+                INSERT ({', '.join(self.names)})
+                VALUES ({', '.join(f'S.{name}' for name in self.names)})
+        """
+
+
+class SchemaManager:
+    """Creates or evolves the metrics table, checking it once per process.
+
+    Warm invocations skip the check entirely. invalidate() makes the next
+    ensure() check again, e.g. after a write failed.
+    """
+
+    def __init__(self, schema, table_id):
+        self.schema = schema
+        self.table_id = table_id
+        self.lock = threading.Lock()
+        self.verified = False
+        self.added_columns = []
+
+    def ensure(self, client):
+        """Create the table or add missing metric columns; returns the columns added."""
+        if self.verified:
+            return []
+        from google.api_core.exceptions import NotFound
+
+        with self.lock:
+            if self.verified:
+                return []
+            try:
+                existing = {field.name for field in client.get_table(self.table_id).schema}
+            except NotFound:
+                client.create_table(self.schema.table(self.table_id), exists_ok=True)
+                logger.info(f"🆕 Created table {self.table_id} with {len(self.schema.metrics)} metric columns")
+                self.verified = True
+                return []
+
+            missing = [column for column in self.schema.columns if column[0] not in existing]
+            required = [name for name, _, mode in missing if mode == 'REQUIRED']
+            if required:
+                raise ValueError(f"Table {self.table_id} lacks required columns {required}; they cannot be added in place")
+            for name, type_, _ in missing:
+                client.query(
+                    f"ALTER TABLE `{self.table_id}` ADD COLUMN IF NOT EXISTS {name} {DDL_TYPES.get(type_, type_)}"
+                ).result()
+            added = [name for name, _, _ in missing]
+            if added:
+                logger.info(f"🧩 Added columns to {self.table_id}: {', '.join(added)}")
+                self.added_columns.extend(added)
+            self.verified = True
+            return added
+
+    def invalidate(self):
+        self.verified = False
@@ -0,0 +1,244 @@
+"""Tests for the GMB pipeline, run offline.
+
+Planning is tested on its own; the schema and partition checks run
+against the DuckDB stand-in in "Local Warehouse/", and whole runs go
+against fake_gmb_server.py as in bench_gmb_pipeline.py.
+
+    python -m pytest -q test_gmb_pipeline.py
+"""
+import importlib.util
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+import bench_gmb_pipeline
+from fake_gmb_server import SyntheticGMB, start_server
+from gmb_backfill import pending_jobs, plan_backfill, plan_incremental
+from gmb_fixtures import Request
+from gmb_schema import MetricsTableSchema, SchemaManager
+
+LOCAL_WAREHOUSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Local Warehouse')
+
+
+def job(location_id, account_id='1'):
+    return (account_id, {'name': f"locations/{location_id}"})
+
+
+def chunk_ids(chunk):
+    return [location['name'].split('/')[-1] for _, location in chunk.jobs]
+
+
+# Planning
+
+def test_plan_backfill_is_window_major():
+    jobs = [job(n) for n in range(5)]
+    chunks = plan_backfill(jobs, date(2024, 1, 1), date(2024, 1, 10), window_days=4, shard_size=2)
+    assert [(chunk.window_start, chunk.window_end) for chunk in chunks] == (
+        [(date(2024, 1, 1), date(2024, 1, 4))] * 3
+        + [(date(2024, 1, 5), date(2024, 1, 8))] * 3
+        + [(date(2024, 1, 9), date(2024, 1, 10))] * 3
+    )
+    assert [chunk_ids(chunk) for chunk in chunks[:3]] == [['0', '1'], ['2', '3'], ['4']]
+
+
+def test_pending_jobs_skips_checkpoints():
+    chunk = plan_backfill([job(n) for n in range(3)], date(2024, 1, 1), date(2024, 1, 7), 7, 10)[0]
+    assert pending_jobs(chunk, {('1', '2024-01-01'), ('2', '2024-02-01')}) == [job(0), job(2)]
+
+
+def test_plan_incremental_groups_by_start():
+    start, end, today = date(2024, 6, 1), date(2024, 6, 7), date(2024, 6, 9)
+    watermarks = {
+        '1': (date(2024, 6, 4), date(2024, 6, 6)),  # From the day after, less two restated days
+        '2': (date(2024, 6, 4), date(2024, 6, 6)),
+        '3': (date(2024, 5, 1), date(2024, 5, 3)),  # Never before the window
+        '4': (date(2024, 6, 7), date(2024, 6, 9)),  # Loaded through end_date today
+    }
+    chunks, skipped = plan_incremental([job(n) for n in range(5)], watermarks, start, end, restatement_days=2, today=today)
+    assert skipped == 1
+    assert [(chunk.window_start, chunk.window_end, chunk_ids(chunk)) for chunk in chunks] == [
+        (date(2024, 6, 1), end, ['0', '3']),
+        (date(2024, 6, 3), end, ['1', '2']),
+    ]
+
+
+def test_plan_incremental_restates_loaded_end():
+    # Loaded through end_date on an earlier day: the restated days are fetched again
+    chunks, skipped = plan_incremental(
+        [job(1)], {'1': (date(2024, 6, 7), date(2024, 6, 8))}, date(2024, 6, 1), date(2024, 6, 7), 2, date(2024, 6, 9)
+    )
+    assert skipped == 0
+    assert chunks[0].window_start == date(2024, 6, 6)
+
+
+def test_plan_incremental_without_restatement_skips_finished():
+    chunks, skipped = plan_incremental(
+        [job(1)], {'1': (date(2024, 6, 7), date(2024, 6, 8))}, date(2024, 6, 1), date(2024, 6, 7), 0, date(2024, 6, 9)
+    )
+    assert (chunks, skipped) == ([], 1)
+
+
+# Warehouse
+
+@pytest.fixture
+def duckdb_client(tmp_path):
+    pytest.importorskip('duckdb')
+    if LOCAL_WAREHOUSE_DIR not in sys.path:
+        sys.path.insert(0, LOCAL_WAREHOUSE_DIR)
+    from duckdb_warehouse import DuckDBClient
+
+    return DuckDBClient(project='test', path=str(tmp_path / 'warehouse.duckdb'))
+
+
+class CountingClient:
+    def __init__(self, client):
+        self.client = client
+        self.get_table_calls = 0
+
+    def get_table(self, table):
+        self.get_table_calls += 1
+        return self.client.get_table(table)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def test_schema_ensure_creates_table_once(duckdb_client):
+    client = CountingClient(duckdb_client)
+    manager = SchemaManager(MetricsTableSchema(['CALL_CLICKS']), 'test.gmb_data.daily_metrics')
+    assert manager.ensure(client) == []
+    assert 'CALL_CLICKS' in {field.name for field in duckdb_client.get_table('test.gmb_data.daily_metrics').schema}
+
+    # Checked once per process, until invalidated
+    manager.ensure(client)
+    assert client.get_table_calls == 1
+    manager.invalidate()
+    assert manager.ensure(client) == []
+    assert client.get_table_calls == 2
+
+
+def test_schema_ensure_adds_new_metrics(duckdb_client):
+    SchemaManager(MetricsTableSchema(['CALL_CLICKS']), 'test.gmb_data.daily_metrics').ensure(duckdb_client)
+    manager = SchemaManager(MetricsTableSchema(['CALL_CLICKS', 'WEBSITE_CLICKS']), 'test.gmb_data.daily_metrics')
+    assert manager.ensure(duckdb_client) == ['WEBSITE_CLICKS']
+    assert manager.added_columns == ['WEBSITE_CLICKS']
+    assert 'WEBSITE_CLICKS' in {field.name for field in duckdb_client.get_table('test.gmb_data.daily_metrics').schema}
+
+
+def test_schema_ensure_rejects_missing_required_column(duckdb_client):
+    duckdb_client.query("CREATE TABLE `test.gmb_data.daily_metrics` (location_id STRING, date DATE)").result()
+    manager = SchemaManager(MetricsTableSchema(['CALL_CLICKS']), 'test.gmb_data.daily_metrics')
+    with pytest.raises(ValueError, match='lacks required columns'):
+        manager.ensure(duckdb_client)
+    assert not manager.verified
+
+
+# Partition overwrite
+
+@pytest.fixture(scope='module')
+def pipeline():
+    spec = importlib.util.spec_from_file_location('gmb_pipeline', bench_gmb_pipeline.PIPELINE_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def metrics_table(pipeline, duckdb_client, monkeypatch):
+    monkeypatch.setattr(pipeline.warehouse, 'get_client', lambda project=None: duckdb_client)
+    table_id = f"{pipeline.PROJECT_ID}.{pipeline.DATASET_ID}.{pipeline.TABLE_ID}"
+    SchemaManager(pipeline.TABLE_SCHEMA, table_id).ensure(duckdb_client)
+    return table_id
+
+
+def metric_rows(pipeline, location_id, days):
+    data = {'multiDailyMetricTimeSeries': [{'dailyMetricTimeSeries': [{
+        'dailyMetric': 'CALL_CLICKS',
+        'timeSeries': {'datedValues': [
+            {'date': {'year': day.year, 'month': day.month, 'day': day.day}, 'value': '1'} for day in days
+        ]}
+    }]}]}
+    return pipeline.build_metric_rows('1', location_id, 'Title', 'store', True, data, days[0], days[-1])
+
+
+class RecordingSink:
+    def __init__(self):
+        self.rows = {}
+
+    def add_encoded(self, location_id, entries):
+        self.rows.setdefault(location_id, []).extend(entries)
+        return len(entries)
+
+
+def test_partition_replace_needs_every_existing_location(pipeline, duckdb_client, metrics_table):
+    days = [date(2024, 6, 1), date(2024, 6, 2)]
+    duckdb_client.insert_rows_json(metrics_table, metric_rows(pipeline, 'a', days) + metric_rows(pipeline, 'b', days))
+    # Rows outside the window do not count
+    duckdb_client.insert_rows_json(metrics_table, metric_rows(pipeline, 'c', [date(2024, 6, 5)]))
+
+    sink = pipeline.PartitionOverwriteSink(RecordingSink())
+    assert sink.can_replace({'a', 'b'}, days[0], days[-1])
+    assert sink.can_replace({'a', 'b', 'd'}, days[0], days[-1])
+    assert not sink.can_replace({'a'}, days[0], days[-1])
+    assert not sink.can_replace({'a', 'b'}, days[0], date(2024, 6, 5))
+
+
+def test_partition_flush_replaces_days(pipeline, duckdb_client, metrics_table):
+    days = [date(2024, 6, 1), date(2024, 6, 2)]
+    duckdb_client.insert_rows_json(metrics_table, metric_rows(pipeline, 'a', days))
+    sink = pipeline.PartitionOverwriteSink(RecordingSink())
+    sink.add('a', metric_rows(pipeline, 'a', days[:1]))
+    sink.add('b', metric_rows(pipeline, 'b', days))
+    assert sink.can_replace({'a', 'b'}, days[0], days[-1])
+    sink.flush()
+
+    rows = duckdb_client.query(f"SELECT location_id, date FROM `{metrics_table}` ORDER BY date, location_id").result()
+    assert [(row['location_id'], row['date']) for row in rows] == [('a', days[0]), ('b', days[0]), ('b', days[1])]
+    assert sink.partitions_loaded == 2
+
+
+def test_partition_buffer_spills_to_merge_sink(pipeline, duckdb_client, metrics_table):
+    days = [date(2024, 6, 1) + timedelta(days=n) for n in range(7)]
+    merge_sink = RecordingSink()
+    sink = pipeline.PartitionOverwriteSink(merge_sink, max_buffer_bytes=1)
+    sink.add('a', metric_rows(pipeline, 'a', days))
+    sink.add('b', metric_rows(pipeline, 'b', days))
+    assert sink.rows == {}
+    assert {location_id: len(entries) for location_id, entries in merge_sink.rows.items()} == {'a': 7, 'b': 7}
+    # A spilled window is merged, even with every location fetched
+    assert not sink.can_replace({'a', 'b'}, days[0], days[-1])
+
+    # The next window starts over
+    sink.merge_into(merge_sink)
+    assert not sink.spilled
+
+
+def test_partition_backfill_keeps_unfetched_locations(pipeline, duckdb_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'environ', dict(os.environ))
+    # load_pipeline() wraps the client it gets here
+    monkeypatch.setattr(pipeline.warehouse, 'get_client', lambda project=None: duckdb_client)
+    server = start_server(SyntheticGMB(1, 3, 60), latency_ms=0)
+    try:
+        module, client = bench_gmb_pipeline.load_pipeline(server, str(tmp_path), 'duckdb', 1000)
+        end_date = date.today() - timedelta(days=2)
+        payload = {'backfill': True, 'load_mode': 'partition', 'max_concurrency': 2,
+                   'start_date': (end_date - timedelta(days=6)).isoformat(), 'end_date': end_date.isoformat()}
+        table_id = f"{module.PROJECT_ID}.{module.DATASET_ID}.{module.TABLE_ID}"
+
+        body, status = module.gmb_fetch_performance(Request(payload))
+        assert status == 200
+        assert body['load']['partitions_loaded'] == 7
+
+        # A location no longer listed still has rows in the window
+        client.query(f"UPDATE `{table_id}` SET location_id = 'gone' WHERE location_id = (SELECT MIN(location_id) FROM `{table_id}`)").result()
+        payload['start_date'] = (end_date - timedelta(days=5)).isoformat()
+        body, status = module.gmb_fetch_performance(Request(payload))
+        assert status == 200
+        assert body['load']['partitions_loaded'] == 0
+        assert body['load']['merged_windows'] == 1
+        rows = client.query(f"SELECT COUNT(*) AS n FROM `{table_id}` WHERE location_id = 'gone'").result()
+        assert next(iter(rows))['n'] == 7
+    finally:
+        server.shutdown()
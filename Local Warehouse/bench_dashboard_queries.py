@@ -0,0 +1,96 @@
+"""Time the Dashboard Queries SQL on the local DuckDB warehouse.
+
+Generates synthetic source tables at each requested scale, then runs
+every .sql file in Dashboard Queries through the BigQuery-to-DuckDB
+translation. Views are created and then read in full; CREATE TABLE and
+plain SELECT files are timed as they are. Files the local warehouse
+can't run (scripting, wildcard tables, missing sources) are listed with
+the reason instead of a time.
+
+Usage:
+    python bench_dashboard_queries.py --scales 1,10,100 --days 365 --repeat 3
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+import statistics
+import tempfile
+import time
+
+from duckdb_warehouse import DuckDBClient, fetch_arrow, translate_sql
+from synthetic_data import DASHBOARD_QUERIES_DIR, generate
+
+# Tables generate() builds; files that would overwrite them are skipped
+SYNTHETIC_TABLES = {'monday_board_mapping_materialized', 'metaads_combined_materialized', 'custom_rollup_events'}
+CREATE_PATTERN = re.compile(r'^\s*CREATE\s+(?:OR\s+REPLACE\s+)?(VIEW|TABLE)\s+(\S+)', re.IGNORECASE)
+
+logger = logging.getLogger('bench')
+
+
+def strip_comments(sql):
+    return '\n'.join(line for line in sql.splitlines() if not line.strip().startswith('--'))
+
+
+def time_file(client, path, repeat):
+    """Run one SQL file; returns (status, rows, best_seconds, median_seconds)."""
+    with open(path) as f:
+        sql = translate_sql(strip_comments(f.read()).strip().rstrip(';'))
+    create = CREATE_PATTERN.match(sql)
+    if create and create.group(2).split('.')[-1].strip('"') in SYNTHETIC_TABLES:
+        return 'skipped: rebuilds a synthetic source table', None, None, None
+
+    cursor = client.cursor()
+    is_view = bool(create) and create.group(1).upper() == 'VIEW'
+    timings = []
+    rows = None
+    try:
+        if is_view:
+            cursor.execute(sql)
+            statement = f"SELECT * FROM {create.group(2)}"
+        else:
+            statement = sql
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cursor.execute(statement)
+            if is_view or not create:
+                rows = fetch_arrow(cursor).num_rows
+            timings.append(time.perf_counter() - start)
+    except Exception as e:
+        return f"unsupported: {str(e).splitlines()[0][:80]}", None, None, None
+    return 'ok', rows, min(timings), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1,10', help='Comma-separated client multipliers')
+    parser.add_argument('--clients', type=int, default=150, help='Clients at scale 1')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--files', default='*.sql', help='Glob within Dashboard Queries')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    paths = sorted(glob.glob(os.path.join(DASHBOARD_QUERIES_DIR, args.files)))
+
+    for scale in [float(s) for s in args.scales.split(',')]:
+        with tempfile.TemporaryDirectory() as workdir:
+            client = DuckDBClient(path=os.path.join(workdir, 'bench.duckdb'))
+            start = time.perf_counter()
+            counts = generate(client, clients=int(args.clients * scale), days=args.days)
+            logger.info(f"\n=== scale {scale:g}: " + ', '.join(f"{t.split('.')[-1]} {n:,}" for t, n in counts.items())
+                        + f" (generated in {time.perf_counter() - start:.1f}s)")
+            logger.info(f"{'file':<58} {'rows':>10} {'best s':>8} {'median s':>9}")
+            for path in paths:
+                status, rows, best, median = time_file(client, path, args.repeat)
+                name = os.path.basename(path)
+                if status == 'ok':
+                    logger.info(f"{name:<58} {rows if rows is not None else '-':>10} {best:>8.3f} {median:>9.3f}")
+                else:
+                    logger.info(f"{name:<58} {status}")
+            client.connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,480 @@
+"""DuckDB stand-in for google.cloud.bigquery.Client.
+
+Implements the part of the BigQuery client the pipelines use: query()
+with Scalar/Array query parameters (including MERGE), get_table,
+create_table, delete_table, load_table_from_file / load_table_from_json
+(including WRITE_TRUNCATE into a `table$YYYYMMDD` day partition of a
+date-partitioned table) and insert_rows_json. BigQuery SQL is rewritten into DuckDB SQL on the
+way in (identifiers, parameters, the common date/JSON/regex functions,
+MERGE syntax, table DDL options). Scripting (DECLARE, IF, EXECUTE
+IMMEDIATE) and wildcard tables are not supported.
+
+`project.dataset.table` maps to schema `dataset`, table `table` in one
+DuckDB file; the project part is ignored.
+"""
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import date, datetime
+
+import duckdb
+import pyarrow
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+from google.cloud.bigquery.table import Row
+
+LOCAL_WAREHOUSE_DB = os.environ.get('LOCAL_WAREHOUSE_DB', '/tmp/local_warehouse.duckdb')
+
+DUCKDB_TYPES = {
+    'STRING': 'VARCHAR',
+    'BYTES': 'BLOB',
+    'INTEGER': 'BIGINT',
+    'INT64': 'BIGINT',
+    'FLOAT': 'DOUBLE',
+    'FLOAT64': 'DOUBLE',
+    'NUMERIC': 'DECIMAL(38, 9)',
+    'BIGNUMERIC': 'DOUBLE',
+    'BOOLEAN': 'BOOLEAN',
+    'BOOL': 'BOOLEAN',
+    'DATE': 'DATE',
+    'DATETIME': 'TIMESTAMP',
+    'TIMESTAMP': 'TIMESTAMP',
+    'TIME': 'TIME',
+    'JSON': 'JSON'
+}
+
+BIGQUERY_TYPES = {
+    'VARCHAR': 'STRING',
+    'BLOB': 'BYTES',
+    'BIGINT': 'INTEGER',
+    'INTEGER': 'INTEGER',
+    'HUGEINT': 'INTEGER',
+    'DOUBLE': 'FLOAT',
+    'FLOAT': 'FLOAT',
+    'BOOLEAN': 'BOOLEAN',
+    'DATE': 'DATE',
+    'TIMESTAMP': 'TIMESTAMP',
+    'TIMESTAMP WITH TIME ZONE': 'TIMESTAMP',
+    'TIME': 'TIME',
+    'JSON': 'JSON'
+}
+
+TOKEN_PATTERN = re.compile(r"""(?:\b[rR])?('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")|`([^`]*)`""")
+PLACEHOLDER_PATTERN = re.compile(r'\x00(\d+)\x00')
+PARTITION_DECORATOR = re.compile(r'^(.*)\$(\d{8})$')
+# Partitioning field of tables created with time_partitioning
+PARTITIONING_TABLE = '"_local_warehouse"."time_partitioning"'
+DATE_PARTS = {'DAY', 'WEEK', 'MONTH', 'QUARTER', 'YEAR', 'HOUR', 'MINUTE', 'SECOND'}
+
+
+def duckdb_type(field):
+    """DuckDB column type for a bigquery.SchemaField."""
+    if field.field_type in ('RECORD', 'STRUCT'):
+        members = ', '.join(f'"{sub.name}" {duckdb_type(sub)}' for sub in field.fields)
+        column_type = f"STRUCT({members})"
+    else:
+        column_type = DUCKDB_TYPES.get(field.field_type, 'VARCHAR')
+    return f"{column_type}[]" if field.mode == 'REPEATED' else column_type
+
+
+def schema_field(name, column_type):
+    """bigquery.SchemaField for a DuckDB column type."""
+    column_type = str(column_type).upper()
+    if column_type.endswith('[]'):
+        return bigquery.SchemaField(name, BIGQUERY_TYPES.get(column_type[:-2], 'STRING'), mode='REPEATED')
+    if column_type.startswith('STRUCT'):
+        return bigquery.SchemaField(name, 'RECORD')
+    if column_type.startswith('DECIMAL'):
+        return bigquery.SchemaField(name, 'NUMERIC')
+    return bigquery.SchemaField(name, BIGQUERY_TYPES.get(column_type, 'STRING'))
+
+
+def split_table_id(table):
+    """(schema, table) for a table ID, table reference or Table."""
+    table_id = table if isinstance(table, str) else f"{table.dataset_id}.{table.table_id}"
+    parts = table_id.strip('`').replace(':', '.').split('.')
+    if len(parts) < 2:
+        raise ValueError(f"Table ID needs a dataset: {table_id}")
+    return parts[-2], parts[-1]
+
+
+def quoted(table):
+    schema, name = split_table_id(table)
+    return f'"{schema}"."{name}"'
+
+
+def call_arguments(sql, open_paren):
+    """Split the arguments of the call whose '(' is at open_paren.
+
+    Returns (arguments, index just past the closing ')').
+    """
+    depth, start, arguments = 0, open_paren + 1, []
+    for index in range(open_paren, len(sql)):
+        char = sql[index]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                arguments.append(sql[start:index].strip())
+                return arguments, index + 1
+        elif char == ',' and depth == 1:
+            arguments.append(sql[start:index].strip())
+            start = index + 1
+    raise ValueError('Unbalanced parentheses in SQL')
+
+
+def rewrite_calls(sql, name, rewrite):
+    """Replace every NAME(...) call with rewrite(arguments)."""
+    pattern = re.compile(rf'\b{name}\s*\(', re.IGNORECASE)
+    position = 0
+    while True:
+        match = pattern.search(sql, position)
+        if not match:
+            return sql
+        arguments, end = call_arguments(sql, match.end() - 1)
+        replacement = rewrite(arguments)
+        if replacement is None:
+            position = match.end()
+            continue
+        sql = sql[:match.start()] + replacement + sql[end:]
+        position = match.start() + len(replacement)
+
+
+def date_part(argument):
+    part = argument.strip().upper()
+    return part if part in DATE_PARTS else None
+
+
+def translate_sql(sql):
+    """Rewrite a BigQuery Standard SQL statement into DuckDB SQL."""
+    literals = []
+
+    def stash(match):
+        if match.group(2) is not None:
+            # `project.dataset.table` -> "dataset"."table"
+            parts = match.group(2).split('.')
+            if len(parts) > 2:
+                parts = parts[-2:]
+            literals.append('.'.join(f'"{part}"' for part in parts))
+        else:
+            body = match.group(1)[1:-1].replace("\\'", "''").replace('\\"', '"')
+            if match.group(1).startswith('"'):
+                body = body.replace("'", "''")
+            literals.append(f"'{body}'")
+        return f"\x00{len(literals) - 1}\x00"
+
+    sql = TOKEN_PATTERN.sub(stash, sql)
+    sql = sql.replace('#', '--')
+
+    # Parameters and UNNEST of array parameters
+    sql = re.sub(r'@(\w+)', r'$\1', sql)
+    sql = re.sub(r'\bIN\s+UNNEST\s*\(\s*(\$\w+)\s*\)', r'IN (SELECT UNNEST(\1))', sql, flags=re.IGNORECASE)
+
+    # Types and small syntax differences
+    for bigquery_type, duck_type in (('INT64', 'BIGINT'), ('FLOAT64', 'DOUBLE'), ('STRING', 'VARCHAR'),
+                                     ('BOOL', 'BOOLEAN'), ('BYTES', 'BLOB')):
+        sql = re.sub(rf'\b{bigquery_type}\b', duck_type, sql)
+    sql = re.sub(r'\*\s+EXCEPT\s*\(', '* EXCLUDE (', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bSAFE_CAST\s*\(', 'TRY_CAST(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bREGEXP_CONTAINS\s*\(', 'regexp_matches(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bJSON_VALUE\s*\(', 'json_extract_string(', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bCURRENT_DATE\s*\(\s*(?:\x00\d+\x00)?\s*\)', 'current_date', sql, flags=re.IGNORECASE)
+
+    # Table DDL options BigQuery has and DuckDB doesn't
+    sql = re.sub(
+        r'(CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+\S+)\s+(?:PARTITION\s+BY[^\n]*\n\s*)?(?:CLUSTER\s+BY[^\n]*\n\s*)?(?:OPTIONS\s*\([^)]*\)\s*)?AS\b',
+        r'\1 AS', sql, flags=re.IGNORECASE
+    )
+
+    # Functions whose arguments differ
+    sql = rewrite_calls(sql, 'SAFE_DIVIDE', lambda a: f"(CASE WHEN ({a[1]}) = 0 THEN NULL ELSE ({a[0]}) / ({a[1]}) END)")
+    sql = rewrite_calls(sql, 'FARM_FINGERPRINT', lambda a: f"CAST(hash({a[0]}) >> 1 AS BIGINT)")
+    sql = rewrite_calls(sql, 'FORMAT_DATE', lambda a: f"strftime(CAST({a[1]} AS DATE), {a[0]})")
+    sql = rewrite_calls(sql, r'SAFE\.PARSE_DATE', lambda a: f"CAST(try_strptime({a[1]}, {a[0]}) AS DATE)")
+    sql = rewrite_calls(sql, 'PARSE_DATE', lambda a: f"CAST(strptime({a[1]}, {a[0]}) AS DATE)")
+    # Other SAFE.-prefixed functions run unprotected
+    sql = re.sub(r'\bSAFE\.(\w+)\s*\(', r'\1(', sql, flags=re.IGNORECASE)
+    sql = rewrite_calls(sql, 'JSON_QUERY_ARRAY', lambda a: f"json_extract({a[0]}, '$[*]')")
+    sql = rewrite_calls(sql, 'DATE', lambda a: f"CAST({a[0]} AS DATE)" if len(a) == 1 else None)
+    sql = rewrite_calls(
+        sql, 'DATE_TRUNC',
+        lambda a: f"CAST(date_trunc('{date_part(a[1]).lower()}', {a[0]}) AS DATE)" if len(a) == 2 and date_part(a[1]) else None
+    )
+    sql = rewrite_calls(sql, 'DATE_SUB', lambda a: f"CAST(({a[0]}) - {a[1]} AS DATE)" if len(a) == 2 else None)
+    sql = rewrite_calls(sql, 'DATE_ADD', lambda a: f"CAST(({a[0]}) + {a[1]} AS DATE)" if len(a) == 2 else None)
+    sql = rewrite_calls(
+        sql, 'DATE_DIFF',
+        lambda a: f"date_diff('{date_part(a[2]).lower()}', {a[1]}, {a[0]})" if len(a) == 3 and date_part(a[2]) else None
+    )
+    sql = rewrite_calls(
+        sql, 'GENERATE_DATE_ARRAY',
+        lambda a: f"list_transform(generate_series(CAST({a[0]} AS DATE), CAST({a[1]} AS DATE), "
+                  f"{a[2] if len(a) > 2 else 'INTERVAL 1 DAY'}), d -> CAST(d AS DATE))"
+    )
+
+    # MERGE target T ... UPDATE SET T.col = ...  ->  MERGE INTO target AS T ... UPDATE SET col = ...
+    merge = re.match(r'\s*MERGE\s+(?:INTO\s+)?(\S+)\s+(?:AS\s+)?(\w+)\s+USING\b', sql, flags=re.IGNORECASE)
+    if merge:
+        target, alias = merge.group(1), merge.group(2)
+        sql = f"MERGE INTO {target} AS {alias} USING" + sql[merge.end():]
+        sql = re.sub(rf'(\bSET\s+|,\s*){alias}\.(\w+)\s*=', r'\1\2 =', sql, flags=re.IGNORECASE)
+
+    return PLACEHOLDER_PATTERN.sub(lambda m: literals[int(m.group(1))], sql)
+
+
+def parameter_value(parameter):
+    """Python value for a bigquery Scalar/Array query parameter."""
+    def convert(value, type_):
+        if value is None:
+            return None
+        if type_ == 'DATE' and isinstance(value, str):
+            return date.fromisoformat(value)
+        if type_ in ('TIMESTAMP', 'DATETIME') and isinstance(value, str):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if type_ in ('INT64', 'INTEGER'):
+            return int(value)
+        if type_ in ('FLOAT64', 'FLOAT'):
+            return float(value)
+        return value
+
+    if isinstance(parameter, bigquery.ArrayQueryParameter):
+        return [convert(value, parameter.array_type) for value in parameter.values]
+    return convert(parameter.value, parameter.type_)
+
+
+def fetch_arrow(cursor):
+    """Arrow table of a cursor's result (to_arrow_table on newer DuckDB)."""
+    fetch = getattr(cursor, 'to_arrow_table', None) or cursor.fetch_arrow_table
+    return fetch()
+
+
+def integer_counts(table):
+    """Cast HUGEINT results (DuckDB's SUM/COUNT of integers) back to INT64 like BigQuery."""
+    for index, field in enumerate(table.schema):
+        if pyarrow.types.is_decimal(field.type) and field.type.scale == 0:
+            table = table.set_column(index, field.name, table.column(index).cast(pyarrow.int64()))
+    return table
+
+
+class LocalQueryResult:
+    """Rows of a finished query, shaped like bigquery's RowIterator."""
+
+    def __init__(self, table=None, num_dml_affected_rows=None):
+        self.arrow_table = table
+        self.num_dml_affected_rows = num_dml_affected_rows
+        self.total_rows = table.num_rows if table is not None else 0
+        self.schema = [schema_field(f.name, f.type) for f in table.schema] if table is not None else []
+
+    def __iter__(self):
+        if self.arrow_table is None:
+            return iter(())
+        field_to_index = {name: index for index, name in enumerate(self.arrow_table.column_names)}
+        return (Row(tuple(row.values()), field_to_index) for row in self.arrow_table.to_pylist())
+
+    def to_arrow(self, *args, **kwargs):
+        return self.arrow_table if self.arrow_table is not None else pyarrow.table({})
+
+    def to_dataframe(self, *args, **kwargs):
+        return self.to_arrow().to_pandas()
+
+
+class LocalJob:
+    """Finished job; result() returns immediately like a completed BigQuery job."""
+
+    def __init__(self, result=None, output_rows=None):
+        self._result = result if result is not None else LocalQueryResult()
+        self.output_rows = output_rows
+        self.num_dml_affected_rows = self._result.num_dml_affected_rows
+        self.errors = None
+        self.state = 'DONE'
+
+    def result(self, *args, **kwargs):
+        return self._result
+
+
+class DuckDBClient:
+    """google.cloud.bigquery.Client look-alike backed by a DuckDB file."""
+
+    def __init__(self, project=None, path=None):
+        self.project = project or 'local'
+        self.path = path or LOCAL_WAREHOUSE_DB
+        self.lock = threading.Lock()
+        self.partition_lock = threading.Lock()
+        self.connection = duckdb.connect(self.path)
+
+    def cursor(self):
+        # One cursor per call so concurrent pipeline threads don't share a connection
+        with self.lock:
+            return self.connection.cursor()
+
+    def ensure_schema(self, cursor, table):
+        schema, _ = split_table_id(table)
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+
+    def dataset(self, dataset_id):
+        return bigquery.DatasetReference(self.project, dataset_id)
+
+    def table_exists(self, table):
+        schema, name = split_table_id(table)
+        rows = self.cursor().execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+            [schema, name]
+        ).fetchall()
+        return bool(rows)
+
+    def query(self, query, job_config=None, **kwargs):
+        """Run one BigQuery SQL statement on DuckDB."""
+        parameters = {}
+        for parameter in getattr(job_config, 'query_parameters', None) or []:
+            parameters[parameter.name] = parameter_value(parameter)
+        sql = translate_sql(query)
+        cursor = self.cursor()
+        for schema in set(re.findall(r'"(\w+)"\."\w+"', sql)):
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        try:
+            cursor.execute(sql, parameters or None)
+        except duckdb.CatalogException as e:
+            raise NotFound(str(e))
+        keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        if keyword in ('SELECT', 'WITH', 'FROM', 'VALUES', '('):
+            return LocalJob(LocalQueryResult(integer_counts(fetch_arrow(cursor))))
+        affected = None
+        if keyword in ('INSERT', 'UPDATE', 'DELETE', 'MERGE'):
+            row = cursor.fetchone()
+            affected = row[0] if row else 0
+        return LocalJob(LocalQueryResult(num_dml_affected_rows=affected))
+
+    def get_table(self, table):
+        schema, name = split_table_id(table)
+        cursor = self.cursor()
+        columns = cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = ? AND table_name = ? ORDER BY ordinal_position",
+            [schema, name]
+        ).fetchall()
+        if not columns:
+            raise NotFound(f"Not found: Table {schema}.{name}")
+        result = bigquery.Table(f"{self.project}.{schema}.{name}", schema=[schema_field(c, t) for c, t in columns])
+        result._properties['numRows'] = str(cursor.execute(f'SELECT COUNT(*) FROM "{schema}"."{name}"').fetchone()[0])
+        return result
+
+    def create_table(self, table, exists_ok=False):
+        cursor = self.cursor()
+        self.ensure_schema(cursor, table)
+        columns = ', '.join(f'"{field.name}" {duckdb_type(field)}' for field in table.schema)
+        exists = 'IF NOT EXISTS ' if exists_ok else ''
+        cursor.execute(f"CREATE TABLE {exists}{quoted(table)} ({columns})")
+        partitioning = getattr(table, 'time_partitioning', None)
+        if partitioning is not None and partitioning.field:
+            schema, name = split_table_id(table)
+            cursor.execute('CREATE SCHEMA IF NOT EXISTS "_local_warehouse"')
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {PARTITIONING_TABLE} (table_schema VARCHAR, table_name VARCHAR, field VARCHAR)")
+            cursor.execute(f"DELETE FROM {PARTITIONING_TABLE} WHERE table_schema = ? AND table_name = ?", [schema, name])
+            cursor.execute(f"INSERT INTO {PARTITIONING_TABLE} VALUES (?, ?, ?)", [schema, name, partitioning.field])
+        return self.get_table(table)
+
+    def partitioning_field(self, table):
+        """The time partitioning field a table was created with, or None."""
+        schema, name = split_table_id(table)
+        try:
+            row = self.cursor().execute(
+                f"SELECT field FROM {PARTITIONING_TABLE} WHERE table_schema = ? AND table_name = ?", [schema, name]
+            ).fetchone()
+        except duckdb.CatalogException:
+            return None
+        return row[0] if row else None
+
+    def delete_table(self, table, not_found_ok=False):
+        if not self.table_exists(table):
+            if not_found_ok:
+                return
+            raise NotFound(f"Not found: Table {'.'.join(split_table_id(table))}")
+        self.cursor().execute(f"DROP TABLE {quoted(table)}")
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs):
+        """Load NDJSON or CSV bytes into a table, honoring write disposition."""
+        destination_id = destination if isinstance(destination, str) else f"{destination.dataset_id}.{destination.table_id}"
+        partition = PARTITION_DECORATOR.match(destination_id)
+        if partition:
+            return self.load_partition(file_obj, partition.group(1), partition.group(2), job_config)
+        source_format = getattr(job_config, 'source_format', None) or bigquery.SourceFormat.CSV
+        disposition = getattr(job_config, 'write_disposition', None) or bigquery.WriteDisposition.WRITE_APPEND
+        schema = getattr(job_config, 'schema', None)
+        if not schema and self.table_exists(destination):
+            schema = self.get_table(destination).schema
+
+        suffix = '.json' if source_format == bigquery.SourceFormat.NEWLINE_DELIMITED_JSON else '.csv'
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            tmp.write(file_obj.read())
+            tmp_path = tmp.name
+        try:
+            columns = '{' + ', '.join(f"'{field.name}': '{duckdb_type(field)}'" for field in schema) + '}' if schema else None
+            if suffix == '.json':
+                reader = f"read_json('{tmp_path}', format = 'newline_delimited'" + (f", columns = {columns})" if columns else ")")
+            else:
+                skip = getattr(job_config, 'skip_leading_rows', None) or 0
+                reader = f"read_csv('{tmp_path}', header = {'true' if skip else 'false'}" + (f", columns = {columns})" if columns else ")")
+
+            cursor = self.cursor()
+            self.ensure_schema(cursor, destination)
+            target = quoted(destination)
+            if disposition == bigquery.WriteDisposition.WRITE_TRUNCATE or not self.table_exists(destination):
+                cursor.execute(f"CREATE OR REPLACE TABLE {target} AS SELECT * FROM {reader}")
+            else:
+                if disposition == bigquery.WriteDisposition.WRITE_EMPTY and cursor.execute(f"SELECT COUNT(*) FROM {target}").fetchone()[0]:
+                    raise ValueError(f"Table {target} is not empty")
+                cursor.execute(f"INSERT INTO {target} BY NAME SELECT * FROM {reader}")
+            output_rows = cursor.execute(f"SELECT COUNT(*) FROM {reader}").fetchone()[0]
+        finally:
+            os.remove(tmp_path)
+        return LocalJob(output_rows=output_rows)
+
+    def load_partition(self, file_obj, table, day, job_config):
+        """Load into one day partition (`table$YYYYMMDD`) of a date-partitioned table."""
+        field = self.partitioning_field(table)
+        if field is None:
+            raise ValueError(f"Table {table} is not partitioned by a date column")
+        disposition = getattr(job_config, 'write_disposition', None) or bigquery.WriteDisposition.WRITE_APPEND
+        partition_date = datetime.strptime(day, '%Y%m%d').date()
+        staging = f"{table}__partition_{day}_{threading.get_ident()}"
+        job = self.load_table_from_file(file_obj, staging, job_config=bigquery.LoadJobConfig(
+            schema=getattr(job_config, 'schema', None) or self.get_table(table).schema,
+            source_format=getattr(job_config, 'source_format', None),
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        ))
+        target, source = quoted(table), quoted(staging)
+        with self.partition_lock:
+            cursor = self.cursor()
+            try:
+                outside = cursor.execute(f'SELECT COUNT(*) FROM {source} WHERE "{field}" IS DISTINCT FROM ?', [partition_date]).fetchone()[0]
+                if outside:
+                    raise ValueError(f"{outside} rows are outside partition {day} of {table}")
+                # Replace the partition atomically, like a BigQuery load job
+                cursor.execute("BEGIN TRANSACTION")
+                try:
+                    if disposition == bigquery.WriteDisposition.WRITE_TRUNCATE:
+                        cursor.execute(f'DELETE FROM {target} WHERE "{field}" = ?', [partition_date])
+                    cursor.execute(f"INSERT INTO {target} BY NAME SELECT * FROM {source}")
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {source}")
+        return job
+
+    def load_table_from_json(self, json_rows, destination, job_config=None, **kwargs):
+        config = job_config or bigquery.LoadJobConfig()
+        config.source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+        payload = '\n'.join(json.dumps(row, default=str) for row in json_rows).encode('utf-8')
+        return self.load_table_from_file(io.BytesIO(payload), destination, job_config=config)
+
+    def insert_rows_json(self, table, json_rows, **kwargs):
+        """Streaming-insert stand-in; returns an empty error list like BigQuery."""
+        if json_rows:
+            self.load_table_from_json(json_rows, table)
+        return []
@@ -0,0 +1,174 @@
+"""Synthetic source tables for the local DuckDB warehouse.
+
+Generates the three tables the dashboard views are built on, with
+matching keys across them (CGID, GA4 property, campaign/adset/ad names):
+
+    dashboard_views.monday_board_mapping_materialized   one row per client per month
+    dashboard_views.metaads_combined_materialized       one row per client, ad and day
+    ga4_custom_rollup.custom_rollup_events              GA4 lead events per client and day
+
+Row counts scale linearly with --scale, so 10x-100x production volumes
+can be built on a laptop. With --views the Dashboard Queries views the
+pipelines read (e.g. metaads_ga4_spend_leads_pivot) are created on top.
+
+Usage:
+    python synthetic_data.py --clients 150 --days 365 --scale 10 --views metaads_ga4_spend_leads_pivot
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import date, timedelta
+
+from duckdb_warehouse import DuckDBClient, translate_sql
+
+DASHBOARD_QUERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Dashboard Queries')
+
+EVENT_NAMES = [
+    'subscribe_survey_meta_ghl', 'subscribe_form_meta_ghl', 'subscribe_chat_fbfunnel_ghl',
+    'subscribe_form_google_ghl', 'subscribe_survey_google_ghl', 'subscribe_call_meta_ghl',
+    'subscribe_call_google_ghl', 'subscribe_appt_booked_ghl', 'appt_show_ghl', 'appt_noshow_ghl'
+]
+
+logger = logging.getLogger('synthetic_data')
+
+
+def generate(client, clients=150, days=365, ads_per_client=12, events_per_client_day=20, end_date=None):
+    """Create (or replace) the synthetic source tables and return their row counts."""
+    end_date = end_date or date.today() - timedelta(days=1)
+    start_date = end_date - timedelta(days=days - 1)
+    cursor = client.cursor()
+    for schema in ('dashboard_views', 'ga4_custom_rollup'):
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+    params = {
+        'clients': clients,
+        'start_date': start_date,
+        'end_date': end_date,
+        'ads': ads_per_client,
+        'events': events_per_client_day
+    }
+
+    cursor.execute("""
+        CREATE OR REPLACE TABLE dashboard_views.monday_board_mapping_materialized AS
+        SELECT
+            CAST(9000000000 + c AS VARCHAR) AS id,
+            'Client ' || c || ' | Synthetic' AS client_name,
+            'CG' || c AS cg_id,
+            CAST(300000000 + c AS VARCHAR) AS ga4_property_id,
+            CAST(1000000000000 + c AS VARCHAR) AS gmb_location_id,
+            1000 + (c % 20) * 250 AS monthly_ad_budget,
+            CASE WHEN c % 10 = 0 THEN 'Paused' ELSE 'Active' END AS client_status,
+            'ARS ' || (c % 5) AS ars,
+            strftime(m, '%Y-%m') AS report_month,
+            CAST(m AS DATE) AS report_month_date,
+            CAST(m AS TIMESTAMP) AS updated_at,
+            CAST(m AS TIMESTAMP) AS _airbyte_extracted_at
+        FROM range($clients) t(c),
+             generate_series(date_trunc('month', $start_date::DATE), date_trunc('month', $end_date::DATE), INTERVAL 1 MONTH) g(m)
+    """, {k: params[k] for k in ('clients', 'start_date', 'end_date')})
+
+    cursor.execute("""
+        CREATE OR REPLACE TABLE dashboard_views.metaads_combined_materialized AS
+        WITH ads AS (
+            SELECT
+                c, a, CAST(d AS DATE) AS date_spend,
+                hash(c, a, d) AS h
+            FROM range($clients) t(c), range($ads) u(a),
+                 generate_series($start_date::DATE, $end_date::DATE, INTERVAL 1 DAY) g(d)
+        )
+        SELECT
+            'CG' || c AS cgid,
+            CAST(500000 + c AS VARCHAR) AS account_id,
+            'Account ' || c AS account_name,
+            'Client ' || c || ' | Synthetic' AS client_name,
+            CAST(c * 1000 + a // 4 AS VARCHAR) AS campaign_id,
+            'CG' || c || ' | Campaign ' || (a // 4) AS campaign_name,
+            CAST(c * 1000 + a // 2 AS VARCHAR) AS adset_id,
+            'Adset ' || (a // 2) AS adset_name,
+            CAST(c * 1000 + a AS VARCHAR) AS ad_id,
+            'Ad ' || a AS ad_name,
+            CAST(date_trunc('month', date_spend) AS DATE) AS report_month,
+            date_spend,
+            ROUND((h % 10000) / 100.0, 2) AS total_spend,
+            CAST(h % 5000 + 100 AS BIGINT) AS total_impressions,
+            CAST(h % 97 AS BIGINT) AS total_clicks,
+            ROUND((h % 10000) / 100.0 / GREATEST(h % 97, 1), 2) AS avg_cpc,
+            ROUND((h % 10000) / 100.0 / (h % 5000 + 100) * 1000, 2) AS avg_cpm,
+            ROUND((h % 97) * 100.0 / (h % 5000 + 100), 2) AS avg_ctr,
+            CAST(h % 4000 + 50 AS BIGINT) AS total_reach,
+            CAST(h % 80 AS BIGINT) AS total_unique_clicks,
+            date_spend AS row_added_date,
+            'act_' || (500000 + c) || '_ads_insights' AS table_suffix
+        FROM ads
+    """, {k: params[k] for k in ('clients', 'ads', 'start_date', 'end_date')})
+
+    cursor.execute("""
+        CREATE OR REPLACE TABLE ga4_custom_rollup.custom_rollup_events AS
+        WITH events AS (
+            SELECT c, CAST(d AS DATE) AS event_day, n, hash(c, d, n) AS h
+            FROM range($clients) t(c),
+                 generate_series($start_date::DATE, $end_date::DATE, INTERVAL 1 DAY) g(d),
+                 range($events) u(n)
+        )
+        SELECT
+            CAST(300000000 + c AS VARCHAR) AS property_id,
+            strftime(event_day, '%Y%m%d') AS event_date,
+            event_day AS event_date_as_date,
+            CAST(epoch_us(CAST(event_day AS TIMESTAMP)) + h % 86400000000 AS BIGINT) AS event_timestamp,
+            $event_names[1 + CAST(h % len($event_names) AS INTEGER)] AS event_name,
+            'user_' || (h % 100000) AS user_pseudo_id,
+            struct_pack(
+                manual_campaign_name := 'CG' || c || ' | Campaign ' || ((h // 7) % $ads // 4),
+                manual_content := 'Ad ' || ((h // 7) % $ads),
+                manual_medium := 'Adset ' || ((h // 7) % $ads // 2)
+            ) AS collected_traffic_source
+        FROM events
+    """, dict({k: params[k] for k in ('clients', 'start_date', 'end_date', 'events', 'ads')}, event_names=EVENT_NAMES))
+
+    counts = {}
+    for table in ('dashboard_views.monday_board_mapping_materialized',
+                  'dashboard_views.metaads_combined_materialized',
+                  'ga4_custom_rollup.custom_rollup_events'):
+        counts[table] = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+
+def create_views(client, names):
+    """Create Dashboard Queries views (CREATEVIEW-<name>.sql) on the local warehouse."""
+    for name in names:
+        path = os.path.join(DASHBOARD_QUERIES_DIR, f"CREATEVIEW-{name}.sql")
+        with open(path) as f:
+            client.cursor().execute(translate_sql(f.read()))
+        logger.info(f"✅ Created view dashboard_views.{name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=None, help='DuckDB file (default: LOCAL_WAREHOUSE_DB)')
+    parser.add_argument('--clients', type=int, default=150, help='Clients at scale 1')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--ads-per-client', type=int, default=12)
+    parser.add_argument('--events-per-client-day', type=int, default=20)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier on the number of clients')
+    parser.add_argument('--views', default='', help='Comma-separated Dashboard Queries views to create')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    client = DuckDBClient(path=args.db)
+    start = time.perf_counter()
+    counts = generate(
+        client,
+        clients=int(args.clients * args.scale),
+        days=args.days,
+        ads_per_client=args.ads_per_client,
+        events_per_client_day=args.events_per_client_day
+    )
+    for table, rows in counts.items():
+        logger.info(f"  {table}: {rows:,} rows")
+    logger.info(f"✅ Generated synthetic data in {client.path} ({time.perf_counter() - start:.1f}s)")
+    if args.views:
+        create_views(client, [name.strip() for name in args.views.split(',') if name.strip()])
+
+
+if __name__ == '__main__':
+    main()